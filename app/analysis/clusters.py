@@ -0,0 +1,24 @@
+def clusters(pairs):
+    """
+    Groups near-duplicate pairs into clusters (connected components), by
+    union-find. Returns lists of members, largest cluster first.
+    """
+    parent = {}
+
+    def find(node):
+        root = node
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    for a, b in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups = {}
+    for node in parent:
+        groups.setdefault(find(node), []).append(node)
+    return sorted(groups.values(), key=len, reverse=True)
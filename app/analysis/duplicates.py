@@ -0,0 +1,77 @@
+import hashlib
+import re
+from functools import lru_cache
+
+import numpy as np
+
+# Words in a shingle; pages are compared by their sets of overlapping word triples
+SHINGLE_SIZE = 3
+
+# MinHash signature: PERMUTATIONS hash functions, split into BANDS bands of
+# PERMUTATIONS // BANDS values for the LSH index. Two pages become candidates
+# when a whole band matches, which for shingle-set Jaccard similarity J has
+# probability 1 - (1 - J^4)^16: 0.9998 at J = 0.8, 0.64 at 0.5, ~0 below 0.2.
+PERMUTATIONS = 64
+BANDS = 16
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Odd 64-bit constants mixing the word hashes of a shingle
+_SHINGLE_MULTIPLIERS = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xC2B2AE3D27D4EB4F), np.uint64(0x165667B19E3779F9))
+
+# The hash functions: x * a + b (mod 2^64), keeping the high 32 bits; fixed so every worker agrees
+_PERMUTATION_RNG = np.random.default_rng(0x5EED)
+_A = _PERMUTATION_RNG.integers(1, 2 ** 63, PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_B = _PERMUTATION_RNG.integers(0, 2 ** 63, PERMUTATIONS, dtype=np.uint64)
+
+
+@lru_cache(maxsize=1 << 16)
+def _word_hash(word):
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def words(text):
+    return _WORD.findall(text.lower())
+
+
+def minhash(tokens):
+    """
+    MinHash signature of a page's SHINGLE_SIZE-word shingles: PERMUTATIONS
+    uint32 values, as bytes. The share of values two signatures have in
+    common estimates the Jaccard similarity of the pages' shingle sets.
+    Returns None for pages with fewer words than a shingle.
+    """
+    if len(tokens) < SHINGLE_SIZE:
+        return None
+
+    hashes = np.fromiter((_word_hash(token) for token in tokens), dtype=np.uint64, count=len(tokens))
+    count = len(tokens) - SHINGLE_SIZE + 1
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset, multiplier in enumerate(_SHINGLE_MULTIPLIERS[:SHINGLE_SIZE]):
+        shingles ^= hashes[offset:offset + count] * multiplier
+    shingles = np.unique(shingles)
+
+    # One (shingles x permutations) product; uint64 arithmetic wraps around
+    permuted = (shingles[:, None] * _A[None, :] + _B[None, :]) >> np.uint64(32)
+    return permuted.min(axis=0).astype(np.uint32).tobytes()
+
+
+def band_keys(signature):
+    """
+    The signature's LSH bucket in each band, as signed 64-bit ints.
+    """
+    band_bytes = PERMUTATIONS // BANDS * 4
+    return [
+        int.from_bytes(hashlib.blake2b(signature[start:start + band_bytes], digest_size=8).digest(), "little", signed=True)
+        for start in range(0, PERMUTATIONS * 4, band_bytes)
+    ]
+
+
+def similarity(signature, others):
+    """
+    Estimated Jaccard similarity between one signature and each of `others`.
+    """
+    mine = np.frombuffer(signature, dtype=np.uint32)
+    theirs = np.frombuffer(b"".join(others), dtype=np.uint32).reshape(-1, PERMUTATIONS)
+    return (theirs == mine).mean(axis=1)
@@ -0,0 +1,307 @@
+import io
+
+import numpy as np
+
+# Statuses of pages that were linked to but never fetched (depth limit, budget, other hosts)
+NOT_CRAWLED = 0
+
+# Redirect hops followed when resolving a link to its final page
+MAX_REDIRECT_HOPS = 20
+
+
+class LinkGraph:
+    """
+    A crawl's internal link graph with integer node IDs.
+
+    Node i is the page urls[i]. Outgoing links are stored in CSR form: the
+    targets of node i are indices[indptr[i]:indptr[i + 1]]. status[i] is the
+    page's HTTP status (NOT_CRAWLED if it wasn't fetched), redirect[i] the node
+    a redirect pointed to (-1 if none) and seeds the nodes the crawl started from.
+    """
+
+    def __init__(self, urls, indptr, indices, status, redirect, seeds):
+        self.urls = urls
+        self.indptr = indptr
+        self.indices = indices
+        self.status = status
+        self.redirect = redirect
+        self.seeds = seeds
+
+    @classmethod
+    def from_fragments(cls, fragments, prior=None):
+        """
+        Builds the graph from the fragments the crawl's workers recorded
+        (see crawling.linkgraph). Unchanged pages of an incremental crawl were
+        not parsed again; their links are taken from the `prior` graph. Nor
+        are the error pages and redirects the previous crawl found requested
+        again (only stored pages are), so linked URLs this crawl didn't fetch
+        keep their `prior` error status or redirect.
+        """
+        ids = {}
+
+        def node(url):
+            node_id = ids.get(url)
+            if node_id is None:
+                node_id = ids[url] = len(ids)
+            return node_id
+
+        statuses, redirects, seeds, sources, targets = {}, {}, [], [], []
+        prior_links = []
+        for fragment in fragments:
+            for url, status in fragment["pages"]:
+                statuses[node(url)] = status
+            for url, status, location in fragment["redirects"]:
+                source = node(url)
+                statuses[source] = status
+                redirects[source] = node(location)
+            for url, links in fragment["links"]:
+                source = node(url)
+                for link in links:
+                    sources.append(source)
+                    targets.append(node(link))
+            seeds.extend(node(url) for url in fragment["seeds"])
+            prior_links.extend(fragment["unchanged"])
+
+        prior_ids = {url: i for i, url in enumerate(prior.urls)} if prior is not None else {}
+        if prior is not None and prior_links:
+            for url in prior_links:
+                prior_id = prior_ids.get(url)
+                if prior_id is None:
+                    continue
+                source = node(url)
+                for target in prior.indices[prior.indptr[prior_id]:prior.indptr[prior_id + 1]]:
+                    sources.append(source)
+                    targets.append(node(prior.urls[target]))
+
+        if prior is not None:
+            carried = ~crawled_pages(prior) & (prior.status != NOT_CRAWLED)
+            unfetched = [url for url, node_id in ids.items() if node_id not in statuses]
+            while unfetched:
+                url = unfetched.pop()
+                prior_id = prior_ids.get(url)
+                if prior_id is None or not carried[prior_id] or ids[url] in statuses:
+                    continue
+                statuses[ids[url]] = int(prior.status[prior_id])
+                location = int(prior.redirect[prior_id])
+                if location >= 0:
+                    # Follow the chain: its next hop wasn't requested either, unless this crawl reached it
+                    redirects[ids[url]] = node(prior.urls[location])
+                    unfetched.append(prior.urls[location])
+
+        count = len(ids)
+        urls = [None] * count
+        for url, node_id in ids.items():
+            urls[node_id] = url
+
+        status = np.full(count, NOT_CRAWLED, dtype=np.int16)
+        status[list(statuses)] = list(statuses.values())
+        redirect = np.full(count, -1, dtype=np.int32)
+        redirect[list(redirects)] = list(redirects.values())
+
+        indptr, indices = to_csr(count, np.array(sources, dtype=np.int32), np.array(targets, dtype=np.int32))
+        return cls(urls, indptr, indices, status, redirect, np.unique(np.array(seeds, dtype=np.int32)))
+
+    def __len__(self):
+        return len(self.urls)
+
+    @property
+    def edge_count(self):
+        return len(self.indices)
+
+    def sources(self):
+        """
+        The source node of every edge, aligned with indices.
+        """
+        return np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.indptr))
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez(
+            buffer, indptr=self.indptr, indices=self.indices, status=self.status,
+            redirect=self.redirect, seeds=self.seeds,
+            urls=np.frombuffer("\n".join(self.urls).encode("utf-8"), dtype=np.uint8),
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        arrays = np.load(io.BytesIO(data))
+        urls = arrays["urls"].tobytes().decode("utf-8").split("\n") if len(arrays["urls"]) else []
+        return cls(urls, arrays["indptr"], arrays["indices"], arrays["status"], arrays["redirect"], arrays["seeds"])
+
+
+def to_csr(count, sources, targets):
+    """
+    Sorts edges by source into CSR arrays, dropping self-links and duplicates.
+    """
+    keep = sources != targets
+    edges = np.unique(sources[keep].astype(np.int64) * count + targets[keep])
+    sources, targets = (edges // max(count, 1)).astype(np.int32), (edges % max(count, 1)).astype(np.int32)
+    indptr = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=count), out=indptr[1:])
+    return indptr, targets
+
+
+def crawled_pages(graph):
+    # 304: unchanged pages of an incremental crawl
+    return ((graph.status >= 200) & (graph.status < 300)) | (graph.status == 304)
+
+
+def final_targets(graph):
+    """
+    Each node's final page after following redirects (itself if none).
+    Nodes in redirect loops resolve to themselves.
+    """
+    final = np.arange(len(graph), dtype=np.int32)
+    for _ in range(MAX_REDIRECT_HOPS):
+        following = graph.redirect[final]
+        moving = following >= 0
+        if not moving.any():
+            return final
+        final[moving] = following[moving]
+
+    # Still redirecting after MAX_REDIRECT_HOPS: a loop
+    looping = graph.redirect[final] >= 0
+    final[looping] = np.flatnonzero(looping)
+    return final
+
+
+def neighbours(indptr, indices, nodes):
+    """
+    The targets of all edges leaving `nodes`, gathered without a Python loop.
+    """
+    starts, ends = indptr[nodes], indptr[nodes + 1]
+    counts = ends - starts
+    total = int(counts.sum())
+    if not total:
+        return indices[:0]
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    return indices[offsets]
+
+
+def click_depth(graph, final):
+    """
+    Fewest clicks from a seed to each page (-1 if unreachable), by
+    breadth-first search one whole level at a time. Links to redirects
+    count as links to their final page.
+    """
+    depth = np.full(len(graph), -1, dtype=np.int32)
+    frontier = np.unique(final[graph.seeds]) if len(graph.seeds) else graph.seeds
+    level = 0
+    while len(frontier):
+        depth[frontier] = level
+        reached = final[neighbours(graph.indptr, graph.indices, frontier)]
+        frontier = np.unique(reached[depth[reached] < 0])
+        level += 1
+    return depth
+
+
+def pagerank(graph, final, pages, damping=0.85, tolerance=1e-8, max_iterations=100):
+    """
+    Internal PageRank of the crawled pages (`pages` is a boolean mask),
+    by power iteration. Each iteration is one vectorized sparse
+    matrix-vector product over the edge arrays. Links to redirects pass
+    their rank on to the final page; links out of the crawled pages are
+    dropped, and the rank of pages without outgoing links is spread evenly.
+    """
+    count = len(graph)
+    sources, targets = graph.sources(), final[graph.indices]
+    keep = pages[sources] & pages[targets] & (sources != targets)
+    sources, targets = sources[keep], targets[keep]
+    out_degree = np.bincount(sources, minlength=count).astype(np.float64)
+
+    total = int(pages.sum())
+    if not total:
+        return np.zeros(count)
+    teleport = pages / total
+    rank = teleport.copy()
+    dangling = pages & (out_degree == 0)
+    share = np.divide(1.0, out_degree, out=np.zeros(count), where=out_degree > 0)
+    for _ in range(max_iterations):
+        flow = np.bincount(targets, weights=(rank * share)[sources], minlength=count)
+        updated = damping * (flow + rank[dangling].sum() * teleport) + (1 - damping) * teleport
+        converged = np.abs(updated - rank).sum() < tolerance
+        rank = updated
+        if converged:
+            break
+    return rank
+
+
+def analyze(graph, max_listed=1000, top_pages=100):
+    """
+    Whole-site analysis of a crawl's link graph.
+
+    Returns (per-page metrics, summary). The per-page metrics are arrays
+    aligned with graph.urls: inlinks, broken_links (outgoing links to a page
+    answering 4xx/5xx, after redirects), click_depth and pagerank. The summary
+    is JSON-serializable and lists up to `max_listed` broken links, orphan
+    pages (crawled, but linked from no crawled page) and redirect chains,
+    plus the `top_pages` pages with the highest PageRank.
+    """
+    count = len(graph)
+    final = final_targets(graph)
+    crawled = crawled_pages(graph)
+    broken = graph.status >= 400
+
+    sources = graph.sources()
+    resolved = final[graph.indices]
+    internal = sources != resolved
+    inlinks = np.bincount(resolved[internal], minlength=count)
+    is_broken_edge = broken[resolved] & internal
+    broken_links = np.bincount(sources[is_broken_edge], minlength=count)
+
+    depth = click_depth(graph, final)
+    rank = pagerank(graph, final, crawled)
+
+    seeds = np.zeros(count, dtype=bool)
+    seeds[final[graph.seeds]] = True
+    orphans = np.flatnonzero(crawled & (inlinks == 0) & ~seeds)
+
+    chains = []
+    redirecting = graph.redirect >= 0
+    # Chains start at redirecting URLs nothing else redirects to, or anywhere in a loop
+    redirected_to = np.zeros(count, dtype=bool)
+    redirected_to[graph.redirect[redirecting]] = True
+    looping = redirecting & (final == np.arange(count))
+    starts = np.flatnonzero(redirecting & (~redirected_to | looping))
+    in_listed_loop = set()
+    for start in starts:
+        if len(chains) >= max_listed:
+            break
+        if start in in_listed_loop:
+            continue
+        chain, node = [int(start)], int(graph.redirect[start])
+        while node >= 0 and node not in chain and len(chain) <= MAX_REDIRECT_HOPS:
+            chain.append(node)
+            node = int(graph.redirect[node])
+        if looping[start]:
+            in_listed_loop.update(chain)
+        chains.append({
+            "urls": [graph.urls[i] for i in chain],
+            "statuses": [int(graph.status[i]) for i in chain],
+            "loop": node in chain,
+        })
+
+    broken_edges = np.flatnonzero(is_broken_edge)[:max_listed]
+    top = np.argsort(-rank)[:min(top_pages, int(crawled.sum()))]
+    reachable = depth >= 0
+
+    summary = {
+        "pages": int(crawled.sum()),
+        "nodes": count,
+        "links": int(internal.sum()),
+        "broken_link_count": int(is_broken_edge.sum()),
+        "broken_links": [
+            {"source": graph.urls[sources[i]], "target": graph.urls[graph.indices[i]], "status": int(graph.status[resolved[i]])}
+            for i in broken_edges
+        ],
+        "orphan_count": len(orphans),
+        "orphans": [graph.urls[i] for i in orphans[:max_listed]],
+        "redirect_chain_count": int((redirecting & ~redirected_to).sum()) + sum(chain["loop"] for chain in chains),
+        "redirect_chains": chains,
+        "max_click_depth": int(depth.max()) if reachable.any() else None,
+        "click_depth_histogram": np.bincount(depth[reachable & crawled]).tolist() if reachable.any() else [],
+        "top_pages": [{"url": graph.urls[i], "pagerank": float(rank[i]), "inlinks": int(inlinks[i])} for i in top],
+    }
+    per_page = {"inlinks": inlinks, "broken_links": broken_links, "click_depth": depth, "pagerank": rank}
+    return per_page, summary
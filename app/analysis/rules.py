@@ -0,0 +1,227 @@
+import numpy as np
+
+from core.config import settings
+
+# Numeric page features stored with every crawl result, so pages can be
+# re-scored later without fetching or parsing them again
+NUMERIC_FEATURES = (
+    "title_length",
+    "meta_description_length",
+    "h1_count",
+    "image_count",
+    "images_missing_alt",
+    "word_count",
+)
+
+# Features derived from the stored url/canonical columns
+DERIVED_FEATURES = ("has_canonical", "canonical_is_self")
+
+FEATURES = NUMERIC_FEATURES + DERIVED_FEATURES
+
+# Columns a row needs for FeatureTable.from_rows
+FEATURE_COLUMNS = NUMERIC_FEATURES + ("url", "canonical")
+
+
+class FeatureTable:
+    """
+    Column-oriented page features: one NumPy array per feature, one entry per page.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Builds the table from crawl result rows (dicts or DB rows) carrying FEATURE_COLUMNS.
+        """
+        rows = [row if isinstance(row, dict) else row._mapping for row in rows]
+        count = len(rows)
+        columns = {
+            name: np.array([row[name] or 0 for row in rows], dtype=np.int32)
+            for name in NUMERIC_FEATURES
+        }
+        # Canonicals are stored as absolute URLs, so a plain comparison will do
+        canonicals = [row["canonical"] for row in rows]
+        columns["has_canonical"] = np.fromiter(map(bool, canonicals), dtype=bool, count=count)
+        columns["canonical_is_self"] = np.fromiter(
+            (canonical == row["url"] for row, canonical in zip(rows, canonicals)),
+            dtype=bool,
+            count=count,
+        )
+        return cls(columns)
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+
+class Rule:
+    """
+    A single SEO check. `check` takes the declared feature arrays as keyword
+    arguments and returns a boolean array marking the pages with the issue.
+    """
+
+    def __init__(self, name, message, penalty, features, check):
+        unknown = set(features) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Rule {name} uses unknown features: {', '.join(sorted(unknown))}")
+
+        self.name = name
+        self.message = message
+        self.penalty = penalty
+        self.features = tuple(features)
+        self.check = check
+
+    def evaluate(self, table):
+        return np.asarray(self.check(**{feature: table[feature] for feature in self.features}), dtype=bool)
+
+
+class ScoreResult:
+    """
+    Scores for a batch of pages plus the page x rule issue matrix behind them.
+    """
+
+    def __init__(self, rules, issues, scores):
+        self.rules = rules
+        self.issues = issues
+        self.scores = scores
+
+    def evaluations(self):
+        """
+        Returns the comma-joined issue messages of each page, as stored in seo_evaluation.
+        """
+        # Pages share a handful of issue combinations; build each string once
+        combinations, page_combination = np.unique(self.issue_masks(), return_inverse=True)
+        texts = []
+        for mask in combinations.tolist():
+            found = [rule.message for i, rule in enumerate(self.rules) if mask >> i & 1]
+            texts.append(", ".join(found) if found else "No Issues")
+        return [texts[i] for i in page_combination.tolist()]
+
+    def issue_masks(self):
+        """
+        Returns one integer per page with bit i set when the page has issue i.
+        """
+        bits = np.left_shift(np.uint64(1), np.arange(len(self.rules), dtype=np.uint64))
+        return np.bitwise_or.reduce(np.where(self.issues, bits, np.uint64(0)), axis=1)
+
+
+class RuleRegistry:
+    """
+    The set of rules pages are scored against; scoring runs over a whole batch at once.
+    """
+
+    def __init__(self, base_score=100):
+        self.base_score = base_score
+        self.rules = []
+
+    def rule(self, message, penalty, features):
+        """
+        Decorator registering a check function as a rule, named after the function.
+        """
+        def register(check):
+            self.add(Rule(check.__name__, message, penalty, features, check))
+            return check
+        return register
+
+    def add(self, rule):
+        # Issue sets are packed into a 64-bit mask per page
+        if len(self.rules) >= 64:
+            raise ValueError("A rule registry holds at most 64 rules")
+        if any(existing.name == rule.name for existing in self.rules):
+            raise ValueError(f"Rule {rule.name} is already registered")
+        self.rules.append(rule)
+
+    def score(self, table):
+        issues = np.zeros((len(table), len(self.rules)), dtype=bool)
+        for i, rule in enumerate(self.rules):
+            issues[:, i] = rule.evaluate(table)
+
+        penalties = np.array([rule.penalty for rule in self.rules], dtype=np.int32)
+        scores = np.maximum(self.base_score - issues.astype(np.int32) @ penalties, 0)
+        return ScoreResult(self.rules, issues, scores)
+
+    def score_rows(self, rows):
+        """
+        Scores crawl result rows in place, filling seo_score, seo_evaluation
+        and issues.
+        """
+        if not rows:
+            return None
+
+        result = self.score(FeatureTable.from_rows(rows))
+        # Stored as a signed BIGINT: bit 63 wraps to the sign bit
+        masks = result.issue_masks().astype(np.int64).tolist()
+        for row, score, evaluation, mask in zip(rows, result.scores.tolist(), result.evaluations(), masks):
+            row["seo_score"] = score
+            row["seo_evaluation"] = evaluation
+            row["issues"] = mask
+        return result
+
+
+# Default rule set used by the crawl pipeline
+RULES = RuleRegistry()
+
+
+@RULES.rule("Missing Title (Critical Issue)", penalty=25, features=("title_length",))
+def missing_title(title_length):
+    return title_length == 0
+
+
+@RULES.rule("Title Too Long (Minor Issue)", penalty=5, features=("title_length",))
+def title_too_long(title_length):
+    return title_length > 60
+
+
+@RULES.rule("Title Too Short (Minor Issue)", penalty=5, features=("title_length",))
+def title_too_short(title_length):
+    return (title_length > 0) & (title_length < 30)
+
+
+@RULES.rule("Missing Meta Description (Critical Issue)", penalty=25, features=("meta_description_length",))
+def missing_meta_description(meta_description_length):
+    return meta_description_length == 0
+
+
+@RULES.rule("Meta Description Too Long (Minor Issue)", penalty=5, features=("meta_description_length",))
+def meta_description_too_long(meta_description_length):
+    return meta_description_length > 160
+
+
+@RULES.rule("Meta Description Too Short (Minor Issue)", penalty=5, features=("meta_description_length",))
+def meta_description_too_short(meta_description_length):
+    return (meta_description_length > 0) & (meta_description_length < 50)
+
+
+@RULES.rule("Multiple H1 Tags (Moderate Issue)", penalty=15, features=("h1_count",))
+def multiple_h1(h1_count):
+    return h1_count > 1
+
+
+@RULES.rule("Missing H1 Tag (Critical Issue)", penalty=25, features=("h1_count",))
+def missing_h1(h1_count):
+    return h1_count == 0
+
+
+@RULES.rule("Images Missing Alt Text (Minor Issue)", penalty=5, features=("image_count", "images_missing_alt"))
+def images_missing_alt(image_count, images_missing_alt):
+    # Flag pages where more than a tenth of the images lack alt text
+    return images_missing_alt * 10 > image_count
+
+
+@RULES.rule("Low Word Count (Moderate Issue)", penalty=10, features=("word_count",))
+def low_word_count(word_count):
+    return word_count < settings.THIN_CONTENT_WORDS
+
+
+@RULES.rule("Missing Canonical Tag (Minor Issue)", penalty=5, features=("has_canonical",))
+def missing_canonical(has_canonical):
+    return ~has_canonical
+
+
+@RULES.rule("Canonical Points To Another URL (Notice)", penalty=0, features=("has_canonical", "canonical_is_self"))
+def canonicalised(has_canonical, canonical_is_self):
+    return has_canonical & ~canonical_is_self
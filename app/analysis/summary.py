@@ -0,0 +1,116 @@
+from bisect import bisect_right
+from collections import Counter
+
+# Site report figures kept per crawl as its pages are stored (crawling.summary),
+# so GET /crawl/{task_id}/summary never scans crawl_results. Plain Python: the
+# API builds its reports from here.
+
+# Histograms, by metric; a page counts in one bucket of each, named by its
+# lower bound, except for issues, where it counts once per issue code it has
+ISSUE = "issue"
+SEO_SCORE = "seo_score"
+WORD_COUNT = "word_count"
+DEPTH = "depth"
+
+SEO_SCORE_BOUNDS = (0, 10, 20, 30, 40, 50, 60, 70, 80, 90)  # 100 falls in 90-100
+WORD_COUNT_BOUNDS = (0, 1, 100, 200, 300, 500, 1000, 2000, 5000, 10000)
+DEPTH_BOUNDS = tuple(range(21))  # Pages deeper than 20 count as 20+
+
+# Columns a stored row needs for aggregate()
+AGGREGATED_COLUMNS = ("task_id", "project_id", "seo_score", "word_count", "depth", "issues")
+
+_MASK_BITS = 2 ** 64 - 1
+
+
+def bucket(value, bounds):
+    return bounds[max(bisect_right(bounds, value) - 1, 0)]
+
+
+def issue_codes(mask):
+    """
+    The issue codes (bit positions) set in a crawl_results.issues mask.
+    """
+    mask = (mask or 0) & _MASK_BITS  # Bit 63 makes the stored BIGINT negative
+    codes = []
+    while mask:
+        lowest = mask & -mask
+        codes.append(lowest.bit_length() - 1)
+        mask ^= lowest
+    return codes
+
+
+def aggregate(rows):
+    """
+    Totals and histogram counts of stored crawl result rows (dicts or DB rows
+    with AGGREGATED_COLUMNS), by crawl: {task_id: (project_id, totals)} and
+    Counter({(task_id, metric, bucket): pages}). Rows outside a crawl are skipped.
+    """
+    totals = {}
+    histograms = Counter()
+    for row in rows:
+        row = row if isinstance(row, dict) else row._mapping
+        task_id = row["task_id"]
+        if task_id is None:
+            continue
+        score = row["seo_score"] or 0
+        word_count = row["word_count"] or 0
+        if task_id not in totals:
+            totals[task_id] = (row["project_id"], Counter())
+        crawl = totals[task_id][1]
+        crawl["pages"] += 1
+        crawl["score_sum"] += score
+        crawl["word_count_sum"] += word_count
+
+        histograms[task_id, SEO_SCORE, bucket(score, SEO_SCORE_BOUNDS)] += 1
+        histograms[task_id, WORD_COUNT, bucket(word_count, WORD_COUNT_BOUNDS)] += 1
+        histograms[task_id, DEPTH, bucket(row["depth"] or 0, DEPTH_BOUNDS)] += 1
+        codes = issue_codes(row["issues"])
+        crawl["clean_pages"] += not codes
+        for code in codes:
+            histograms[task_id, ISSUE, code] += 1
+    return totals, histograms
+
+
+def _distribution(counts, bounds, top=None):
+    distribution = []
+    for i, lower in enumerate(bounds):
+        if i + 1 < len(bounds):
+            upper = bounds[i + 1] - 1
+            label = str(lower) if upper == lower else f"{lower}-{upper}"
+        else:
+            label = f"{lower}-{top}" if top is not None else f"{lower}+"
+        distribution.append({"range": label, "pages": counts.get(lower, 0)})
+    return distribution
+
+
+def site_report(summary, histograms, codes):
+    """
+    A crawl's site report from its crawl_summaries row, its crawl_histograms
+    rows [(metric, bucket, pages)] and the issue codes {code: (name, message)}.
+    """
+    by_metric = {}
+    for metric, lower, pages in histograms:
+        by_metric.setdefault(metric, {})[lower] = pages
+
+    pages = summary.pages
+    issues = sorted(by_metric.get(ISSUE, {}).items(), key=lambda item: (-item[1], item[0]))
+    return {
+        "pages": pages,
+        "average_seo_score": round(summary.score_sum / pages, 2) if pages else None,
+        "average_word_count": round(summary.word_count_sum / pages, 1) if pages else None,
+        "pages_without_issues": summary.clean_pages,
+        "issues": [
+            {
+                "code": code,
+                "name": codes.get(code, (f"issue_{code}", None))[0],
+                "message": codes.get(code, (None, None))[1],
+                "pages": count,
+                "share": round(count / pages, 4) if pages else 0,
+            }
+            for code, count in issues
+        ],
+        "seo_score_distribution": _distribution(by_metric.get(SEO_SCORE, {}), SEO_SCORE_BOUNDS, top=100),
+        "word_count_distribution": _distribution(by_metric.get(WORD_COUNT, {}), WORD_COUNT_BOUNDS),
+        "depth_distribution": _distribution(by_metric.get(DEPTH, {}), DEPTH_BOUNDS),
+        "updated_at": summary.updated_at,
+    }
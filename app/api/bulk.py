@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+
+# Content types POST /start_crawls/file reads, by format
+FILE_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+def parse_crawl_file(body, content_type):
+    """
+    Reads crawl specs from an uploaded file: CSV with a header row naming
+    CrawlRequest fields (path_budgets as a JSON object), or one JSON object
+    per line. Returns [(line number, spec dict)]; empty CSV cells are left
+    out so the fields keep their defaults. Raises ValueError for other
+    content types, undecodable files and malformed lines.
+    """
+    file_format = FILE_FORMATS.get((content_type or "").split(";")[0].strip().lower())
+    if file_format is None:
+        raise ValueError(f"Unsupported content type {content_type!r}; use one of {', '.join(FILE_FORMATS)}")
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("The file is not UTF-8")
+
+    specs = []
+    if file_format == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        for row in reader:
+            line = reader.line_num
+            spec = {name.strip(): value.strip() for name, value in row.items() if name and value and value.strip()}
+            if "path_budgets" in spec:
+                try:
+                    spec["path_budgets"] = json.loads(spec["path_budgets"])
+                except ValueError:
+                    raise ValueError(f"Line {line}: path_budgets is not a JSON object")
+            specs.append((line, spec))
+        return specs
+
+    for line, raw in enumerate(text.splitlines(), 1):
+        if not raw.strip():
+            continue
+        try:
+            spec = json.loads(raw)
+        except ValueError as e:
+            raise ValueError(f"Line {line}: {e}")
+        if not isinstance(spec, dict):
+            raise ValueError(f"Line {line}: expected a JSON object")
+        specs.append((line, spec))
+    return specs
@@ -0,0 +1,39 @@
+import json
+import time
+
+from core.config import settings
+from core.events import TERMINAL_EVENTS, event_stream_key
+
+
+def format_sse(event_id, fields):
+    return f"id: {event_id}\nevent: {fields.get('event', 'message')}\ndata: {json.dumps(fields)}\n\n"
+
+
+async def stream_events(client, task_id, last_id="0", heartbeat=None, max_idle=None, finished=False):
+    """
+    Yields a crawl's progress events as Server-Sent Events, starting after
+    `last_id` ("0" replays every kept event), until the crawl's terminal event.
+    Sends a comment every `heartbeat` seconds without events so proxies keep
+    the connection open, and gives up after `max_idle` seconds without any.
+    For a `finished` crawl, only the events still kept are sent: its terminal
+    event may have expired already.
+    """
+    key = event_stream_key(task_id)
+    block = None if finished else int((heartbeat or settings.EVENTS_HEARTBEAT) * 1000)
+    max_idle = max_idle or settings.EVENTS_MAX_IDLE
+    idle_since = time.monotonic()
+
+    while True:
+        response = await client.xread({key: last_id}, count=100, block=block)
+        if not response:
+            if finished or time.monotonic() - idle_since >= max_idle:
+                return
+            yield ": keep-alive\n\n"
+            continue
+
+        idle_since = time.monotonic()
+        for event_id, fields in response[0][1]:
+            last_id = event_id
+            yield format_sse(event_id, fields)
+            if fields.get("event") in TERMINAL_EVENTS:
+                return
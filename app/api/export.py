@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+from importlib.util import find_spec
+
+from sqlalchemy import DateTime, Float, Integer, LargeBinary
+
+from models.crawl_results import CrawlResult
+
+# Parquet export is optional; pyarrow is only imported once one runs
+PARQUET_AVAILABLE = find_spec("pyarrow") is not None
+
+# Columns returned when the caller doesn't pick any with `fields`
+DEFAULT_FIELDS = (
+    "id", "url", "title", "meta_description", "canonical", "word_count",
+    "seo_score", "seo_evaluation", "change_status", "created_at",
+)
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parse_fields(fields):
+    """
+    Turns a comma-separated `fields` parameter into a list of crawl_results
+    columns, always starting with the id. Raises ValueError for unknown columns.
+    """
+    names = [name.strip() for name in fields.split(",") if name.strip()] if fields else list(DEFAULT_FIELDS)
+    unknown = [name for name in names if name not in CrawlResult.__table__.c]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [name for name in names if name != "id"]
+
+
+def stream_export(db_engine, query, fields, export_format, chunk_size):
+    """
+    Yields the export of `query` in chunks, reading it through a server-side
+    cursor `chunk_size` rows at a time, so memory use doesn't grow with the crawl.
+    """
+    with db_engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        yield from ENCODERS[export_format](result.partitions(), fields)
+
+
+def _json_value(value):
+    if isinstance(value, bytes):
+        return value.hex()
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def encode_ndjson(partitions, fields):
+    for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(fields, row)), default=_json_value) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+def encode_csv(partitions, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for rows in partitions:
+        writer.writerows([value.hex() if isinstance(value, bytes) else value for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _arrow_type(column):
+    import pyarrow
+
+    if isinstance(column.type, Integer):
+        return pyarrow.int64()
+    if isinstance(column.type, Float):
+        return pyarrow.float64()
+    if isinstance(column.type, DateTime):
+        return pyarrow.timestamp("us", tz="UTC")
+    if isinstance(column.type, LargeBinary):
+        return pyarrow.binary()
+    return pyarrow.string()  # Text, String and UUID
+
+
+def encode_parquet(partitions, fields):
+    import pyarrow
+    import pyarrow.parquet
+
+    # One row group per chunk; the schema comes from the table, not the data
+    schema = pyarrow.schema([(name, _arrow_type(CrawlResult.__table__.c[name])) for name in fields])
+    to_string = [pyarrow.types.is_string(field.type) for field in schema]
+
+    sink = io.BytesIO()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    for rows in partitions:
+        columns = [
+            [None if value is None else str(value) for value in values] if as_string else list(values)
+            for values, as_string in zip(zip(*rows), to_string)
+        ]
+        writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema,
+        ))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+
+    writer.close()
+    yield sink.getvalue()
+
+
+ENCODERS = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+    "parquet": encode_parquet,
+}
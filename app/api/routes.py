@@ -1,137 +1,472 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel
-from celery.result import AsyncResult
-from database.session import get_db, SessionLocal
-from models.crawl_results import CrawlResult, CrawlTask
-from crawling.tasks import seo_crawler_task
+from pydantic import BaseModel, Field, ValidationError
+from typing import Dict, List, Optional
+from api import events, export
+from api.bulk import parse_crawl_file
+from core.cache import CRAWL_RESULT_CACHE, STATUS_CACHE, TASK_RESULT_CACHE, etag_matches, get_result_cache
+from core.config import settings
+from core.events import TERMINAL_EVENTS, cancel_key
+from core.redis_client import get_async_redis
+from core.task_client import enqueue_crawl, enqueue_crawls, task_result
+from database.session import AsyncSessionLocal, get_async_db, engine
+from analysis.clusters import clusters
+from analysis.summary import site_report
+from models.crawl_results import CrawlGraph, CrawlHistogram, CrawlResult, CrawlSummary, CrawlTask, IssueCode, NearDuplicate
 from api.dependencies import verify_token
+import json
+import re
+import time
 import uuid
 
 # Create a router instance
 router = APIRouter()
 
-# Dependency for database session
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        await db.close()
+# Celery task results that never change again
+FINAL_TASK_STATUSES = ("completed", "failed")
+
+# Serves a JSON result through the result cache, with an ETag; 304 when the client has it already.
+# Results `cacheable` rejects are served as they are, uncached and without an ETag
+async def cached_json(request: Request, namespace: str, key, load, tags=(), cacheable=None):
+    async def render():
+        payload = jsonable_encoder(await load())
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+    etag, body = await get_result_cache().get_or_load(namespace, key, render, tags=tags, cacheable=cacheable)
+    if cacheable is not None and not cacheable(body):
+        # Still changing (e.g. a pending task): nothing for clients to keep
+        return Response(body, media_type="application/json", headers={"Cache-Control": "no-store"})
+    # Clients may keep the result but have to revalidate it on every use
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 # Request model for starting a crawl
 class CrawlRequest(BaseModel):
     url: str
     depth: int = 1  # Depth level to crawl
     user_agent: str = "CrawlBot"  # Ideally get this from config
+    workers: int = 1  # Number of Celery workers that crawl the site together
+    project_id: Optional[str] = None  # Project of an earlier crawl, to re-audit the same site
+    incremental: bool = False  # Only process pages that changed since the project's last crawl
+    # Crawl budget; the crawl stops at whichever limit it reaches first (defaults: CRAWL_MAX_*)
+    max_pages: Optional[int] = Field(None, gt=0)
+    max_bytes: Optional[int] = Field(None, gt=0)
+    max_seconds: Optional[int] = Field(None, gt=0)
+    path_budgets: Dict[str, int] = {}  # Max URLs followed per URL regex, e.g. {"/calendar/": 100}
+    priority: Optional[int] = Field(None, ge=0, le=9)  # Queue priority, 0 first; derived from max_pages if unset
+    sitemaps: bool = False  # Also crawl the pages the site's sitemaps list (from robots.txt or /sitemap.xml)
+
+# Request model for starting many crawls at once
+class BulkCrawlRequest(BaseModel):
+    crawls: List[CrawlRequest] = Field(..., min_items=1)
+
+# Queue priority for a crawl: the smaller its page budget, the sooner it runs
+def crawl_priority(request: CrawlRequest):
+    if request.priority is not None:
+        return request.priority
+    if request.max_pages is None:
+        return settings.CRAWL_DEFAULT_PRIORITY
+    for max_pages, priority in ((100, 0), (1000, 3), (10000, 6)):
+        if request.max_pages <= max_pages:
+            return priority
+    return 9
+
+def validate_path_budgets(request: CrawlRequest):
+    for pattern in request.path_budgets:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid path budget pattern {pattern!r}: {e}")
+
+# Arguments of the seo_crawler_task running a crawl
+def crawl_task_args(task_id: str, request: CrawlRequest):
+    budget = {
+        "max_pages": request.max_pages,
+        "max_bytes": request.max_bytes,
+        "max_seconds": request.max_seconds,
+        "path_budgets": request.path_budgets,
+    }
+    return (task_id, request.url, request.depth, request.user_agent, request.workers,
+            request.project_id, request.incremental, budget, request.sitemaps)
 
 # Endpoint to start a crawl
 @router.post("/start_crawl")
-async def start_crawl(request: CrawlRequest, token: str = Depends(verify_token), db: AsyncSession = Depends(get_db)):
+async def start_crawl(request: CrawlRequest, token: str = Depends(verify_token), db: AsyncSession = Depends(get_async_db)):
     """
     Initiates a new crawl with the given URL and depth.
+    The crawl is queued by priority and stops early once it exhausts its budget.
     """
+    validate_path_budgets(request)
+
     # Generate a unique task ID
     task_id = str(uuid.uuid4())
     
     # Store the new crawl task in the database
-    new_task = CrawlTask(id=task_id, url=request.url, depth=request.depth, status="pending")
+    new_task = CrawlTask(id=uuid.UUID(task_id), url=request.url, depth=request.depth, status="pending")
     db.add(new_task)
     await db.commit()
 
     # Call the Celery task to start the SEO crawl
-    seo_crawler_task.delay(task_id, request.url, request.depth, request.user_agent)
+    enqueue_crawl(crawl_task_args(task_id, request), crawl_priority(request))
 
     # Call the Celery task to start the crawl
     # start_crawl_task.delay(task_id, request.url, request.depth, request.user_agent)
 
     return {"message": f"Crawl initiated for {request.url}", "task_id": task_id}
 
+async def queue_crawls(crawls: List[CrawlRequest], db: AsyncSession):
+    """
+    Stores a batch of crawls in one multi-row INSERT and one commit, then
+    queues them as Celery groups of BULK_CRAWL_PUBLISH_CHUNK, each published
+    over a single broker connection. Crawls that could not be queued are
+    marked failed.
+    """
+    if len(crawls) > settings.BULK_CRAWL_MAX_CRAWLS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_CRAWL_MAX_CRAWLS} crawls per call")
+    for crawl in crawls:
+        validate_path_budgets(crawl)
+
+    batch_id = uuid.uuid4()
+    task_ids = [uuid.uuid4() for _ in crawls]
+    await db.execute(insert(CrawlTask), [
+        {"id": task_id, "url": crawl.url, "depth": crawl.depth, "status": "pending", "batch_id": batch_id}
+        for task_id, crawl in zip(task_ids, crawls)
+    ])
+    await db.commit()
+
+    queued = 0
+    chunk_size = settings.BULK_CRAWL_PUBLISH_CHUNK
+    try:
+        for start in range(0, len(crawls), chunk_size):
+            chunk = [
+                (crawl_task_args(str(task_id), crawl), crawl_priority(crawl))
+                for task_id, crawl in zip(task_ids[start:start + chunk_size], crawls[start:start + chunk_size])
+            ]
+            # Publishing blocks on the broker; keep it off the event loop
+            await run_in_threadpool(enqueue_crawls, chunk)
+            queued = min(start + chunk_size, len(crawls))
+    except Exception as e:
+        await db.execute(
+            update(CrawlTask).where(CrawlTask.id.in_(task_ids[queued:]))
+            .values(status="failed", result=json.dumps({"status": "failed", "error": f"Could not queue the crawl: {e}"}))
+        )
+        await db.commit()
+        await get_result_cache().invalidate(STATUS_CACHE, task_ids[queued:])
+        raise HTTPException(status_code=503, detail={
+            "message": f"Queued {queued} of {len(crawls)} crawls; the rest are marked failed",
+            "batch_id": str(batch_id),
+        })
+
+    return {
+        "message": f"{len(crawls)} crawls initiated",
+        "batch_id": batch_id,
+        "task_ids": task_ids,  # In the order of the crawls
+    }
+
+# Endpoint to start many crawls at once
+@router.post("/start_crawls")
+async def start_crawls(request: BulkCrawlRequest, token: str = Depends(verify_token), db: AsyncSession = Depends(get_async_db)):
+    """
+    Initiates a batch of crawls. Returns the batch ID to follow their
+    progress with, and each crawl's task ID.
+    """
+    return await queue_crawls(request.crawls, db)
+
+# Endpoint to start the crawls listed in an uploaded CSV or JSON lines file
+@router.post("/start_crawls/file")
+async def start_crawls_from_file(request: Request, token: str = Depends(verify_token), db: AsyncSession = Depends(get_async_db)):
+    """
+    Initiates the crawls in the request body, sent as text/csv (a header row
+    naming CrawlRequest fields) or application/x-ndjson (one crawl per line).
+    """
+    try:
+        specs = parse_crawl_file(await request.body(), request.headers.get("content-type"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not specs:
+        raise HTTPException(status_code=400, detail="The file lists no crawls")
+
+    crawls = []
+    for line, spec in specs:
+        try:
+            crawls.append(CrawlRequest.parse_obj(spec))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail={"line": line, "errors": e.errors()})
+    return await queue_crawls(crawls, db)
+
+# Aggregate progress of a batch of crawls
+@router.get("/crawl_batches/{batch_id}")
+async def get_batch_progress(batch_id: uuid.UUID, db: AsyncSession = Depends(get_async_db), token: str = Depends(verify_token)):
+    """
+    Counts the batch's crawls by status; progress is the share that finished
+    (completed, failed or cancelled).
+    """
+    rows = (await db.execute(
+        select(CrawlTask.status, func.count()).where(CrawlTask.batch_id == batch_id).group_by(CrawlTask.status)
+    )).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    statuses = {status: count for status, count in rows}
+    total = sum(statuses.values())
+    finished = sum(count for status, count in statuses.items() if status in TERMINAL_EVENTS)
+    return {
+        "batch_id": batch_id,
+        "total": total,
+        "finished": finished,
+        "progress": round(finished / total, 4),
+        "statuses": statuses,
+    }
+
 # Endpoint to get the status of a crawl
 @router.get("/status/{task_id}")
-async def get_status(task_id: str, db: AsyncSession = Depends(get_db), token: str = Depends(verify_token)):
+async def get_status(task_id: uuid.UUID, request: Request, db: AsyncSession = Depends(get_async_db), token: str = Depends(verify_token)):
     """
     Retrieves the status of the crawl by task_id.
+    Cached until the task's status changes.
     """
-    # Query the task status from the database
-    task = await db.get(CrawlTask, task_id)
+    async def load():
+        # Query the task status from the database
+        task = await db.get(CrawlTask, task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        return {"task_id": task_id, "status": task.status}
+
+    return await cached_json(request, STATUS_CACHE, task_id, load)
+
+# Stream a crawl's progress as Server-Sent Events
+@router.get("/crawl/{task_id}/events")
+async def crawl_events(task_id: uuid.UUID, last_event_id: Optional[str] = Header(None), token: str = Depends(verify_token)):
+    """
+    Streams the crawl's progress events (started, progress, closed, then
+    completed or failed) as they are published. Reconnecting clients resume
+    after their Last-Event-ID. The stream ends with the crawl's terminal
+    event, or after EVENTS_MAX_IDLE seconds without events.
+    """
+    # Its own short session: a get_async_db one would stay checked out for as long as the stream is open
+    async with AsyncSessionLocal() as db:
+        task = await db.get(CrawlTask, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    return {"task_id": task_id, "status": task.status}
+    return StreamingResponse(
+        events.stream_events(get_async_redis(), str(task_id), last_event_id or "0", finished=task.status in TERMINAL_EVENTS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # Endpoint to stop a crawl (future implementation)
 @router.post("/stop_crawl/{task_id}")
-async def stop_crawl(task_id: str, token: str = Depends(verify_token), db: AsyncSession = Depends(get_db)):
+async def stop_crawl(task_id: uuid.UUID, token: str = Depends(verify_token), db: AsyncSession = Depends(get_async_db)):
     """
     Stops an ongoing crawl with the given task_id.
+    Its workers notice within CANCEL_POLL_INTERVAL, store what they have
+    buffered and finish the task with the status "cancelled".
     """
     task = await db.get(CrawlTask, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    if task.status in TERMINAL_EVENTS:
+        return {"message": f"Crawl {task_id} has already finished ({task.status})."}
 
-    task.status = "stopped"
+    # Flag the crawl in Redis; running (and still queued) spiders poll it
+    await get_async_redis().set(cancel_key(str(task_id)), time.time(), ex=settings.CANCEL_TTL)
+
+    task.status = "stopping"
     await db.commit()
+    await get_result_cache().invalidate(STATUS_CACHE, [task_id])
+
+    return {"message": f"Crawl {task_id} is stopping."}
+
+# Whole-site link analysis of a finished crawl
+@router.get("/crawl/{task_id}/links")
+async def get_link_analysis(task_id: uuid.UUID, db: AsyncSession = Depends(get_async_db), token: str = Depends(verify_token)):
+    """
+    Returns the crawl's link analysis: broken links, orphan pages, redirect
+    chains, click depths and the pages with the highest internal PageRank.
+    Per-page figures are on the crawl results (inlinks, broken_links,
+    click_depth, pagerank).
+    """
+    graph = await db.get(CrawlGraph, task_id)
+    if not graph:
+        raise HTTPException(status_code=404, detail="No link analysis for this crawl")
+
+    return {"task_id": task_id, "nodes": graph.nodes, "edges": graph.edges, **json.loads(graph.summary)}
+
+# Near-duplicate and thin content of a crawl
+@router.get("/crawl/{task_id}/duplicates")
+async def get_duplicates(task_id: uuid.UUID, limit: int = 100, db: AsyncSession = Depends(get_async_db),
+                         token: str = Depends(verify_token)):
+    """
+    Returns the crawl's clusters of near-duplicate pages, largest first (up
+    to `limit` clusters), and how many pages are thin content. Clusters are
+    found as the crawl stores its pages, so a running crawl's are partial.
+    """
+    pairs = (await db.execute(
+        select(NearDuplicate.page_id, NearDuplicate.duplicate_id).where(NearDuplicate.task_id == task_id)
+    )).all()
+    groups = clusters(pairs)
+    shown = groups[:max(1, min(limit, settings.CRAWL_RESULTS_MAX_PAGE_SIZE))]
+
+    table = CrawlResult.__table__
+    page_ids = [page_id for group in shown for page_id in group]
+    pages = {}
+    for start in range(0, len(page_ids), 1000):
+        rows = await db.execute(
+            select(table.c.id, table.c.url, table.c.title, table.c.word_count)
+            .where(table.c.id.in_(page_ids[start:start + 1000]))
+        )
+        pages.update((row.id, dict(row._mapping)) for row in rows)
+
+    thin_pages = (await db.execute(
+        select(func.count()).select_from(table).where(table.c.task_id == task_id, table.c.word_count < settings.THIN_CONTENT_WORDS)
+    )).scalar()
+
+    return {
+        "task_id": task_id,
+        "cluster_count": len(groups),
+        "duplicate_pages": sum(len(group) for group in groups),
+        "thin_pages": thin_pages,
+        "thin_content_words": settings.THIN_CONTENT_WORDS,
+        "clusters": [{"size": len(group), "pages": [pages[page_id] for page_id in group if page_id in pages]} for group in shown],
+    }
+
+# Site report of a crawl, from its precomputed aggregates
+@router.get("/crawl/{task_id}/summary")
+async def get_crawl_summary(task_id: uuid.UUID, lowest_scoring: int = 10, db: AsyncSession = Depends(get_async_db),
+                            token: str = Depends(verify_token)):
+    """
+    Returns the crawl's site report: page count, average SEO score and word
+    count, pages per issue, score, word count and depth distributions, and
+    its `lowest_scoring` pages. Built from the totals the pipeline keeps per
+    crawl (crawling.summary), so it costs the same for any crawl size; a
+    running crawl's report covers the pages stored so far.
+    """
+    summary = await db.get(CrawlSummary, task_id)
+    if not summary:
+        raise HTTPException(status_code=404, detail="No pages stored for this crawl")
+
+    histograms = (await db.execute(
+        select(CrawlHistogram.metric, CrawlHistogram.bucket, CrawlHistogram.pages).where(CrawlHistogram.task_id == task_id)
+    )).all()
+    codes = {row.code: (row.name, row.message) for row in await db.execute(select(IssueCode.code, IssueCode.name, IssueCode.message))}
+
+    table = CrawlResult.__table__
+    lowest = await db.execute(
+        select(table.c.id, table.c.url, table.c.seo_score)
+        .where(table.c.task_id == task_id, table.c.seo_score.is_not(None))
+        .order_by(table.c.seo_score)
+        .limit(max(0, min(lowest_scoring, settings.CRAWL_RESULTS_MAX_PAGE_SIZE)))
+    )
 
-    return {"message": f"Crawl {task_id} has been stopped."}
+    return {
+        "task_id": task_id,
+        "project_id": summary.project_id,
+        **site_report(summary, histograms, codes),
+        "lowest_scoring_pages": [dict(row._mapping) for row in lowest],
+    }
 
 # Get a single crawl result by ID
 @router.get("/crawl_result/{id}")
-async def get_crawl_result(id: str, db: AsyncSession = Depends(get_db), token: str = Depends(verify_token)):
+async def get_crawl_result(id: uuid.UUID, request: Request, db: AsyncSession = Depends(get_async_db), token: str = Depends(verify_token)):
     """
     Retrieves a single crawl result by its ID.
+    Cached under its project, until the project is re-scored.
     """
-    crawl_result = await db.get(CrawlResult, id)
-    if not crawl_result:
-        raise HTTPException(status_code=404, detail="Crawl result not found")
+    crawl_result = None
+
+    async def load():
+        nonlocal crawl_result
+        crawl_result = await db.get(CrawlResult, id)
+        if not crawl_result:
+            raise HTTPException(status_code=404, detail="Crawl result not found")
+        return {name: getattr(crawl_result, name) for name in export.DEFAULT_FIELDS}
+
+    return await cached_json(request, CRAWL_RESULT_CACHE, id, load, tags=lambda: [crawl_result.project_id])
+
+# Selects the requested columns of a project's crawl results, in id order
+def crawl_results_query(project_id: uuid.UUID, task_id: Optional[uuid.UUID], fields: Optional[str]):
+    try:
+        columns = export.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    table = CrawlResult.__table__
+    query = select(*(table.c[name] for name in columns)).where(table.c.project_id == project_id)
+    if task_id is not None:
+        query = query.where(table.c.task_id == task_id)
+    return query.order_by(table.c.id), columns
+
+# Get a project's crawl results, a page at a time
+@router.get("/crawl_results")
+async def get_all_crawl_results(project_id: uuid.UUID, task_id: Optional[uuid.UUID] = None, after: Optional[uuid.UUID] = None,
+                                limit: int = 100, fields: Optional[str] = None,
+                                db: AsyncSession = Depends(get_async_db), token: str = Depends(verify_token)):
+    """
+    Retrieves a project's crawl results (optionally only one crawl's) with keyset pagination.
+    Pass the returned `next_cursor` as `after` to get the next page; `fields` picks the columns.
+    """
+    query, columns = crawl_results_query(project_id, task_id, fields)
+    limit = max(1, min(limit, settings.CRAWL_RESULTS_MAX_PAGE_SIZE))
+    if after is not None:
+        query = query.where(CrawlResult.__table__.c.id > after)
+
+    rows = (await db.execute(query.limit(limit))).all()
 
     return {
-        "id": crawl_result.id,
-        "url": crawl_result.url,
-        "title": crawl_result.title,
-        "meta_description": crawl_result.meta_description,
-        "links": crawl_result.links.split(',')  # Assuming links are stored as comma-separated strings
+        "items": [dict(zip(columns, row)) for row in rows],
+        "next_cursor": rows[-1].id if len(rows) == limit else None,
     }
 
-# Get all crawl results with pagination
-@router.get("/crawl_results")
-async def get_all_crawl_results(limit: int = 10, offset: int = 0, db: AsyncSession = Depends(get_db), token: str = Depends(verify_token)):
+# Export a project's crawl results in one streamed download
+@router.get("/crawl_results/export")
+def export_crawl_results(project_id: uuid.UUID, task_id: Optional[uuid.UUID] = None, format: str = "ndjson",
+                         fields: Optional[str] = None, token: str = Depends(verify_token)):
     """
-    Retrieves all crawl results from the database with pagination.
+    Streams all of a project's crawl results as NDJSON, CSV or Parquet.
     """
-    results = await db.execute(
-        "SELECT * FROM crawl_results LIMIT :limit OFFSET :offset",
-        {"limit": limit, "offset": offset}
+    if format not in export.EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    if format == "parquet" and not export.PARQUET_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    query, columns = crawl_results_query(project_id, task_id, fields)
+    return StreamingResponse(
+        export.stream_export(engine, query, columns, format, settings.EXPORT_CHUNK_SIZE),
+        media_type=export.EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="crawl_results_{project_id}.{format}"'},
     )
-    crawl_results = results.fetchall()
-
-    return [
-        {
-            "id": result.id,
-            "url": result.url,
-            "title": result.title,
-            "meta_description": result.meta_description,
-            "links": result.links.split(',')
-        }
-        for result in crawl_results
-    ]
 
 # Get the result of a specific task by task_id
 @router.get("/task_result/{task_id}")
-async def get_task_result(task_id: str, db: AsyncSession = Depends(get_db), token: str = Depends(verify_token)):
+async def get_task_result(task_id: str, request: Request, db: AsyncSession = Depends(get_async_db), token: str = Depends(verify_token)):
     """
     Get the result of a specific crawl task.
+    Finished tasks' results are cached.
     """
-    # Retrieve task result using Celery's AsyncResult
-    result = AsyncResult(task_id)
-
-    if result.state == 'PENDING':
-        return {"task_id": task_id, "status": "pending"}
-    elif result.state == 'STARTED':
-        return {"task_id": task_id, "status": "in progress"}
-    elif result.state == 'SUCCESS':
-        return {"task_id": task_id, "status": "completed", "result": result.result}
-    elif result.state == 'FAILURE':
-        return {"task_id": task_id, "status": "failed", "error": str(result.info)}
-    else:
-        raise HTTPException(status_code=404, detail="Task not found")
+    async def load():
+        # Retrieve task result using Celery's AsyncResult
+        result = task_result(task_id)
+
+        if result.state == 'PENDING':
+            return {"task_id": task_id, "status": "pending"}
+        elif result.state == 'STARTED':
+            return {"task_id": task_id, "status": "in progress"}
+        elif result.state == 'SUCCESS':
+            return {"task_id": task_id, "status": "completed", "result": result.result}
+        elif result.state == 'FAILURE':
+            return {"task_id": task_id, "status": "failed", "error": str(result.info)}
+        else:
+            raise HTTPException(status_code=404, detail="Task not found")
+
+    # Only finished tasks are cached; their results don't change
+    return await cached_json(
+        request, TASK_RESULT_CACHE, task_id, load,
+        cacheable=lambda body: json.loads(body)["status"] in FINAL_TASK_STATUSES,
+    )
@@ -0,0 +1,125 @@
+"""
+Load test: latency of GET /status/{task_id} under concurrent clients.
+
+Starts the API with uvicorn against a throwaway SQLite database (through the
+async engine and aiosqlite), seeds crawl tasks, and fires requests from
+`--concurrency` clients at once, reporting p50/p99 latency and throughput.
+Point --database-url at a Postgres instance to measure asyncpg instead.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_api_latency [--requests 5000] [--concurrency 1 16 64]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+from sqlalchemy import create_engine, insert
+
+from database.session import Base
+from models.crawl_results import CrawlTask
+
+HEADERS = {"Authorization": "Bearer mysecrettoken"}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_tasks(database_url, count):
+    db_engine = create_engine(database_url)
+    Base.metadata.create_all(db_engine)
+    task_ids = [uuid.uuid4() for _ in range(count)]
+    with db_engine.begin() as conn:
+        conn.execute(insert(CrawlTask.__table__), [
+            {"id": task_id, "url": f"https://example.com/{i}", "status": "completed"}
+            for i, task_id in enumerate(task_ids)
+        ])
+    db_engine.dispose()
+    return task_ids
+
+
+def start_server(database_url, port, **settings):
+    env = dict(os.environ, PYTHONPATH=os.getcwd(), DATABASE_URL=database_url, **settings)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("API server did not start")
+
+
+async def load(base_url, task_ids, requests, concurrency):
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=HEADERS, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await client.get(f"/status/{random.choice(task_ids)}")
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed
+
+
+def percentile(values, pct):
+    return statistics.quantiles(values, n=100)[pct - 1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = args.database_url or f"sqlite:///{workdir}/bench.db"
+        task_ids = seed_tasks(database_url, args.tasks)
+        port = free_port()
+        server = start_server(database_url, port)
+        try:
+            for concurrency in args.concurrency:
+                latencies, errors, elapsed = asyncio.run(
+                    load(f"http://127.0.0.1:{port}", task_ids, args.requests, concurrency)
+                )
+                print(
+                    f"concurrency {concurrency:>4}:  p50 {percentile(latencies, 50) * 1000:7.2f} ms"
+                    f"  p99 {percentile(latencies, 99) * 1000:7.2f} ms"
+                    f"  {len(latencies) / elapsed:8.0f} req/s  errors {errors}"
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: cold start of the API process. Imports `main` (the FastAPI app
+with all routes) in fresh interpreters and reports the import time and
+peak RSS, as medians of --runs.
+
+Doubles as a regression guard: exits with status 1 if the API imports any
+worker-only package (Scrapy, Twisted, lxml, numpy, pyarrow; crawl tasks are
+enqueued by name through core.task_client) or if the medians exceed
+--max-seconds or --max-rss-mib.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_api_startup [--runs 5] [--max-seconds 2] [--max-rss-mib 100]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Packages only crawl workers need; importing one makes every API replica pay for it
+WORKER_ONLY = ("scrapy", "twisted", "lxml", "parsel", "numpy", "pyarrow", "crawling")
+
+IMPORT_MAIN = f"""
+import json, resource, sys, time
+started = time.perf_counter()
+import main
+seconds = time.perf_counter() - started
+loaded = sorted(name for name in {WORKER_ONLY!r} if name in sys.modules)
+print(json.dumps({{
+    "seconds": seconds,
+    "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "worker_only": loaded,
+}}))
+"""
+
+
+def import_main():
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_MAIN], env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=2.0, help="fail above this median import time")
+    parser.add_argument("--max-rss-mib", type=float, default=100.0, help="fail above this median peak RSS")
+    args = parser.parse_args()
+
+    runs = [import_main() for _ in range(args.runs)]
+    seconds = statistics.median(run["seconds"] for run in runs)
+    rss = statistics.median(run["rss_mib"] for run in runs)
+    worker_only = sorted({name for run in runs for name in run["worker_only"]})
+
+    print(f"import main:    median {seconds * 1e3:8.1f}ms   min {min(run['seconds'] for run in runs) * 1e3:8.1f}ms")
+    print(f"peak RSS:       median {rss:8.1f}MiB")
+    print(f"modules loaded: {runs[0]['modules']}")
+    print(f"worker-only:    {', '.join(worker_only) or 'none'}")
+
+    failures = []
+    if worker_only:
+        failures.append(f"the API imports worker-only packages: {', '.join(worker_only)}")
+    if seconds > args.max_seconds:
+        failures.append(f"import time {seconds:.2f}s exceeds {args.max_seconds}s")
+    if rss > args.max_rss_mib:
+        failures.append(f"peak RSS {rss:.1f}MiB exceeds {args.max_rss_mib}MiB")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark: table size and paginated query latency with page HTML stored
+inline in crawl_results vs. in the content-addressed blob store.
+
+Simulates several crawls of one site: pages share the fixture templates, and
+between crawls only a small share of pages change. Both layouts are written
+to SQLite databases in a temporary directory.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_blob_storage [--pages 20000] [--crawls 3] [--changed 0.05]
+"""
+import argparse
+import os
+import pathlib
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import Column, MetaData, Text, create_engine, insert, text
+
+from models.crawl_results import CrawlResult
+from storage.blobs import LocalBlobStore, blob_key
+
+FIXTURES_DIR = pathlib.Path(__file__).parent / "fixtures"
+
+
+def render_page(templates, page, version):
+    template = templates[page % len(templates)]
+    unique = f"<title>Page {page}</title><p>Revision {version} of page {page}.</p>"
+    return template.replace("<title>", unique + "<title>", 1).encode("utf-8")
+
+
+def crawl_rows(pages, crawls, changed, seed=0):
+    """
+    Yields (crawl number, rows) for each crawl; rows carry their HTML.
+    """
+    rng = random.Random(seed)
+    templates = [path.read_text(encoding="utf-8") for path in sorted(FIXTURES_DIR.glob("*.html"))]
+    project_id = uuid.uuid4()
+    versions = [0] * pages
+
+    for crawl in range(crawls):
+        task_id = uuid.uuid4()
+        if crawl:
+            for page in rng.sample(range(pages), int(pages * changed)):
+                versions[page] += 1
+
+        rows = []
+        for page in range(pages):
+            html = render_page(templates, page, versions[page])
+            rows.append({
+                "id": uuid.uuid4(),
+                "project_id": project_id,
+                "task_id": task_id,
+                "url": f"https://example.com/page/{page}",
+                "title": f"Page {page}",
+                "word_count": rng.randint(100, 3000),
+                "seo_score": rng.randint(0, 100),
+                "content_hash": blob_key(html),
+                "raw_html": html,
+            })
+        yield crawl, rows
+
+
+def build_databases(workdir, pages, crawls, changed):
+    inline_metadata = MetaData()
+    inline_table = CrawlResult.__table__.to_metadata(inline_metadata)
+    inline_table.append_column(Column("raw_html", Text, nullable=True))
+
+    inline_engine = create_engine(f"sqlite:///{workdir}/inline.db")
+    blob_engine = create_engine(f"sqlite:///{workdir}/blob.db")
+    inline_metadata.create_all(inline_engine)
+    CrawlResult.metadata.create_all(blob_engine, tables=[CrawlResult.__table__])
+    store = LocalBlobStore(os.path.join(workdir, "blobs"))
+
+    for crawl, rows in crawl_rows(pages, crawls, changed):
+        with inline_engine.begin() as conn:
+            conn.execute(insert(inline_table), [dict(row, raw_html=row["raw_html"].decode("utf-8")) for row in rows])
+
+        for row in rows:
+            store.put(row.pop("raw_html"), row["content_hash"])
+        with blob_engine.begin() as conn:
+            conn.execute(insert(CrawlResult.__table__), rows)
+
+    return inline_engine, blob_engine, store
+
+
+def directory_size(path):
+    return sum(f.stat().st_size for f in pathlib.Path(path).rglob("*") if f.is_file())
+
+
+def time_pages(db_engine, total_rows, limit=10, samples=30):
+    """
+    Median latency of `SELECT * ... LIMIT/OFFSET` pages, as /crawl_results runs it.
+    """
+    rng = random.Random(1)
+    timings = []
+    with db_engine.connect() as conn:
+        for _ in range(samples):
+            offset = rng.randrange(0, max(1, total_rows - limit))
+            start = time.perf_counter()
+            conn.execute(
+                text("SELECT * FROM crawl_results LIMIT :limit OFFSET :offset"),
+                {"limit": limit, "offset": offset},
+            ).fetchall()
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20000)
+    parser.add_argument("--crawls", type=int, default=3)
+    parser.add_argument("--changed", type=float, default=0.05, help="share of pages that change between crawls")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        inline_engine, blob_engine, store = build_databases(workdir, args.pages, args.crawls, args.changed)
+        total_rows = args.pages * args.crawls
+
+        inline_size = os.path.getsize(f"{workdir}/inline.db")
+        blob_db_size = os.path.getsize(f"{workdir}/blob.db")
+        blobs_size = directory_size(store.root)
+        blob_count = sum(1 for _ in pathlib.Path(store.root).rglob("*.zst"))
+
+        print(f"rows:                        {total_rows:>10,}")
+        print(f"inline table:                {inline_size / 2 ** 20:>10.1f} MiB")
+        print(f"reference table:             {blob_db_size / 2 ** 20:>10.1f} MiB")
+        print(f"blob store ({blob_count:,} blobs):   {blobs_size / 2 ** 20:>10.1f} MiB")
+        print(f"page query, inline:          {time_pages(inline_engine, total_rows) * 1000:>10.2f} ms")
+        print(f"page query, reference:       {time_pages(blob_engine, total_rows) * 1000:>10.2f} ms")
+
+        # Reading one page's HTML back, as CrawlResult.raw_html does
+        key = blob_key(render_page([p.read_text(encoding="utf-8") for p in sorted(FIXTURES_DIR.glob("*.html"))], 0, 0))
+        reads = 1000
+        start = time.perf_counter()
+        for _ in range(reads):
+            store.get(key)
+        print(f"lazy HTML read:              {(time.perf_counter() - start) * 1000 / reads:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
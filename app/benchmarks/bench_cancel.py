@@ -0,0 +1,103 @@
+"""
+Benchmark: how long a cancelled crawl takes to stop.
+
+Crawls an endless local site whose pages each take `--latency` seconds to
+load, sets the crawl's cancel flag in Redis (as POST /stop_crawl does) after
+`--run-for` seconds, and measures the time until the crawl's Future resolves.
+Needs the Redis configured in CELERY_BROKER_URL.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_cancel [--trials 10] [--latency 0.5] [--run-for 2]
+"""
+import argparse
+import statistics
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import scrapy
+
+from core.config import settings
+from core.events import cancel_key
+from core.redis_client import get_redis
+from crawling.runner import CrawlRunner
+
+
+class SlowSiteHandler(BaseHTTPRequestHandler):
+    latency = 0.5
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        page = int(self.path.rsplit("/", 1)[-1] or 0)
+        links = "".join(f'<a href="/page/{page * 10 + i}">next</a>' for i in range(1, 11))
+        body = f"<html><body>{links}</body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class EndlessSpider(scrapy.Spider):
+    name = "bench_cancel"
+    custom_settings = {
+        "EXTENSIONS": {"crawling.cancellation.CrawlCancellation": 510},
+        "LOG_ENABLED": False,
+        "ROBOTSTXT_OBEY": False,
+    }
+
+    def __init__(self, task_id, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.task_id = task_id
+
+    def parse(self, response):
+        for href in response.css("a::attr(href)").getall():
+            yield response.follow(href)
+
+
+def run_trial(runner, start_url, run_for):
+    task_id = str(uuid.uuid4())
+    crawl = runner.crawl(EndlessSpider, task_id=task_id, start_urls=[start_url])
+    time.sleep(run_for)
+
+    requested = time.time()
+    get_redis().set(cancel_key(task_id), requested, ex=settings.CANCEL_TTL)
+    stats = crawl.result(timeout=120)
+    return time.time() - requested, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trials", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds each page takes to load")
+    parser.add_argument("--run-for", type=float, default=2.0, help="seconds the crawl runs before it is cancelled")
+    args = parser.parse_args()
+
+    SlowSiteHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowSiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    start_url = f"http://127.0.0.1:{server.server_port}/page/0"
+
+    runner = CrawlRunner(max_crawls=1)
+    latencies = []
+    try:
+        for _ in range(args.trials):
+            latency, stats = run_trial(runner, start_url, args.run_for)
+            assert stats["finish_reason"] == "cancelled", stats["finish_reason"]
+            latencies.append(latency)
+    finally:
+        runner.stop()
+        server.shutdown()
+
+    print(f"poll interval:      {settings.CANCEL_POLL_INTERVAL:6.2f} s")
+    print(f"page latency:       {args.latency:6.2f} s")
+    print(f"stop latency p50:   {statistics.median(latencies):6.2f} s")
+    print(f"stop latency max:   {max(latencies):6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Benchmark: end-to-end crawl throughput of SEOSpider and MySpider against a
+local synthetic site (see benchmarks.sitegen).
+
+The site is served from its own process, and every crawl runs in a freshly
+spawned process on a crawl runner with the workers' settings, so CPU time and
+peak RSS belong to the crawl alone. SEOSpider stores its results through the
+pipeline into a temporary SQLite database and blob store unless
+--database-url is given; its progress events and cancellation (which need
+Redis) are disabled.
+
+Reports pages/sec, CPU time per page, peak RSS and the pipeline's database
+write throughput, as medians of --repeat crawls. --setting overrides a Scrapy
+setting for the crawls, e.g. to profile memory on a mixed-content site with
+and without the content filter:
+
+    python -m benchmarks.bench_crawl --spiders seo --file-rate 0.2 --large-rate 0.05
+    python -m benchmarks.bench_crawl --spiders seo --file-rate 0.2 --large-rate 0.05 \
+        --setting CRAWL_HTML_ONLY=False --setting CRAWL_MAX_BODY_BYTES=0 Every run is appended to
+--results as a JSON line and compared with the last earlier run of the same
+configuration, so regressions show up as percentage changes.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_crawl [--spiders seo,my] [--pages 1000] [--shape random]
+        [--error-rate 0.02] [--slow-rate 0.01] [--trap-rate 0.05] [--depth 0] [--setting NAME=VALUE] ...
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.sitegen import SyntheticSite, add_site_arguments, serve_site, site_options
+
+SPIDERS = ("seo", "my")
+
+# Metrics compared between runs, and whether higher is better
+COMPARED = {
+    "pages_per_sec": True,
+    "cpu_ms_per_page": False,
+    "peak_rss_mib": False,
+    "db_rows_per_sec": True,
+}
+
+# Percent change flagged as a regression; run-to-run noise is around 5%
+REGRESSION_THRESHOLD = 10
+
+
+def serve(options, ready):
+    server = serve_site(SyntheticSite(**options))
+    ready.put(server.server_port)
+    server.serve_forever()
+
+
+def histogram_sum(histogram):
+    return next(sample.value for sample in histogram.collect()[0].samples if sample.name.endswith("_sum"))
+
+
+def run_crawl(spider_name, start_url, depth, database_url, workdir, overrides, sitemaps=False):
+    """
+    Crawls the site once with the named spider; runs in its own process.
+    With sitemaps, SEOSpider is seeded from the site's sitemaps first, and
+    the time that takes counts towards the crawl's.
+    """
+    # The pipeline's engine and blob store are configured at import time
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{workdir}/{uuid.uuid4()}.db"
+    os.environ["BLOB_STORE_URL"] = f"file://{workdir}/blobs"
+
+    from core import metrics
+    from crawling.runner import CrawlRunner
+    from crawling.seo_spider import SEOSpider
+    from crawling.sitemaps import discover_seeds
+    from crawling.spider import MySpider
+    from crawling.tasks import seo_crawl_settings
+    from crawling.throttle import POLITENESS_SETTINGS
+
+    class BenchSEOSpider(SEOSpider):
+        custom_settings = dict(SEOSpider.custom_settings, EXTENSIONS={
+            "crawling.metrics.CrawlMetrics": 520, "crawling.content.ContentFilter": 540,
+        })
+
+    runner = CrawlRunner(max_crawls=1, base_settings=POLITENESS_SETTINGS)
+    task_id = str(uuid.uuid4())
+    if spider_name == "seo":
+        crawl_settings = dict(seo_crawl_settings(task_id, depth, "CrawlBot"), LOG_ENABLED=False, **overrides)
+        spidercls, kwargs = BenchSEOSpider, {"task_id": task_id, "start_urls": [start_url]}
+    else:
+        crawl_settings = {"DEPTH_LIMIT": depth, "LOG_ENABLED": False, **overrides}
+        spidercls, kwargs = MySpider, {"url": start_url, "depth": depth}
+
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    seeds = []
+    if spider_name == "seo" and sitemaps:
+        seeds, _ = discover_seeds(start_url, "CrawlBot", crawl_settings["CRAWL_BUDGET_PAGES"])
+        kwargs["seeds"] = seeds
+    seed_seconds = time.perf_counter() - started
+    # MySpider prints every page
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        stats = runner.crawl(spidercls, settings=crawl_settings, **kwargs).result()
+    elapsed = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    runner.stop()
+
+    pages = stats.get("response_received_count", 0)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    rows = stats.get("pipeline/rows_written", 0)
+    write_seconds = histogram_sum(metrics.DB_WRITE_SECONDS)
+    return {
+        "pages": pages,
+        "items": stats.get("item_scraped_count", 0),
+        "errors": sum(value for key, value in stats.items()
+                      if key.startswith("downloader/response_status_count/") and key[-3] in "45"),
+        "duplicates_filtered": stats.get("dupefilter/filtered", 0),
+        "non_html_stopped": stats.get("content/non_html", 0),
+        "truncated": stats.get("content/truncated", 0),
+        "seeds": len(seeds),
+        "seed_seconds": round(seed_seconds, 3),
+        "max_depth": stats.get("request_depth_max", 0),
+        "response_mib": round(stats.get("downloader/response_bytes", 0) / 2 ** 20, 1),
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 2),
+        "cpu_ms_per_page": round(cpu * 1000 / max(pages, 1), 3),
+        "peak_rss_mib": round(after.ru_maxrss / 1024, 1),  # ru_maxrss is in KiB on Linux
+        "db_rows": rows,
+        "db_rows_per_sec": round(rows / write_seconds, 1) if write_seconds else None,
+    }
+
+
+def median_result(runs):
+    return {
+        key: None if None in values else statistics.median(values)
+        for key, values in ((key, [run[key] for run in runs]) for key in runs[0])
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_run(path, config):
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path) as f:
+        for line in f:
+            run = json.loads(line)
+            if run["config"] == config:
+                previous = run
+    return previous
+
+
+def change(current, previous, higher_is_better):
+    if current is None or not previous:
+        return ""
+    delta = (current - previous) / previous * 100
+    worse = delta < 0 if higher_is_better else delta > 0
+    return f"{delta:+6.1f}%" + (" (worse)" if worse and abs(delta) >= REGRESSION_THRESHOLD else "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_site_arguments(parser)
+    parser.add_argument("--spiders", default="seo,my", help=f"comma-separated, of: {', '.join(SPIDERS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="crawls per spider; medians are reported")
+    parser.add_argument("--depth", type=int, default=0, help="crawl depth limit; 0 for none")
+    parser.add_argument("--database-url", help="store SEOSpider results here instead of a temporary SQLite file")
+    parser.add_argument("--results", default="bench_crawl_results.jsonl", help="file the runs are appended to")
+    parser.add_argument("--setting", action="append", default=[], metavar="NAME=VALUE",
+                        help="Scrapy setting for the crawls; repeatable")
+    args = parser.parse_args()
+
+    overrides = {}
+    for setting in args.setting:
+        name, equals, value = setting.partition("=")
+        if not equals:
+            parser.error(f"--setting needs NAME=VALUE: {setting}")
+        overrides[name.strip()] = value.strip()
+
+    spiders = [name.strip() for name in args.spiders.split(",") if name.strip()]
+    for name in spiders:
+        if name not in SPIDERS:
+            parser.error(f"unknown spider: {name}")
+
+    config = {"site": site_options(args), "depth": args.depth, "repeat": args.repeat, "settings": overrides}
+    spawn = multiprocessing.get_context("spawn")
+    ready = spawn.Queue()
+    server = spawn.Process(target=serve, args=(config["site"], ready), daemon=True)
+    server.start()
+    start_url = f"http://127.0.0.1:{ready.get(timeout=30)}/"
+
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for name in spiders:
+                runs = []
+                for _ in range(args.repeat):
+                    # A fresh process per crawl, so imports and earlier crawls don't skew RSS
+                    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                        runs.append(executor.submit(
+                            run_crawl, name, start_url, args.depth, args.database_url, workdir, overrides,
+                        ).result())
+                results[name] = median_result(runs)
+    finally:
+        server.terminate()
+
+    run = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    previous = previous_run(args.results, config)
+    with open(args.results, "a") as f:
+        f.write(json.dumps(run) + "\n")
+
+    print(f"site: {args.pages} pages, {args.shape}, ~{args.page_size:,} B/page, "
+          f"{args.error_rate:.0%} errors, {args.slow_rate:.0%} slow, {args.trap_rate:.0%} traps, "
+          f"{args.file_rate:.0%} linking files, {args.large_rate:.0%} large")
+    if overrides:
+        print("settings: " + ", ".join(f"{name}={value}" for name, value in overrides.items()))
+    if previous:
+        print(f"compared with {previous['time']} ({previous['revision'] or 'unknown revision'})")
+    for name, result in results.items():
+        earlier = previous["results"].get(name, {}) if previous else {}
+        print(f"\n{name}: {result['pages']} pages, {result['items']} items, {result['errors']} errors, "
+              f"{result['duplicates_filtered']} duplicates filtered in {result['seconds']:.1f} s")
+        print(f"  {result['response_mib']} MiB downloaded, {result['non_html_stopped']} non-HTML responses stopped, "
+              f"{result['truncated']} truncated")
+        for metric, higher_is_better in COMPARED.items():
+            value = result[metric]
+            shown = "n/a" if value is None else f"{value:,.2f}"
+            print(f"  {metric + ':':<18}{shown:>12}  {change(value, earlier.get(metric), higher_is_better)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: URL canonicalization and seen-URL filter memory.
+
+Feeds a synthetic faceted-site link stream (tracking parameters, fragments,
+shuffled query strings, host case and default ports) through the old path
+(a Request per href, Scrapy's fingerprint set) and the new one (canonicalize,
+drop in-page repeats, Bloom filter), and measures filter memory per million URLs.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_dedup [--products 20000] [--fingerprints 1000000]
+"""
+import argparse
+import hashlib
+import random
+import time
+import tracemalloc
+
+from scrapy import Request
+from scrapy.dupefilters import RFPDupeFilter
+from scrapy.utils.request import RequestFingerprinter
+
+from core.config import settings
+from crawling.dedup import BloomDupeFilter, BloomFilter, bloom_size
+from crawling.urls import canonicalize_url
+
+
+def faceted_links(products, seed=0):
+    """
+    Yields the hrefs of a shop's category pages: every product appears many
+    times under different, equivalent URLs.
+    """
+    rng = random.Random(seed)
+    hosts = ("shop.example.com", "SHOP.example.com", "shop.example.com:443")
+    tracking = ("", "utm_source=newsletter", "utm_medium=email&utm_campaign=sale", "gclid=abc123", "fbclid=xyz")
+    for product in range(products):
+        for _ in range(rng.randint(4, 12)):
+            params = [f"color={rng.choice(('red', 'blue'))}", f"id={product}"]
+            rng.shuffle(params)
+            extra = rng.choice(tracking)
+            query = "&".join(params + ([extra] if extra else []))
+            fragment = rng.choice(("", "#reviews", "#specs"))
+            yield f"https://{rng.choice(hosts)}/product?{query}{fragment}"
+
+
+def run_old_path(links):
+    fingerprinter = RequestFingerprinter()
+    dupefilter = RFPDupeFilter(fingerprinter=fingerprinter)
+    scheduled = 0
+    start = time.perf_counter()
+    for link in links:
+        if not dupefilter.request_seen(Request(link)):
+            scheduled += 1
+    return scheduled, time.perf_counter() - start
+
+
+def run_new_path(links):
+    fingerprinter = RequestFingerprinter()
+    dupefilter = BloomDupeFilter(fingerprinter, settings.DEDUP_CAPACITY, settings.DEDUP_ERROR_RATE, settings.DEDUP_MAX_MEMORY)
+    scheduled = 0
+    start = time.perf_counter()
+    requested = set()
+    for link in links:
+        url = canonicalize_url(link)
+        if url in requested:
+            continue
+        requested.add(url)
+        if not dupefilter.request_seen(Request(url)):
+            scheduled += 1
+    return scheduled, time.perf_counter() - start
+
+
+def measure_memory(fill, count):
+    fingerprints = (hashlib.sha1(f"https://shop.example.com/p/{i}".encode()).digest() for i in range(count))
+    tracemalloc.start()
+    container = fill(fingerprints)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return container, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--fingerprints", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    links = list(faceted_links(args.products))
+    old_scheduled, old_time = run_old_path(links)
+    new_scheduled, new_time = run_new_path(links)
+    print(f"hrefs extracted:            {len(links):>10,}")
+    print(f"reach scheduler (old):      {old_scheduled:>10,}   {len(links) / old_time:>10,.0f} hrefs/s")
+    print(f"reach scheduler (new):      {new_scheduled:>10,}   {len(links) / new_time:>10,.0f} hrefs/s")
+
+    per_million = 1_000_000 / args.fingerprints
+    _, set_bytes = measure_memory(lambda fps: {fp.hex() for fp in fps}, args.fingerprints)
+    bits, hashes = bloom_size(args.fingerprints, settings.DEDUP_ERROR_RATE, settings.DEDUP_MAX_MEMORY)
+
+    def fill_bloom(fps):
+        bloom = BloomFilter(bits, hashes)
+        for fp in fps:
+            bloom.add(fp)
+        return bloom
+
+    _, bloom_bytes = measure_memory(fill_bloom, args.fingerprints)
+    print(f"fingerprint set:            {set_bytes * per_million / 2 ** 20:>10.1f} MiB per million URLs")
+    print(f"bloom filter ({settings.DEDUP_ERROR_RATE:.1%} error):  {bloom_bytes * per_million / 2 ** 20:>10.1f} MiB per million URLs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: whole-site link analysis (analysis.linkgraph) on a synthetic
+link graph: building the CSR graph from crawl fragments, then broken links,
+orphans, click depth, redirect chains and PageRank.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_link_analysis [--pages 100000] [--links-per-page 20]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from analysis.linkgraph import LinkGraph, analyze
+from benchmarks.sitegen import build_graph
+
+
+def fragments(pages, links_per_page, workers=4, seed=0):
+    """
+    Crawl fragments of a random site, split between `workers` like a
+    multi-worker crawl's; 2% of pages are broken and 1% redirect.
+    """
+    rng = np.random.default_rng(seed)
+    links = build_graph("random", pages, links_per_page, random.Random(seed))
+    urls = [f"https://example.com/page/{page}" for page in range(pages)]
+    status = np.where(rng.random(pages) < 0.02, 404, 200)
+    redirecting = set(np.flatnonzero(rng.random(pages) < 0.01).tolist()) - {0}
+
+    parts = [{"seeds": [], "pages": [], "redirects": [], "links": [], "unchanged": []} for _ in range(workers)]
+    parts[0]["seeds"].append(urls[0])
+    for page in range(pages):
+        part = parts[page % workers]
+        if page in redirecting:
+            part["redirects"].append((urls[page], 301, urls[(page + 1) % pages]))
+            continue
+        part["pages"].append((urls[page], int(status[page])))
+        if status[page] == 200:
+            part["links"].append((urls[page], [urls[target] for target in links[page]]))
+    return parts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=100_000)
+    parser.add_argument("--links-per-page", type=int, default=20)
+    args = parser.parse_args()
+
+    parts = fragments(args.pages, args.links_per_page)
+
+    start = time.perf_counter()
+    graph = LinkGraph.from_fragments(parts)
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, summary = analyze(graph)
+    analyzed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data = graph.to_bytes()
+    LinkGraph.from_bytes(data)
+    round_trip = time.perf_counter() - start
+
+    print(f"nodes:                {len(graph):>12,}")
+    print(f"edges:                {graph.edge_count:>12,}")
+    print(f"CSR graph size:       {len(data) / 2 ** 20:>12.1f} MiB (before blob store compression)")
+    print(f"build from fragments: {built:>12.2f} s")
+    print(f"analysis:             {analyzed:>12.2f} s")
+    print(f"serialize + load:     {round_trip:>12.2f} s")
+    print(f"broken links:         {summary['broken_link_count']:>12,}")
+    print(f"orphans:              {summary['orphan_count']:>12,}")
+    print(f"redirect chains:      {summary['redirect_chain_count']:>12,}")
+    print(f"max click depth:      {summary['max_click_depth']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: near-duplicate detection cost and recall. Computes MinHash
+signatures of synthetic pages, then indexes them batch by batch, as the pipeline does,
+into a temporary SQLite database.
+
+A share of the pages are planted near-duplicates of earlier ones (a few
+words changed); recall is the share of planted pairs found. Indexing time
+per batch (including the crawl_results insert) should grow only with the
+log of the index size, where pairwise comparison grows linearly.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_near_duplicates [--pages 20000] [--words 600] [--duplicates 0.1]
+"""
+import argparse
+import random
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, insert
+
+from analysis.duplicates import minhash, words
+from benchmarks.sitegen import WORDS
+from crawling.duplicates import index_near_duplicates
+from database.session import Base
+from models.crawl_results import CrawlResult
+
+VOCABULARY = WORDS + [f"term{i}" for i in range(5000)]
+
+
+def pages(count, length, duplicate_share, changed_words, seed=0):
+    """
+    Yields (text, original index or None) for each page.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for page in range(count):
+        if texts and rng.random() < duplicate_share:
+            original = rng.randrange(len(texts))
+            tokens = texts[original].split()
+            for position in rng.sample(range(len(tokens)), changed_words):
+                tokens[position] = rng.choice(VOCABULARY)
+            text = " ".join(tokens)
+        else:
+            original = None
+            text = " ".join(rng.choices(VOCABULARY, k=length))
+        texts.append(text)
+        yield text, original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=600, help="words per page")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="share of pages that are near-duplicates")
+    parser.add_argument("--changed-words", type=int, default=3, help="words changed in a near-duplicate")
+    parser.add_argument("--similarity", type=float, default=0.8, help="min similarity of near-duplicates")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    generated = list(pages(args.pages, args.words, args.duplicates, args.changed_words))
+    ids = [uuid.uuid4() for _ in generated]
+
+    start = time.perf_counter()
+    signatures = [minhash(words(text)) for text, _ in generated]
+    signing = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_engine = create_engine(f"sqlite:///{workdir}/bench.db")
+        Base.metadata.create_all(db_engine)
+        task_id, project_id = uuid.uuid4(), uuid.uuid4()
+
+        batch_times, found = [], 0
+        for start_index in range(0, len(generated), args.batch_size):
+            batch = range(start_index, min(start_index + args.batch_size, len(generated)))
+            rows = [
+                {"id": ids[i], "project_id": project_id, "task_id": task_id, "url": f"https://example.com/{i}",
+                 "minhash": signatures[i], "word_count": args.words}
+                for i in batch
+            ]
+            start = time.perf_counter()
+            with db_engine.begin() as conn:
+                conn.execute(insert(CrawlResult.__table__), rows)
+                found += index_near_duplicates(conn, task_id, [(row["id"], row["minhash"]) for row in rows],
+                                               args.similarity)
+            batch_times.append(time.perf_counter() - start)
+
+        with db_engine.connect() as conn:
+            pairs = {
+                frozenset(pair) for pair in conn.exec_driver_sql("SELECT page_id, duplicate_id FROM near_duplicates")
+            }
+
+    planted = [(ids[i], ids[original]) for i, (_, original) in enumerate(generated) if original is not None]
+    recalled = sum(frozenset((a.hex, b.hex)) in pairs for a, b in planted)
+    quarter = max(1, len(batch_times) // 4)
+
+    print(f"pages:                     {args.pages:>10,}")
+    print(f"MinHash per page:          {signing * 1000 / args.pages:>10.3f} ms")
+    print(f"index, first batches:      {sum(batch_times[:quarter]) / quarter * 1000:>10.1f} ms/batch")
+    print(f"index, last batches:       {sum(batch_times[-quarter:]) / quarter * 1000:>10.1f} ms/batch")
+    print(f"pairs found:               {found:>10,}")
+    print(f"planted pairs recalled:    {recalled:>10,} of {len(planted):,}")
+
+
+if __name__ == "__main__":
+    main()
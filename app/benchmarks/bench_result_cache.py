@@ -0,0 +1,143 @@
+"""
+Load test: database statements per second under a read-heavy dashboard load,
+with and without the result cache (core.cache).
+
+Starts the API with uvicorn against a throwaway SQLite database, seeds crawl
+tasks and crawl results, then has `--clients` dashboards poll GET /status and
+GET /crawl_result for a hot set of crawls and pages. Dashboards send back the
+ETag they last saw, as browsers do. The API runs once with
+RESULT_CACHE_TTL=0 (no cache) and once with the cache; each run reports
+throughput, latency, the statements the API sent to the database (its
+api_db_statements counter) and which cache tier answered. Without a reachable
+Redis (CELERY_BROKER_URL) only the in-process tier serves.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_result_cache [--requests 20000] [--clients 32] [--hot 500]
+"""
+import argparse
+import asyncio
+import random
+import re
+import tempfile
+import time
+import uuid
+
+import httpx
+from sqlalchemy import create_engine, insert
+
+from benchmarks.bench_api_latency import HEADERS, free_port, percentile, seed_tasks, start_server
+from models.crawl_results import CrawlResult
+
+_SAMPLE = re.compile(r'^(api_db_statements_total|api_cache_lookups_total)(\{[^}]*\})? ([0-9.e+]+)$', re.MULTILINE)
+
+
+def seed_results(database_url, task_ids, per_task):
+    db_engine = create_engine(database_url)
+    result_ids = []
+    with db_engine.begin() as conn:
+        for task_id in task_ids:
+            rows = [
+                {
+                    "id": uuid.uuid4(), "task_id": task_id, "project_id": task_id,
+                    "url": f"https://example.com/{task_id}/{i}", "title": f"Page {i}", "word_count": 300 + i,
+                    "seo_score": 80, "seo_evaluation": "{}", "change_status": "new",
+                }
+                for i in range(per_task)
+            ]
+            conn.execute(insert(CrawlResult.__table__), rows)
+            result_ids.extend(row["id"] for row in rows)
+    db_engine.dispose()
+    return result_ids
+
+
+def scrape(base_url):
+    samples = {}
+    for name, labels, value in _SAMPLE.findall(httpx.get(f"{base_url}/metrics").text):
+        samples[name + labels] = float(value)
+    return samples
+
+
+async def dashboards(base_url, paths, requests, clients):
+    latencies = []
+    statuses = {}
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=HEADERS, limits=limits, timeout=30) as client:
+        async def dashboard():
+            etags = {}
+            for _ in remaining:
+                path = random.choice(paths)
+                headers = {"If-None-Match": etags[path]} if path in etags else {}
+                start = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if "etag" in response.headers:
+                    etags[path] = response.headers["etag"]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(dashboard() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, statuses, elapsed
+
+
+def run(label, database_url, paths, args, **settings):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(database_url, port, **settings)
+    try:
+        before = scrape(base_url)
+        latencies, statuses, elapsed = asyncio.run(dashboards(base_url, paths, args.requests, args.clients))
+        after = scrape(base_url)
+    finally:
+        server.terminate()
+        server.wait()
+
+    delta = {name: after[name] - before.get(name, 0) for name in after}
+    statements = delta.get("api_db_statements_total", 0)
+    tiers = {}
+    for name, value in delta.items():
+        tier = re.search(r'tier="(\w+)"', name)
+        if tier:
+            tiers[tier.group(1)] = tiers.get(tier.group(1), 0) + int(value)
+
+    print(
+        f"{label:>9}:  {len(latencies) / elapsed:7.0f} req/s  {statements / elapsed:7.0f} DB statements/s"
+        f"  ({statements / len(latencies):.3f}/request)  p50 {percentile(latencies, 50) * 1000:6.2f} ms"
+        f"  p99 {percentile(latencies, 99) * 1000:6.2f} ms"
+    )
+    print(
+        f"{'':>9}   responses {dict(sorted(statuses.items()))}"
+        + (f"  cache {dict(sorted(tiers.items()))}" if tiers else "")
+    )
+    return statements / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--results-per-task", type=int, default=20)
+    parser.add_argument("--hot", type=int, default=500, help="crawls and pages the dashboards poll")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{workdir}/bench.db"
+        task_ids = seed_tasks(database_url, args.tasks)
+        result_ids = seed_results(database_url, task_ids, args.results_per_task)
+        paths = (
+            [f"/status/{task_id}" for task_id in random.sample(task_ids, min(args.hot, len(task_ids)))]
+            + [f"/crawl_result/{result_id}" for result_id in random.sample(result_ids, min(args.hot, len(result_ids)))]
+        )
+
+        uncached = run("no cache", database_url, paths, args, RESULT_CACHE_TTL="0")
+        cached = run("cache", database_url, paths, args)
+        if uncached:
+            print(f"DB statements/s down {(1 - cached / uncached) * 100:.1f}% with the cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: batch SEO scoring of synthetic crawl result rows.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_scoring [--pages 1000000]
+"""
+import argparse
+import random
+import time
+
+from analysis.rules import RULES, FeatureTable
+
+
+def synthetic_rows(pages, seed=0):
+    rng = random.Random(seed)
+    for i in range(pages):
+        url = f"https://example.com/page/{i}/"
+        yield {
+            "url": url,
+            "canonical": rng.choice((None, url, "https://example.com/")),
+            "title_length": rng.randint(0, 90),
+            "meta_description_length": rng.randint(0, 220),
+            "h1_count": rng.randint(0, 3),
+            "image_count": rng.randint(0, 30),
+            "images_missing_alt": rng.randint(0, 4),
+            "word_count": rng.randint(0, 3000),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rows = list(synthetic_rows(args.pages))
+
+    start = time.perf_counter()
+    table = FeatureTable.from_rows(rows)
+    built = time.perf_counter()
+    result = RULES.score(table)
+    scored = time.perf_counter()
+    result.evaluations()
+    done = time.perf_counter()
+
+    print(f"pages:            {args.pages}")
+    print(f"rules:            {len(RULES.rules)}")
+    print(f"build table:      {built - start:.3f}s")
+    print(f"score:            {scored - built:.3f}s")
+    print(f"evaluation text:  {done - scored:.3f}s")
+    print(f"total:            {done - start:.3f}s ({args.pages / (done - start):,.0f} pages/s)")
+
+
+if __name__ == "__main__":
+    main()
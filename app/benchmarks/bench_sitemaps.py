@@ -0,0 +1,110 @@
+"""
+Benchmark: sitemap seeding (crawling.sitemaps).
+
+Crawl: SEOSpider crawls a local synthetic site (see benchmarks.sitegen) once
+by following links alone and once seeded from the site's sitemaps. The
+default site is a 1000-page chain, the worst case for link following: every
+page is one hop deeper than the last, so pages are found one round trip at
+a time. --orphan-rate adds pages only the sitemaps list (on a chain, an
+orphan also cuts off the pages after it). Reports coverage (pages stored out
+of the site's pages), wall time (sitemap reading included) and the deepest
+request.
+
+Parsing: writes a gzipped sitemap of --parse-urls URLs and reads it back
+incrementally (parse_sitemap) and, for comparison, as one lxml tree, each in
+a fresh process, reporting URLs/sec and peak RSS.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_sitemaps [--pages 1000] [--shape chain] [--orphan-rate 0.05] [--parse-urls 1000000]
+"""
+import argparse
+import gzip
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.bench_crawl import run_crawl, serve
+from benchmarks.sitegen import SITEMAP_NS, SyntheticSite, add_site_arguments, site_options
+
+
+def write_sitemap(path, urls):
+    with gzip.open(path, "wt", compresslevel=6) as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{SITEMAP_NS}">')
+        for i in range(urls):
+            f.write(f"<url><loc>https://example.com/products/{i}</loc><lastmod>2024-05-{i % 28 + 1:02d}</lastmod></url>")
+        f.write("</urlset>")
+
+
+def parse_file(path, incremental):
+    """
+    Reads a gzipped sitemap; runs in its own process so peak RSS is its own.
+    """
+    from lxml import etree
+
+    from crawling.sitemaps import decompressed, parse_sitemap
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    if incremental:
+        with open(path, "rb") as f:
+            chunks = iter(lambda: f.read(64 * 1024), b"")
+            urls = sum(1 for _ in parse_sitemap(decompressed(chunks, 2 ** 34)))
+    else:
+        with gzip.open(path, "rb") as f:
+            urls = len(etree.fromstring(f.read(), etree.XMLParser(huge_tree=True)))
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return urls, elapsed, baseline / 1024, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_site_arguments(parser)
+    parser.set_defaults(pages=1000, shape="chain", sitemap_rate=1.0)
+    parser.add_argument("--depth", type=int, default=0, help="crawl depth limit; 0 for none")
+    parser.add_argument("--parse-urls", type=int, default=1_000_000, help="URLs in the parsed sitemap; 0 to skip")
+    args = parser.parse_args()
+
+    options = site_options(args)
+    site = SyntheticSite(**options)
+    reachable = args.pages - len(site.errors)
+    spawn = multiprocessing.get_context("spawn")
+
+    ready = spawn.Queue()
+    server = spawn.Process(target=serve, args=(options, ready), daemon=True)
+    server.start()
+    start_url = f"http://127.0.0.1:{ready.get(timeout=30)}/"
+
+    print(f"site: {args.pages} pages, {args.shape}, {len(site.orphans)} orphans, {len(site.listed)} in sitemaps")
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for label, sitemaps in (("links only", False), ("sitemaps", True)):
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                    result = executor.submit(run_crawl, "seo", start_url, args.depth, None, workdir, {}, sitemaps).result()
+                print(
+                    f"{label:>11}:  {result['items']:6} pages ({result['items'] / reachable:6.1%} coverage)"
+                    f"  in {result['seconds']:7.2f} s ({result['seed_seconds']:.2f} s reading sitemaps,"
+                    f" {result['seeds']} seeds)  {result['pages_per_sec']:7.1f} pages/s  max depth {result['max_depth']}"
+                )
+    finally:
+        server.terminate()
+
+    if args.parse_urls:
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "sitemap.xml.gz")
+            write_sitemap(path, args.parse_urls)
+            with gzip.open(path, "rb") as f:
+                size = sum(len(chunk) for chunk in iter(lambda: f.read(2 ** 20), b""))
+            print(f"\nsitemap: {args.parse_urls:,} URLs, {os.path.getsize(path) / 2 ** 20:.1f} MiB gzipped, "
+                  f"{size / 2 ** 20:.1f} MiB of XML")
+            for label, incremental in (("incremental", True), ("whole tree", False)):
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                    urls, elapsed, baseline, peak = executor.submit(parse_file, path, incremental).result()
+                print(f"{label:>11}:  {urls / elapsed:10,.0f} URLs/s  peak RSS {peak:7.1f} MiB (+{peak - baseline:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark: a crawl's site report from its precomputed aggregates
+(crawling.summary) against a scan of its crawl_results rows.
+
+Stores --pages synthetic pages for one crawl in a throwaway SQLite database
+through the crawl pipeline's write_batch, which scores each batch and adds it
+to the crawl's summary and histograms, and reports the share of write time
+the aggregates take. Then times GET /crawl/{task_id}/summary on a uvicorn
+server against the scan the report used to need: every row of the crawl read
+back, seo_evaluation split into issues and the figures totalled in Python.
+Both must agree.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_summary [--pages 1000000] [--batch-size 1000] [--requests 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from collections import Counter
+
+import httpx
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, select
+
+from benchmarks.bench_api_latency import HEADERS, free_port, percentile, start_server
+
+
+def synthetic_pages(task_id, count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        url = f"https://example.com/pages/{i}"
+        image_count = rng.choice((0, 2, 5, 10))
+        yield {
+            "task_id": task_id, "project_id": task_id, "url": url, "raw_html": None,
+            "content_hash": None, "change_status": "new", "depth": min(int(rng.expovariate(0.4)), 30),
+            "title_length": rng.choice((0, 20, 45, 55, 70)),
+            "meta_description_length": rng.choice((0, 30, 120, 150, 200)),
+            "h1_count": rng.choice((0, 1, 1, 1, 2)),
+            "image_count": image_count, "images_missing_alt": rng.randint(0, image_count),
+            "word_count": int(rng.lognormvariate(6, 1)),
+            "canonical": rng.choice((url, url, None, "https://example.com/")),
+        }
+
+
+def store_pages(database_url, task_id, pages, batch_size):
+    from crawling.pipelines import CrawlResultPipeline
+    from crawling.summary import sync_issue_codes
+    from database.session import init_db
+
+    db_engine = create_engine(database_url)
+    init_db(db_engine)
+    pipeline = CrawlResultPipeline(db_engine, batch_size, flush_interval=60)
+    sync_issue_codes(db_engine, pipeline.rules)
+
+    batch = []
+    started = time.perf_counter()
+    for page in synthetic_pages(task_id, pages):
+        batch.append(pipeline.to_row(page))
+        if len(batch) == batch_size:
+            pipeline.write_batch(batch)
+            batch = []
+    if batch:
+        pipeline.write_batch(batch)
+    elapsed = time.perf_counter() - started
+    db_engine.dispose()
+    return elapsed
+
+
+def scan_report(database_url, task_id):
+    """
+    The figures of the site report, from every stored row of the crawl.
+    """
+    from models.crawl_results import CrawlResult
+
+    table = CrawlResult.__table__
+    db_engine = create_engine(database_url)
+    pages = score_sum = word_count_sum = clean_pages = 0
+    issues = Counter()
+    with db_engine.connect() as conn:
+        result = conn.execution_options(yield_per=50000).execute(
+            select(table.c.seo_score, table.c.seo_evaluation, table.c.word_count).where(table.c.task_id == task_id)
+        )
+        for score, evaluation, word_count in result:
+            pages += 1
+            score_sum += score or 0
+            word_count_sum += word_count or 0
+            if evaluation == "No Issues":
+                clean_pages += 1
+            else:
+                issues.update(evaluation.split(", "))
+    db_engine.dispose()
+    return {
+        "pages": pages,
+        "average_seo_score": round(score_sum / pages, 2),
+        "average_word_count": round(word_count_sum / pages, 1),
+        "pages_without_issues": clean_pages,
+        "issues": dict(issues),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200, help="summary requests to time")
+    parser.add_argument("--scans", type=int, default=3, help="full scans to time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        os.environ["DATABASE_URL"] = database_url
+        task_id = uuid.uuid4()
+
+        elapsed = store_pages(database_url, task_id, args.pages, args.batch_size)
+        write_seconds = REGISTRY.get_sample_value("crawl_db_write_seconds_sum")
+        summary_seconds = REGISTRY.get_sample_value("crawl_summary_seconds_sum")
+        print(f"stored {args.pages:,} pages in {elapsed:.1f} s ({args.pages / elapsed:,.0f} pages/s); "
+              f"aggregates took {summary_seconds:.1f} s of {write_seconds:.1f} s of DB writes "
+              f"({summary_seconds / write_seconds:.1%})")
+
+        scans = []
+        for _ in range(args.scans):
+            started = time.perf_counter()
+            scanned = scan_report(database_url, task_id)
+            scans.append(time.perf_counter() - started)
+        print(f"      full scan:  median {statistics.median(scans) * 1000:10.1f} ms")
+
+        port = free_port()
+        server = start_server(database_url, port)
+        try:
+            latencies = []
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", headers=HEADERS, timeout=30) as client:
+                for _ in range(args.requests):
+                    started = time.perf_counter()
+                    response = client.get(f"/crawl/{task_id}/summary")
+                    latencies.append(time.perf_counter() - started)
+                    response.raise_for_status()
+            report = response.json()
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"summary endpoint:  p50 {percentile(latencies, 50) * 1000:10.1f} ms  "
+              f"p99 {percentile(latencies, 99) * 1000:.1f} ms  ({statistics.median(scans) / percentile(latencies, 50):,.0f}x)")
+
+        reported = {key: report[key] for key in ("pages", "average_seo_score", "average_word_count", "pages_without_issues")}
+        reported["issues"] = {issue["message"]: issue["pages"] for issue in report["issues"]}
+        if reported != scanned:
+            raise SystemExit(f"Report differs from the scan:\n  {reported}\n  {scanned}")
+        print(f"report matches the scan: {len(report['issues'])} issue types, "
+              f"{report['pages_without_issues']:,} pages without issues")
+
+
+if __name__ == "__main__":
+    main()
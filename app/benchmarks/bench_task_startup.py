@@ -0,0 +1,89 @@
+"""
+Benchmark: per-task crawl latency with a fresh process per crawl (what
+--max-tasks-per-child=1 forces) vs. the worker's persistent crawl runner.
+
+Every crawl fetches one tiny local page, so the timings are almost all
+Scrapy/Twisted startup and teardown.
+
+Usage (from the app directory):
+    python -m benchmarks.bench_task_startup [--crawls 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE = b"<html><head><title>Benchmark</title></head><body><h1>Benchmark</h1></body></html>"
+
+# What each task did before: import Scrapy, build a CrawlerProcess, crawl, exit
+FRESH_PROCESS_CRAWL = """
+import sys
+from scrapy.crawler import CrawlerProcess
+from crawling.spider import MySpider
+process = CrawlerProcess({"LOG_ENABLED": False})
+process.crawl(MySpider, url=sys.argv[1], depth=1)
+process.start()
+"""
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+def fresh_process_crawl(url):
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", FRESH_PROCESS_CRAWL, url], env=env, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def runner_crawl(runner, url):
+    from crawling.spider import MySpider
+
+    start = time.perf_counter()
+    runner.crawl(MySpider, settings={"LOG_ENABLED": False, "DEPTH_LIMIT": 1}, url=url, depth=1).result()
+    return time.perf_counter() - start
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    print(f"{label:<22}median {statistics.median(timings) * 1e3:8.1f}ms   "
+          f"min {timings[0] * 1e3:8.1f}ms   max {timings[-1] * 1e3:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--crawls", type=int, default=10)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    report("fresh process", [fresh_process_crawl(url) for _ in range(args.crawls)])
+
+    from crawling.runner import CrawlRunner
+
+    runner = CrawlRunner(max_crawls=4)
+    first = runner_crawl(runner, url)
+    report("persistent runner", [runner_crawl(runner, url) for _ in range(args.crawls)])
+    print(f"{'':<22}(first crawl, incl. reactor start: {first * 1e3:.1f}ms)")
+
+    runner.stop()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
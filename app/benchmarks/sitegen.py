@@ -0,0 +1,315 @@
+"""
+Synthetic sites for crawl benchmarks, served from a local HTTP server.
+
+A site is fully determined by its parameters and seed: the same arguments
+always produce the same pages, links, slow pages, error pages and traps, so
+benchmark runs stay comparable. Pages are rendered on request.
+
+Link graph shapes:
+    tree    page i links to its `links_per_page` children and its parent
+    random  every page hangs off a random earlier page (so all are
+            reachable, at a depth of about ln(pages)) plus random extra links
+    chain   page i links to page i + 1 and a few random earlier pages, so
+            the site is as deep as it is large
+
+Trap pages link to URL variants of themselves: session IDs and fragments
+(which URL canonicalization should collapse), sort orders (same content under
+different URLs) and an `--trap-depth` pages long calendar.
+
+For mixed content, `--file-rate` of the pages also link to a `--file-size`
+byte PDF, image or archive, and `--large-rate` of the pages are padded to
+`--large-size` bytes of HTML.
+
+With `--sitemap-rate`, robots.txt points to a sitemap index of gzipped
+sitemaps of `--sitemap-size` URLs, listing that share of the pages with a
+lastmod up to two years back. `--orphan-rate` of the pages are linked from
+nowhere and only listed in the sitemaps.
+
+With `--crawl-delay`, robots.txt asks crawlers to wait that many seconds
+between requests. The server notes when each path was requested
+(SyntheticSite.requested), so tests can check the pacing.
+
+Usage (from the app directory), to browse or crawl a site by hand:
+    python -m benchmarks.sitegen [--port 8000] [--pages 1000] [--shape random] ...
+"""
+import argparse
+import datetime
+import gzip
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SHAPES = ("tree", "random", "chain")
+
+WORDS = (
+    "crawl index search page link anchor title meta description content site "
+    "audit canonical redirect sitemap robots header image alt text speed mobile "
+    "schema markup keyword ranking traffic visitor query result snippet render"
+).split()
+
+NOT_FOUND = "<html><body>Not found</body></html>"
+
+HTML = "text/html; charset=utf-8"
+XML = "application/xml"
+GZIP = "application/gzip"  # Gzipped on the way out
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+# Non-HTML files pages link to, by extension
+FILE_TYPES = {"pdf": "application/pdf", "jpg": "image/jpeg", "zip": "application/zip"}
+
+
+class SyntheticSite:
+    """
+    A generated site: its link graph and which pages are slow, broken or traps.
+    """
+
+    def __init__(self, pages=1000, shape="random", links_per_page=10, page_size=20_000,
+                 slow_rate=0.0, slow_delay=0.5, error_rate=0.0, trap_rate=0.0, trap_depth=20,
+                 file_rate=0.0, file_size=1_000_000, large_rate=0.0, large_size=10_000_000,
+                 sitemap_rate=0.0, sitemap_size=1000, orphan_rate=0.0, crawl_delay=None, seed=0):
+        if shape not in SHAPES:
+            raise ValueError(f"Unknown shape: {shape}")
+        self.pages = pages
+        self.page_size = page_size
+        self.slow_delay = slow_delay
+        self.trap_depth = trap_depth
+        self.file_size = file_size
+        self.large_size = large_size
+        self.seed = seed
+
+        rng = random.Random(seed)
+        self.links = build_graph(shape, pages, links_per_page, rng)
+        # The home page is always fast, up and trap-free
+        others = range(1, pages)
+        self.slow = set(rng.sample(others, int((pages - 1) * slow_rate)))
+        self.errors = {page: rng.choice((404, 500)) for page in rng.sample(others, int((pages - 1) * error_rate))}
+        self.traps = set(rng.sample(others, int((pages - 1) * trap_rate)))
+        self.files = {page: rng.choice(list(FILE_TYPES)) for page in rng.sample(others, int((pages - 1) * file_rate))}
+        self.large = set(rng.sample(others, int((pages - 1) * large_rate)))
+        self.orphans = set(rng.sample(others, int((pages - 1) * orphan_rate)))
+        # Orphans are always listed, or nothing could find them
+        listed = set(rng.sample(others, int((pages - 1) * sitemap_rate))) | self.orphans
+        self.listed = sorted(listed | {0}) if sitemap_rate or orphan_rate else []
+        self.sitemap_size = sitemap_size
+        self.crawl_delay = crawl_delay
+        self.requested = []  # (time.monotonic(), path) of every request served
+
+    def respond(self, path):
+        """
+        Returns (status, content type, body, delay in seconds) for a request
+        path. File bodies are bytes, HTML bodies text.
+        """
+        path = path.partition("?")[0]
+        parts = path.strip("/").split("/")
+        try:
+            if parts == [""]:
+                page = 0
+            elif parts == ["robots.txt"]:
+                return self.render_robots()
+            elif parts == ["sitemap_index.xml"] and self.listed:
+                return 200, XML, self.render_sitemap_index(), 0.0
+            elif parts[0] == "sitemaps" and len(parts) == 2 and parts[1].endswith(".xml.gz"):
+                return 200, GZIP, self.render_sitemap(int(parts[1].split(".")[0])), 0.0
+            elif parts[0] == "page" and len(parts) == 2:
+                page = int(parts[1])
+            elif parts[0] == "calendar" and len(parts) == 3:
+                return 200, HTML, self.render_calendar(int(parts[1]), int(parts[2])), 0.0
+            elif parts[0] == "files" and len(parts) == 2:
+                return self.render_file(*parts[1].split("."))
+            else:
+                raise ValueError(path)
+        except (TypeError, ValueError):
+            return 404, HTML, NOT_FOUND, 0.0
+
+        if not 0 <= page < self.pages:
+            return 404, HTML, NOT_FOUND, 0.0
+        if page in self.errors:
+            return self.errors[page], HTML, "<html><body>Error</body></html>", 0.0
+        return 200, HTML, self.render_page(page), self.slow_delay if page in self.slow else 0.0
+
+    def render_page(self, page):
+        rng = random.Random(self.seed * 1_000_003 + page)
+        hrefs = [f"/page/{target}" for target in self.links[page] if target not in self.orphans]
+        if page in self.traps:
+            hrefs += [
+                f"/page/{page}?sessionid={rng.getrandbits(64):x}",
+                f"/page/{page}#reviews",
+                f"/page/{page}?sort=price",
+                f"/page/{page}?sort=name",
+                f"/calendar/{page}/0",
+            ]
+        if page in self.files:
+            hrefs.append(f"/files/{page}.{self.files[page]}")
+        return self.render(rng, f"Page {page}", hrefs, self.large_size if page in self.large else self.page_size)
+
+    def render_calendar(self, page, step):
+        rng = random.Random(self.seed * 1_000_003 + page)
+        hrefs = [f"/page/{page}"]
+        if step + 1 < self.trap_depth:
+            hrefs.append(f"/calendar/{page}/{step + 1}")
+        return self.render(rng, f"Events for page {page}", hrefs, self.page_size)
+
+    def render_file(self, page, extension):
+        if self.files.get(int(page)) != extension:
+            raise ValueError(extension)
+        body = random.Random(self.seed * 1_000_003 + int(page)).randbytes(self.file_size)
+        return 200, FILE_TYPES[extension], body, 0.0
+
+    def render_robots(self):
+        if not self.listed and self.crawl_delay is None:
+            return 404, HTML, NOT_FOUND, 0.0
+        robots = "User-agent: *\nAllow: /\n"
+        if self.crawl_delay is not None:
+            robots += f"Crawl-delay: {self.crawl_delay}\n"
+        if self.listed:
+            robots += "Sitemap: {base}/sitemap_index.xml\n"
+        return 200, "text/plain", robots, 0.0
+
+    def render_sitemap_index(self):
+        count = -(-len(self.listed) // self.sitemap_size)
+        entries = "".join(f"<sitemap><loc>{{base}}/sitemaps/{n}.xml.gz</loc></sitemap>" for n in range(count))
+        return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="{SITEMAP_NS}">{entries}</sitemapindex>'
+
+    def render_sitemap(self, number):
+        listed = self.listed[number * self.sitemap_size:(number + 1) * self.sitemap_size]
+        if number < 0 or not listed:
+            raise ValueError(number)
+        today = datetime.date.today()
+        entries = "".join(
+            f"<url><loc>{{base}}{'/' if page == 0 else f'/page/{page}'}</loc>"
+            f"<lastmod>{today - datetime.timedelta(days=random.Random(self.seed * 1_000_003 + page).randrange(730))}</lastmod></url>"
+            for page in listed
+        )
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{SITEMAP_NS}">{entries}</urlset>'
+
+    def render(self, rng, title, hrefs, page_size):
+        # Links are absolute (MySpider only follows those) and relative to the Host the crawler asked for
+        links = "".join(f'<li><a href="{{base}}{href}">{href}</a></li>' for href in hrefs)
+        images = "".join(
+            f'<img src="/img/{rng.randrange(1000)}.png"' + (' alt="Illustration">' if rng.random() < 0.7 else ">")
+            for _ in range(rng.randrange(6))
+        )
+        head = (
+            f"<!DOCTYPE html><html><head><title>{title}</title>"
+            f'<meta name="description" content="{title}: {" ".join(rng.choices(WORDS, k=20))}">'
+            f"</head><body><h1>{title}</h1>{images}<ul>{links}</ul>"
+        )
+
+        # Pad with paragraphs up to the page size
+        paragraphs = []
+        size = len(head)
+        while size < page_size:
+            paragraph = f"<h2>{rng.choice(WORDS).title()}</h2><p>{' '.join(rng.choices(WORDS, k=80))}</p>"
+            paragraphs.append(paragraph)
+            size += len(paragraph)
+        return head + "".join(paragraphs) + "</body></html>"
+
+
+def build_graph(shape, pages, links_per_page, rng):
+    """
+    Returns each page's outgoing links as a list of page numbers.
+    """
+    links = [[] for _ in range(pages)]
+    if shape == "tree":
+        for page in range(1, pages):
+            parent = (page - 1) // links_per_page
+            links[parent].append(page)
+            links[page].append(parent)
+        return links
+
+    for page in range(1, pages):
+        parent = page - 1 if shape == "chain" else rng.randrange(page)
+        links[parent].append(page)
+    extra = links_per_page if shape == "random" else 2
+    for page in range(pages):
+        # Chains only link back, so the depth isn't short-circuited
+        targets = range(page) if shape == "chain" else range(pages)
+        if targets:
+            links[page].extend(rng.choice(targets) for _ in range(max(0, extra - len(links[page]))))
+    return links
+
+
+def site_handler(site):
+    """
+    Returns an HTTP request handler class serving `site`.
+    """
+    class SiteHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            site.requested.append((time.monotonic(), self.path))
+            status, content_type, body, delay = site.respond(self.path)
+            if delay:
+                time.sleep(delay)
+
+            if isinstance(body, str):
+                body = body.replace("{base}", f"http://{self.headers.get('Host', '')}").encode("utf-8")
+            if content_type == GZIP:
+                body = gzip.compress(body)
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except ConnectionError:
+                pass  # The crawler stopped reading: a non-HTML or oversized body
+
+        def log_message(self, *args):
+            pass
+
+    return SiteHandler
+
+
+def serve_site(site, host="127.0.0.1", port=0):
+    """
+    Starts serving `site` and returns the server; call serve_forever() on it.
+    """
+    server = ThreadingHTTPServer((host, port), site_handler(site))
+    server.daemon_threads = True
+    return server
+
+
+def add_site_arguments(parser):
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--shape", choices=SHAPES, default="random")
+    parser.add_argument("--links-per-page", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=20_000, help="approximate bytes of HTML per page")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of pages that load slowly")
+    parser.add_argument("--slow-delay", type=float, default=0.5, help="seconds a slow page takes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of pages answering 404 or 500")
+    parser.add_argument("--trap-rate", type=float, default=0.0, help="share of pages linking to duplicate-URL traps")
+    parser.add_argument("--trap-depth", type=int, default=20, help="pages in each calendar trap")
+    parser.add_argument("--file-rate", type=float, default=0.0, help="share of pages linking to a PDF, image or archive")
+    parser.add_argument("--file-size", type=int, default=1_000_000, help="bytes per linked file")
+    parser.add_argument("--large-rate", type=float, default=0.0, help="share of pages with --large-size bytes of HTML")
+    parser.add_argument("--large-size", type=int, default=10_000_000)
+    parser.add_argument("--sitemap-rate", type=float, default=0.0, help="share of pages listed in the sitemaps")
+    parser.add_argument("--sitemap-size", type=int, default=1000, help="URLs per sitemap file")
+    parser.add_argument("--orphan-rate", type=float, default=0.0, help="share of pages only the sitemaps list")
+    parser.add_argument("--crawl-delay", type=float, default=None, help="Crawl-delay robots.txt asks for, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def site_options(args):
+    return {
+        "pages": args.pages, "shape": args.shape, "links_per_page": args.links_per_page,
+        "page_size": args.page_size, "slow_rate": args.slow_rate, "slow_delay": args.slow_delay,
+        "error_rate": args.error_rate, "trap_rate": args.trap_rate, "trap_depth": args.trap_depth,
+        "file_rate": args.file_rate, "file_size": args.file_size, "large_rate": args.large_rate,
+        "large_size": args.large_size, "sitemap_rate": args.sitemap_rate, "sitemap_size": args.sitemap_size,
+        "orphan_rate": args.orphan_rate, "crawl_delay": args.crawl_delay, "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_site_arguments(parser)
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = serve_site(SyntheticSite(**site_options(args)), port=args.port)
+    print(f"Serving a {args.pages}-page {args.shape} site on http://127.0.0.1:{server.server_port}/")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
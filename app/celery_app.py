@@ -5,11 +5,25 @@ from core.config import settings
 celery_app = Celery(
     "crawler_app",
     broker=settings.CELERY_BROKER_URL,
-    backend=settings.CELERY_RESULT_BACKEND
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["crawling.tasks"]  # Crawl tasks, loaded by the worker
 )
 
-# Automatically discover tasks in the crawling module
-# celery_app.autodiscover_tasks(["crawling"])
+# Admission queue: crawls wait in the broker and are taken by priority
+# (0 runs first), so small audits aren't stuck behind big site crawls.
+# Each worker reserves one crawl at a time and acknowledges it only when done.
+celery_app.conf.update(
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+        # Redelivery of an unacknowledged crawl must wait longer than the longest crawl
+        "visibility_timeout": settings.CRAWL_MAX_SECONDS + 3600,
+    },
+    task_default_priority=settings.CRAWL_DEFAULT_PRIORITY,
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+)
 
 # Example task (you can remove this when you no longer need it for testing)
 @celery_app.task
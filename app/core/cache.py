@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+
+from redis.exceptions import RedisError
+
+from core import metrics
+from core.config import settings
+from core.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# Namespaces of the cached API results; keyed by crawl result id (tagged with
+# its project id), by crawl task id, and by Celery task id
+CRAWL_RESULT_CACHE = "crawl_result"
+STATUS_CACHE = "status"
+TASK_RESULT_CACHE = "task_result"
+
+# Every process caching results listens here for entries to evict
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+def entry_key(namespace, key):
+    return f"cache:{namespace}:{key}"
+
+
+def tag_key(namespace, tag):
+    # Set of the keys cached under a tag, so they can be invalidated together
+    return f"cache-tag:{namespace}:{tag}"
+
+
+def etag_of(body):
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Whether an If-None-Match header names `etag` (weak comparison, as for GET).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def invalidate(client, namespace, keys=(), tags=()):
+    """
+    Drops cached results from the shared tier and tells every API process to
+    drop them from its local tier. For workers and other sync code; `client`
+    is a sync Redis client (core.redis_client.get_redis).
+    """
+    keys = [str(key) for key in keys]
+    tags = [str(tag) for tag in tags]
+    if tags:
+        pipe = client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.smembers(tag_key(namespace, tag))
+        for members in pipe.execute():
+            keys.extend(member.decode() for member in members)
+    if not keys and not tags:
+        return
+
+    pipe = client.pipeline(transaction=False)
+    pipe.delete(*[entry_key(namespace, key) for key in keys], *[tag_key(namespace, tag) for tag in tags])
+    pipe.publish(INVALIDATION_CHANNEL, json.dumps({"namespace": namespace, "keys": keys, "tags": tags}))
+    pipe.execute()
+
+
+class ResultCache:
+    """
+    Read-through cache of serialized API responses, in two tiers: an LRU of
+    at most RESULT_CACHE_LOCAL_SIZE entries in this process, in front of
+    Redis, which all API processes share. Entries expire after
+    RESULT_CACHE_TTL seconds in Redis and RESULT_CACHE_LOCAL_TTL locally.
+
+    Writers call invalidate() (or ResultCache.invalidate) with the keys, or
+    the tags, of the results they changed; that deletes them from Redis and
+    publishes them on INVALIDATION_CHANNEL, where listen() evicts them from
+    each process's LRU. The local TTL bounds how stale an entry can get if a
+    message is lost. When Redis is unreachable, its tier is skipped for
+    RESULT_CACHE_REDIS_RETRY seconds and the LRU serves alone.
+    """
+
+    def __init__(self, client, ttl, local_size, local_ttl):
+        self.client = client
+        self.ttl = ttl
+        self.local_size = local_size
+        self.local_ttl = min(local_ttl, ttl)
+        # (namespace, key) -> (expires at, etag, body, tags), least recently used first
+        self.local = OrderedDict()
+        # Invalidations seen; a load that overlapped one is not cached
+        self.invalidations = 0
+        self.redis_retry_at = 0.0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    async def get_or_load(self, namespace, key, load, tags=(), cacheable=None):
+        """
+        Returns (etag, body) of the cached result, or awaits `load()` for the
+        body (bytes) and caches it under `key` and `tags`, unless
+        `cacheable(body)` says not to. `tags` may be a callable returning them
+        once `load` ran. Exceptions from `load` are not cached.
+        """
+        if not self.enabled:
+            body = await load()
+            return etag_of(body), body
+
+        local_key = (namespace, str(key))
+        entry = self.local.get(local_key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.local.move_to_end(local_key)
+            metrics.CACHE_LOOKUPS.labels(namespace, "local").inc()
+            return entry[1], entry[2]
+
+        body = await self._redis_get(entry_key(namespace, key))
+        if body is not None:
+            metrics.CACHE_LOOKUPS.labels(namespace, "redis").inc()
+            etag = etag_of(body)
+            # Invalidations publish the keys tagged in Redis, so the local copy needs no tags
+            self._store_local(local_key, etag, body, ())
+            return etag, body
+
+        metrics.CACHE_LOOKUPS.labels(namespace, "miss").inc()
+        invalidations = self.invalidations
+        body = await load()
+        etag = etag_of(body)
+        if invalidations == self.invalidations and (cacheable is None or cacheable(body)):
+            if callable(tags):
+                tags = tags()
+            self._store_local(local_key, etag, body, tags)
+            await self._redis_set(namespace, str(key), body, tags)
+        return etag, body
+
+    async def invalidate(self, namespace, keys=(), tags=()):
+        """
+        invalidate() from the API's event loop: evicts the results from this
+        process right away, and from Redis and the other processes if it can.
+        """
+        keys = [str(key) for key in keys]
+        tags = [str(tag) for tag in tags]
+        self.evict_local(namespace, keys, tags)
+        if not self._redis_available():
+            return
+        try:
+            for tag in tags:
+                keys.extend(await self.client.smembers(tag_key(namespace, tag)))
+            pipe = self.client.pipeline(transaction=False)
+            if keys or tags:
+                pipe.delete(*[entry_key(namespace, key) for key in keys], *[tag_key(namespace, tag) for tag in tags])
+            pipe.publish(INVALIDATION_CHANNEL, json.dumps({"namespace": namespace, "keys": keys, "tags": tags}))
+            await pipe.execute()
+        except RedisError as e:
+            self._redis_failed(e)
+
+    def evict_local(self, namespace, keys=(), tags=()):
+        self.invalidations += 1
+        for key in keys:
+            self.local.pop((namespace, str(key)), None)
+        if tags:
+            tags = set(tags)
+            for local_key in [k for k, entry in self.local.items() if k[0] == namespace and tags & entry[3]]:
+                del self.local[local_key]
+
+    async def listen(self):
+        """
+        Evicts the entries invalidated by any process from the local tier,
+        until cancelled. Run it as a background task of the API.
+        """
+        while True:
+            try:
+                async with self.client.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # Invalidations published while unsubscribed were missed
+                    self.local.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.evict_local(**json.loads(message["data"]))
+            except (RedisError, OSError) as e:
+                logger.warning(f"Result cache invalidation listener disconnected: {e}")
+                await asyncio.sleep(settings.RESULT_CACHE_REDIS_RETRY)
+
+    def _store_local(self, local_key, etag, body, tags):
+        self.local[local_key] = (time.monotonic() + self.local_ttl, etag, body, frozenset(map(str, tags)))
+        self.local.move_to_end(local_key)
+        while len(self.local) > self.local_size:
+            self.local.popitem(last=False)
+
+    def _redis_available(self):
+        return time.monotonic() >= self.redis_retry_at
+
+    def _redis_failed(self, error):
+        logger.warning(f"Result cache skips Redis for {settings.RESULT_CACHE_REDIS_RETRY}s: {error}")
+        self.redis_retry_at = time.monotonic() + settings.RESULT_CACHE_REDIS_RETRY
+
+    async def _redis_get(self, name):
+        if not self._redis_available():
+            return None
+        try:
+            body = await self.client.get(name)
+        except RedisError as e:
+            self._redis_failed(e)
+            return None
+        return body.encode() if body is not None else None
+
+    async def _redis_set(self, namespace, key, body, tags):
+        if not self._redis_available():
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(entry_key(namespace, key), body.decode(), ex=self.ttl)
+            for tag in tags:
+                pipe.sadd(tag_key(namespace, tag), key)
+                pipe.expire(tag_key(namespace, tag), self.ttl)
+            await pipe.execute()
+        except RedisError as e:
+            self._redis_failed(e)
+
+
+_result_cache = None
+
+
+def get_result_cache():
+    """
+    Returns the API's result cache, sized from settings.
+    Only use it from the server's event loop.
+    """
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(
+            get_async_redis(), settings.RESULT_CACHE_TTL,
+            settings.RESULT_CACHE_LOCAL_SIZE, settings.RESULT_CACHE_LOCAL_TTL,
+        )
+    return _result_cache
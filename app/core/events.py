@@ -0,0 +1,31 @@
+import time
+
+from core.config import settings
+
+# Events after which a crawl publishes nothing more
+TERMINAL_EVENTS = frozenset(("completed", "failed", "cancelled"))
+
+
+def event_stream_key(task_id):
+    return f"crawl:{task_id}:events"
+
+
+def cancel_key(task_id):
+    # Set (to the request time) when a crawl should stop; polled by its workers
+    return f"crawl:{task_id}:cancel"
+
+
+def publish_event(client, task_id, event, **fields):
+    """
+    Appends a progress event to the crawl's Redis stream. Only the latest
+    PROGRESS_STREAM_MAXLEN events are kept, and the stream expires
+    PROGRESS_TTL seconds after the last one.
+    """
+    key = event_stream_key(task_id)
+    entry = {"event": event, "ts": f"{time.time():.3f}"}
+    entry.update({name: str(value) for name, value in fields.items() if value is not None})
+
+    pipe = client.pipeline(transaction=False)
+    pipe.xadd(key, entry, maxlen=settings.PROGRESS_STREAM_MAXLEN, approximate=True)
+    pipe.expire(key, settings.PROGRESS_TTL)
+    pipe.execute()
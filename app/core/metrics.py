@@ -0,0 +1,57 @@
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest, start_http_server
+
+# Prometheus metrics of the API and the crawl workers. Each process exports
+# its own: the API on GET /metrics, a worker on WORKER_METRICS_PORT; the scrape
+# target's instance label tells workers apart. The default process collector
+# adds memory (process_resident_memory_bytes), CPU and open file metrics.
+
+NETWORK_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CPU_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Crawler (worker side)
+DOWNLOAD_SECONDS = Histogram(
+    "crawl_download_seconds",
+    "Download time by phase: queue (waiting for a slot and politeness delay), "
+    "latency (DNS, connect and time to first byte) and body (transfer)",
+    ["phase"], buckets=NETWORK_BUCKETS,
+)
+PARSE_SECONDS = Histogram("crawl_parse_seconds", "Time to extract a page's SEO facts", buckets=CPU_BUCKETS)
+SCORING_SECONDS = Histogram("crawl_scoring_seconds", "Time to score a pipeline batch", buckets=CPU_BUCKETS)
+BLOB_WRITE_SECONDS = Histogram("crawl_blob_write_seconds", "Time to store a batch's HTML", buckets=NETWORK_BUCKETS)
+DB_WRITE_SECONDS = Histogram("crawl_db_write_seconds", "Time to write a batch of crawl results", buckets=NETWORK_BUCKETS)
+DUPLICATE_INDEX_SECONDS = Histogram(
+    "crawl_duplicate_index_seconds", "Time to index a batch's MinHash signatures and find its near-duplicates",
+    buckets=NETWORK_BUCKETS,
+)
+SUMMARY_SECONDS = Histogram(
+    "crawl_summary_seconds", "Time to add a batch to its crawl's summary and histograms", buckets=NETWORK_BUCKETS,
+)
+BATCH_ROWS = Histogram("crawl_batch_rows", "Rows per pipeline batch", buckets=(1, 10, 50, 100, 250, 500, 1000, 2500))
+PAGES = Counter("crawl_pages", "Pages downloaded", ["host"])
+RESPONSE_BYTES = Counter("crawl_response_bytes", "Response body bytes downloaded", ["host"])
+QUEUE_DEPTH = Gauge("crawl_queue_depth", "Requests waiting in a crawl's scheduler", ["task_id"])
+IN_FLIGHT = Gauge("crawl_requests_in_flight", "Requests of a crawl being downloaded", ["task_id"])
+ACTIVE_CRAWLS = Gauge("crawl_active_crawls", "Crawls running in this worker")
+
+# API
+REQUEST_SECONDS = Histogram(
+    "api_request_seconds", "API request duration", ["method", "route", "status"], buckets=NETWORK_BUCKETS,
+)
+DB_STATEMENTS = Counter("api_db_statements", "SQL statements the API sent to the database")
+CACHE_LOOKUPS = Counter(
+    "api_cache_lookups", "Result cache lookups, by the tier that answered (local, redis) or miss", ["namespace", "tier"],
+)
+
+
+def render_metrics():
+    """
+    Returns this process's metrics in the Prometheus text format, and its content type.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port):
+    """
+    Serves this process's metrics over HTTP on `port` from a background thread.
+    """
+    start_http_server(port)
@@ -0,0 +1,33 @@
+import threading
+
+import redis
+import redis.asyncio
+
+from core.config import settings
+
+_client = None
+_client_lock = threading.Lock()
+_async_client = None
+
+
+def get_redis():
+    """
+    Returns a process-wide Redis client for the broker configured in settings.
+    The client is thread-safe and pools its connections.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+        return _client
+
+
+def get_async_redis():
+    """
+    Returns the API's asyncio Redis client (responses decoded to str).
+    Only use it from the server's event loop.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = redis.asyncio.Redis.from_url(settings.CELERY_BROKER_URL, decode_responses=True)
+    return _async_client
@@ -0,0 +1,33 @@
+from celery import group
+
+from celery_app import celery_app
+
+# Celery tasks the API enqueues, by name. The tasks themselves live in
+# crawling.tasks, which only workers import; that keeps Scrapy, Twisted and
+# lxml out of the API process.
+SEO_CRAWL_TASK = "crawling.tasks.seo_crawler_task"
+
+
+def crawl_signature(args, priority):
+    # The crawl's task_id (the first argument) is also its Celery task id, so
+    # /task_result/{task_id} finds the crawl's result
+    return celery_app.signature(SEO_CRAWL_TASK, args=args, priority=priority, task_id=args[0])
+
+
+def enqueue_crawl(args, priority):
+    """
+    Queues an SEO crawl (seo_crawler_task) with the given arguments.
+    """
+    return crawl_signature(args, priority).apply_async()
+
+
+def enqueue_crawls(crawls):
+    """
+    Queues SEO crawls, [(arguments, priority)], as one Celery group; its
+    messages are published over a single broker connection.
+    """
+    return group(crawl_signature(args, priority) for args, priority in crawls).apply_async()
+
+
+def task_result(task_id):
+    return celery_app.AsyncResult(task_id)
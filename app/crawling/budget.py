@@ -0,0 +1,110 @@
+import logging
+import math
+import re
+
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def budget_settings(budget=None, workers=1):
+    """
+    Scrapy settings enforcing a crawl budget, for one of `workers` workers.
+
+    `budget` may set max_pages, max_bytes, max_seconds and path_budgets
+    ({regex: max URLs}); anything missing falls back to the CRAWL_MAX_*
+    defaults. Page, byte and path budgets are split evenly between workers.
+    """
+    budget = budget or {}
+    max_pages = budget.get("max_pages") or settings.CRAWL_MAX_PAGES
+    max_bytes = budget.get("max_bytes") or settings.CRAWL_MAX_BYTES
+    path_budgets = budget.get("path_budgets") or {}
+
+    return {
+        # Scrapy's CloseSpider extension handles the page count and wall time
+        "CLOSESPIDER_PAGECOUNT": math.ceil(max_pages / workers),
+        "CLOSESPIDER_TIMEOUT": budget.get("max_seconds") or settings.CRAWL_MAX_SECONDS,
+        "CRAWL_BUDGET_PAGES": math.ceil(max_pages / workers),
+        "CRAWL_BUDGET_BYTES": math.ceil(max_bytes / workers),
+        "CRAWL_BUDGET_PATHS": {pattern: math.ceil(limit / workers) for pattern, limit in path_budgets.items()},
+    }
+
+
+class CrawlBudgetMiddleware:
+    """
+    Spider middleware enforcing the parts of a crawl budget Scrapy can't.
+
+    CLOSESPIDER_PAGECOUNT stops the crawl, but responses already in flight
+    are still parsed; CRAWL_BUDGET_PAGES drops the pages (and links) past the
+    budget so exactly that many are stored.
+
+    CRAWL_BUDGET_PATHS caps how many distinct URLs matching each regex
+    (searched in the URL) are followed, which keeps calendars, faceted
+    navigation and endless pagination in check; further matching links are
+    dropped. Only the URLs counted so far are remembered, so memory is bounded
+    by the budgets themselves. CRAWL_BUDGET_BYTES closes the spider with
+    reason "budget_bytes" once that many response bytes were downloaded.
+    """
+
+    def __init__(self, crawler, max_pages, max_bytes, path_budgets):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.max_pages = max_pages
+        self.pages = 0
+        self.max_bytes = max_bytes
+        self.path_budgets = [(re.compile(pattern), limit, set()) for pattern, limit in path_budgets.items()]
+        self.bytes_received = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        max_pages = crawler.settings.getint("CRAWL_BUDGET_PAGES")
+        max_bytes = crawler.settings.getint("CRAWL_BUDGET_BYTES")
+        path_budgets = crawler.settings.getdict("CRAWL_BUDGET_PATHS")
+        if not max_pages and not max_bytes and not path_budgets:
+            raise NotConfigured
+
+        middleware = cls(crawler, max_pages, max_bytes, path_budgets)
+        if max_bytes:
+            crawler.signals.connect(middleware.response_received, signal=signals.response_received)
+        return middleware
+
+    def response_received(self, response, request, spider):
+        self.bytes_received += len(response.body)
+        if self.bytes_received >= self.max_bytes:
+            # close_spider is a no-op once the spider is already closing
+            self.crawler.engine.close_spider(spider, "budget_bytes")
+
+    def process_start_requests(self, start_requests, spider):
+        # Sitemap seeds count against the path budgets like followed links
+        for request in start_requests:
+            if not self.within_path_budget(request.url):
+                self.stats.inc_value("budget/path_filtered")
+                continue
+            yield request
+
+    def process_spider_output(self, response, result, spider):
+        if self.max_pages:
+            self.pages += 1
+            if self.pages > self.max_pages:
+                self.stats.inc_value("budget/pages_dropped")
+                return
+
+        for entry in result:
+            if isinstance(entry, Request) and not self.within_path_budget(entry.url):
+                self.stats.inc_value("budget/path_filtered")
+                continue
+            yield entry
+
+    def within_path_budget(self, url):
+        for pattern, limit, counted in self.path_budgets:
+            if not pattern.search(url):
+                continue
+            if url in counted:
+                continue  # Already counted; the dupe filter deals with repeats
+            if len(counted) >= limit:
+                return False
+            counted.add(url)
+        return True
@@ -0,0 +1,94 @@
+import logging
+import time
+
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest
+from twisted.internet import task, threads
+
+from core.config import settings
+from core.events import cancel_key
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlCancellation:
+    """
+    Scrapy extension that stops a crawl once /stop_crawl has flagged it.
+
+    Every CANCEL_POLL_INTERVAL seconds it reads the crawl's cancel flag in
+    Redis (one GET per crawl, not per page), in the reactor thread pool so a
+    slow Redis holds up none of the worker's crawls. When the flag is set, the spider
+    is closed with reason "cancelled": queued requests are dropped, including
+    those already waiting for a download slot, the item pipeline flushes what
+    it has buffered, and the worker's crawl slot is freed. A crawl therefore
+    stops within the poll interval plus its slowest download in flight.
+    Every worker of a multi-worker crawl polls the same flag.
+
+    Stats: cancel/requested_at, cancel/detect_latency (seconds from the stop
+    request until the spider started closing, bounded by the poll interval)
+    and cancel/stop_latency (until it closed).
+    """
+
+    def __init__(self, crawler, client, interval):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.client = client
+        self.interval = interval
+        self.spider = None
+        self.requested_at = None
+        self._loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        extension = cls(crawler, get_redis(), crawler.settings.getfloat("CANCEL_POLL_INTERVAL", settings.CANCEL_POLL_INTERVAL))
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        if getattr(spider, "task_id", None) is None:
+            return
+
+        # Check right away too: the crawl may have been stopped while it was queued
+        self.spider = spider
+        self._loop = task.LoopingCall(self.check)
+        self._loop.start(self.interval, now=True)
+
+    def spider_closed(self, spider, reason):
+        if self._loop and self._loop.running:
+            self._loop.stop()
+        if reason == "cancelled" and self.requested_at is not None:
+            self.stats.set_value("cancel/stop_latency", round(time.time() - self.requested_at, 3))
+
+    def check(self):
+        # The loop waits for the returned Deferred, so checks never overlap
+        d = threads.deferToThread(self.client.get, cancel_key(self.spider.task_id))
+        d.addCallbacks(self.flagged, self._check_failed)
+        return d
+
+    def _check_failed(self, failure):
+        logger.warning(f"Could not check the cancel flag of crawl {self.spider.task_id}: {failure.getErrorMessage()}")
+
+    def flagged(self, requested):
+        # The spider may have closed while the flag was being read
+        if requested is None or not self._loop.running:
+            return
+
+        self._loop.stop()
+        self.requested_at = float(requested)
+        self.stats.set_value("cancel/requested_at", self.requested_at)
+        self.stats.set_value("cancel/detect_latency", round(time.time() - self.requested_at, 3))
+        logger.info(f"Crawl {self.spider.task_id} cancelled; stopping spider")
+        engine = self.crawler.engine
+        engine.close_spider(self.spider, "cancelled")
+
+        # The engine waits for every request the downloader holds; drop the ones
+        # still waiting for a slot so only transfers already under way are waited for
+        dropped = 0
+        for slot in list(engine.downloader.slots.values()):
+            while slot.queue:
+                _, deferred = slot.queue.popleft()
+                deferred.errback(IgnoreRequest("Crawl cancelled"))
+                dropped += 1
+        self.stats.set_value("cancel/dropped_downloads", dropped)
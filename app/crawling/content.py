@@ -0,0 +1,80 @@
+from weakref import WeakKeyDictionary
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured, StopDownload
+
+from core.config import settings
+
+# Content types SEOSpider extracts pages from
+HTML_CONTENT_TYPES = (b"text/html", b"application/xhtml+xml")
+
+
+def is_html(headers):
+    """
+    Whether response headers announce HTML. A missing Content-Type counts,
+    since Scrapy then sniffs the body.
+    """
+    content_type = headers.get(b"Content-Type")
+    if not content_type:
+        return True
+    return content_type.split(b";")[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+def is_truncated(response, max_bytes):
+    """
+    Whether ContentFilter cut the response's body short, or it is longer than
+    `max_bytes` after decompression and should be cut.
+    """
+    return bool(max_bytes) and ("download_stopped" in response.flags or len(response.body) > max_bytes)
+
+
+class ContentFilter:
+    """
+    Scrapy extension that keeps non-HTML and oversized bodies out of memory.
+
+    When a response's headers arrive and its Content-Type is not HTML
+    (CRAWL_HTML_ONLY), the download stops there: the spider gets the headers
+    and an empty body, so PDFs, images and archives are never read. HTML
+    bodies stop downloading once CRAWL_MAX_BODY_BYTES were received; the
+    spider parses what arrived (see is_truncated). robots.txt is left alone.
+    Both stops are logged at debug level by Scrapy and counted in the stats
+    as content/non_html and content/truncated.
+    """
+
+    def __init__(self, stats, html_only, max_bytes):
+        self.stats = stats
+        self.html_only = html_only
+        self.max_bytes = max_bytes
+        # Bytes received so far per request still downloading
+        self.received = WeakKeyDictionary()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        html_only = crawler.settings.getbool("CRAWL_HTML_ONLY", settings.CRAWL_HTML_ONLY)
+        max_bytes = crawler.settings.getint("CRAWL_MAX_BODY_BYTES", settings.CRAWL_MAX_BODY_BYTES)
+        if not html_only and not max_bytes:
+            raise NotConfigured
+
+        content_filter = cls(crawler.stats, html_only, max_bytes)
+        if html_only:
+            crawler.signals.connect(content_filter.headers_received, signal=signals.headers_received)
+        if max_bytes:
+            crawler.signals.connect(content_filter.bytes_received, signal=signals.bytes_received)
+        return content_filter
+
+    def headers_received(self, headers, body_length, request, spider):
+        if request.meta.get("dont_obey_robotstxt") or is_html(headers):
+            return
+        self.stats.inc_value("content/non_html")
+        raise StopDownload(fail=False)
+
+    def bytes_received(self, data, request, spider):
+        if request.meta.get("dont_obey_robotstxt"):
+            return
+        received = self.received.get(request, 0) + len(data)
+        if received <= self.max_bytes:
+            self.received[request] = received
+            return
+        self.received.pop(request, None)
+        self.stats.inc_value("content/truncated")
+        raise StopDownload(fail=False)
@@ -0,0 +1,99 @@
+import math
+
+from scrapy.dupefilters import BaseDupeFilter
+
+from core.config import settings
+
+
+def bloom_offsets(fingerprint, bits, hashes):
+    """
+    Bit positions of a request fingerprint in a Bloom filter of `bits` bits,
+    using double hashing over the first 16 bytes of the fingerprint.
+    """
+    h1 = int.from_bytes(fingerprint[:8], "big")
+    h2 = int.from_bytes(fingerprint[8:16], "big") | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+def bloom_size(capacity, error_rate, max_bytes):
+    """
+    Bits and hash count for `capacity` items at `error_rate`, capped at `max_bytes` of memory.
+    """
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    bits = max(8, min(bits, max_bytes * 8))
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    """
+    Fixed-size in-memory Bloom filter over request fingerprints.
+    """
+
+    def __init__(self, bits, hashes):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+        self.count = 0
+
+    def add(self, fingerprint):
+        """
+        Adds a fingerprint. Returns False if it was (probably) there already.
+        """
+        array = self.array
+        new = False
+        for offset in bloom_offsets(fingerprint, self.bits, self.hashes):
+            byte, bit = offset >> 3, 1 << (offset & 7)
+            if not array[byte] & bit:
+                array[byte] |= bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, fingerprint):
+        array = self.array
+        return all(
+            array[offset >> 3] & (1 << (offset & 7))
+            for offset in bloom_offsets(fingerprint, self.bits, self.hashes)
+        )
+
+
+class BloomDupeFilter(BaseDupeFilter):
+    """
+    Request dupe filter with a memory ceiling.
+
+    Scrapy's default filter keeps every fingerprint in a set, which grows
+    without bound on faceted sites (about 117 MiB per million URLs). This one
+    keeps them in a Bloom filter sized for DEDUP_CAPACITY URLs at
+    DEDUP_ERROR_RATE and never larger than DEDUP_MAX_MEMORY bytes: 1.7 MiB per
+    million URLs, or a fixed 17 MiB at the defaults. The price is that a small
+    fraction of new URLs get mistaken for seen ones and are skipped.
+    """
+
+    def __init__(self, fingerprinter, capacity, error_rate, max_bytes, stats=None):
+        self.fingerprinter = fingerprinter
+        self.stats = stats
+        self.seen = BloomFilter(*bloom_size(capacity, error_rate, max_bytes))
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            crawler.request_fingerprinter,
+            capacity=crawler.settings.getint("DEDUP_CAPACITY", settings.DEDUP_CAPACITY),
+            error_rate=crawler.settings.getfloat("DEDUP_ERROR_RATE", settings.DEDUP_ERROR_RATE),
+            max_bytes=crawler.settings.getint("DEDUP_MAX_MEMORY", settings.DEDUP_MAX_MEMORY),
+            stats=crawler.stats,
+        )
+
+    def request_seen(self, request):
+        return not self.seen.add(self.fingerprinter.fingerprint(request))
+
+    def log(self, request, spider):
+        if self.stats:
+            self.stats.inc_value("dupefilter/filtered", spider=spider)
+
+    def close(self, reason):
+        if self.stats:
+            self.stats.set_value("dupefilter/unique", self.seen.count)
+            self.stats.set_value("dupefilter/memory_bytes", len(self.seen.array))
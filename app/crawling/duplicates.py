@@ -0,0 +1,79 @@
+import uuid
+
+from sqlalchemy import bindparam, insert, select
+
+from analysis.duplicates import band_keys, similarity
+from models.crawl_results import CrawlResult, NearDuplicate, MinHashBand
+
+# Bucket keys looked up per query
+_LOOKUP_CHUNK = 1000
+
+_bands = MinHashBand.__table__
+_results = CrawlResult.__table__
+LOOKUP_BAND = (
+    select(_bands.c.key, _bands.c.page_id, _results.c.minhash)
+    .join(_results, _results.c.id == _bands.c.page_id)
+    .where(
+        _bands.c.task_id == bindparam("task_id"),
+        _bands.c.band == bindparam("band"),
+        _bands.c.key.in_(bindparam("keys", expanding=True)),
+    )
+)
+
+
+def index_near_duplicates(conn, task_id, pages, min_similarity):
+    """
+    Adds a batch of pages, [(page id, MinHash signature)], to the crawl's LSH
+    index and records their near-duplicates among all pages the crawl indexed
+    so far (this batch included): candidates sharing a band bucket whose
+    estimated similarity is at least `min_similarity`. Runs in the batch's
+    transaction, so duplicates are found as the crawl goes. Unrelated pages
+    practically never share a bucket, so the candidates a batch compares
+    don't grow with the crawl; only the index lookups and inserts do, with
+    the log of its size. Returns the number of near-duplicate pairs found.
+    """
+    if not pages:
+        return 0
+
+    signatures = dict(pages)
+    page_keys = {page_id: band_keys(signature) for page_id, signature in signatures.items()}
+
+    candidates = set()
+    for band in range(len(next(iter(page_keys.values())))):
+        # The batch's own pages share buckets in memory, earlier pages through the index
+        buckets = {}
+        for page_id, keys in page_keys.items():
+            buckets.setdefault(keys[band], []).append(page_id)
+        keys = sorted(buckets)
+        for start in range(0, len(keys), _LOOKUP_CHUNK):
+            rows = conn.execute(LOOKUP_BAND, {"task_id": task_id, "band": band, "keys": keys[start:start + _LOOKUP_CHUNK]})
+            for key, candidate_id, signature in rows:
+                buckets[key].append(candidate_id)
+                signatures.setdefault(candidate_id, signature)
+
+        for bucket in buckets.values():
+            if len(bucket) > 1:
+                batch_pages = [page_id for page_id in bucket if page_id in page_keys]
+                # Pairs sharing several bands come up more than once
+                candidates.update(
+                    tuple(sorted((page_id, other))) for i, page_id in enumerate(batch_pages)
+                    for other in bucket[i + 1:]
+                )
+
+    # In index order, so inserting walks the B-tree once instead of jumping around
+    conn.execute(insert(_bands), [
+        {"task_id": task_id, "band": band, "key": key, "page_id": page_id}
+        for band, key, page_id in sorted(
+            (band, key, page_id) for page_id, keys in page_keys.items() for band, key in enumerate(keys)
+        )
+    ])
+
+    found = []
+    for a, b in candidates:
+        score = float(similarity(signatures[a], [signatures[b]])[0])
+        if score >= min_similarity:
+            found.append({"id": uuid.uuid4(), "task_id": task_id, "page_id": a, "duplicate_id": b, "similarity": score})
+
+    if found:
+        conn.execute(insert(NearDuplicate.__table__), found)
+    return len(found)
@@ -0,0 +1,112 @@
+from analysis.duplicates import minhash, words
+
+# Text nodes of an element that are not script or style code
+_VISIBLE_TEXT = ".//text()[not(parent::script) and not(parent::style) and not(parent::noscript)]"
+
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+# Elements the extractor looks at; everything else is skipped by lxml itself
+_EXTRACTED_TAGS = ("title", "meta", "link", "body", "img", "a") + HEADING_TAGS
+
+
+class PageFacts:
+    """
+    Everything the spider and the SEO scoring need from a single page.
+    """
+
+    __slots__ = (
+        "url",
+        "title",
+        "meta_description",
+        "canonical",
+        "headings",
+        "h1_count",
+        "alt_texts",
+        "image_count",
+        "images_missing_alt",
+        "links",
+        "word_count",
+        "minhash",
+    )
+
+    def __init__(self, url):
+        self.url = url
+        self.title = None
+        self.meta_description = None
+        self.canonical = None
+        self.headings = {tag: [] for tag in HEADING_TAGS}
+        self.h1_count = 0
+        self.alt_texts = []
+        self.image_count = 0
+        self.images_missing_alt = 0
+        self.links = []
+        self.word_count = 0
+        self.minhash = None
+
+
+def extract_page_facts(response):
+    """
+    Collects the PageFacts of an HTML response in one walk over its lxml tree.
+
+    Reuses the tree Scrapy already parsed for the response, and only touches the
+    elements listed in _EXTRACTED_TAGS, instead of running one XPath query (and
+    building one Selector per match) for every field.
+    """
+    facts = PageFacts(response.url)
+    root = response.selector.root
+    if root is None:
+        return facts
+
+    headings = facts.headings
+    links = facts.links
+    alt_texts = facts.alt_texts
+
+    for element in root.iter(*_EXTRACTED_TAGS):
+        tag = element.tag
+
+        if tag == "a":
+            href = element.get("href")
+            if href is not None:
+                links.append(href)
+
+        elif tag == "img":
+            facts.image_count += 1
+            alt = element.get("alt")
+            if alt is not None:
+                alt_texts.append(alt)
+            if not alt or not alt.strip():
+                facts.images_missing_alt += 1
+
+        elif tag in headings:
+            # H1s with any text, nested markup included; an empty one is as good as none
+            if tag == "h1" and any(text.strip() for text in element.itertext()):
+                facts.h1_count += 1
+            # Only the heading's own text nodes, like //h1/text()
+            texts = headings[tag]
+            if element.text:
+                texts.append(element.text)
+            for child in element:
+                if child.tail:
+                    texts.append(child.tail)
+
+        elif tag == "title":
+            if facts.title is None and element.text:
+                facts.title = element.text
+
+        elif tag == "meta":
+            if facts.meta_description is None and element.get("name") == "description":
+                facts.meta_description = element.get("content")
+
+        elif tag == "link":
+            if facts.canonical is None and (element.get("rel") or "").lower() == "canonical":
+                facts.canonical = element.get("href")
+
+        elif tag == "body":
+            # The visible text, collected once: scripts and styles are neither
+            # words a reader sees nor content that tells pages apart
+            texts = element.xpath(_VISIBLE_TEXT)
+            # Count words per text node instead of joining the whole body text
+            facts.word_count += sum(len(text.split()) for text in texts)
+            facts.minhash = minhash([word for text in texts for word in words(text)])
+
+    return facts
@@ -0,0 +1,143 @@
+from urllib.parse import urlparse
+
+from core.config import settings
+from crawling.dedup import bloom_offsets
+
+# Depth dominates the queue order; request priority breaks ties within a depth
+_DEPTH_WEIGHT = 2 ** 32
+
+
+class RedisFrontier:
+    """
+    The to-crawl queue and seen-URL set of one crawl, shared through Redis so
+    several workers (or nodes) can crawl the same site together.
+
+    Each host has its own sorted set ordered by depth, then priority; hosts are
+    served round-robin. Requests are added and taken in batches, each batch
+    in a fixed number of pipelined round trips. Seen URLs are tracked in a Bloom filter stored as a
+    Redis bitmap, so dedup memory stays fixed no matter how large the site is.
+    """
+
+    def __init__(self, client, task_id, bloom_bits=None, bloom_hashes=None):
+        self.client = client
+        self.bloom_bits = bloom_bits or settings.FRONTIER_BLOOM_BITS
+        self.bloom_hashes = bloom_hashes or settings.FRONTIER_BLOOM_HASHES
+
+        prefix = f"frontier:{task_id}"
+        self.seen_key = f"{prefix}:seen"
+        self.size_key = f"{prefix}:size"
+        self.hosts_key = f"{prefix}:hosts"  # Set of every host with a queue
+        self.ring_key = f"{prefix}:ring"  # Same hosts as a list, rotated on pop
+        self.queue_prefix = f"{prefix}:queue:"
+
+    def __len__(self):
+        return int(self.client.get(self.size_key) or 0)
+
+    def mark_seen(self, fingerprint):
+        """
+        Adds a fingerprint to the seen set. Returns False if it was (probably) there already.
+        """
+        return self.add_many([(fingerprint, None, None, 0, 0, False)], push=False)[0] > 0
+
+    def push(self, url, payload, depth=0, priority=0):
+        self.push_many([(url, payload, depth, priority)])
+
+    def add_many(self, entries, push=True):
+        """
+        Marks a batch of requests as seen and queues the new ones, in two or
+        three round trips whatever the batch size. `entries` are (fingerprint,
+        url, payload, depth, priority, dont_filter); unfiltered requests are
+        queued even when already seen. Returns (queued, filtered).
+        """
+        pipe = self.client.pipeline(transaction=True)
+        for fingerprint, *_ in entries:
+            for offset in bloom_offsets(fingerprint, self.bloom_bits, self.bloom_hashes):
+                pipe.setbit(self.seen_key, offset, 1)
+        # SETBIT returns the previous bit: all set means seen before, including
+        # earlier in this same batch
+        previous = iter(pipe.execute())
+        queued = []
+        for fingerprint, url, payload, depth, priority, dont_filter in entries:
+            seen = all([next(previous) for _ in range(self.bloom_hashes)])
+            if dont_filter or not seen:
+                queued.append((url, payload, depth, priority))
+        if push and queued:
+            self.push_many(queued)
+        return len(queued), len(entries) - len(queued)
+
+    def push_many(self, entries):
+        """
+        Queues (url, payload, depth, priority) entries without checking the seen set.
+        """
+        by_host = {}
+        for url, payload, depth, priority in entries:
+            by_host.setdefault(urlparse(url).netloc, {})[payload] = depth * _DEPTH_WEIGHT - priority
+
+        pipe = self.client.pipeline(transaction=True)
+        for host, members in by_host.items():
+            pipe.zadd(self.queue_prefix + host, members)
+        pipe.incrby(self.size_key, len(entries))
+        for host in by_host:
+            pipe.sadd(self.hosts_key, host)
+        new_hosts = [host for host, added in zip(by_host, pipe.execute()[-len(by_host):]) if added]
+        if new_hosts:
+            self.client.rpush(self.ring_key, *new_hosts)
+
+    def pop(self):
+        """
+        Returns the next payload, or None if the frontier is empty.
+        """
+        payloads, _ = self.pop_many(1)
+        return payloads[0] if payloads else None
+
+    def pop_many(self, count):
+        """
+        Takes up to `count` payloads, taking hosts in turn, in two round trips
+        per pass whatever the count. Returns them with the number of payloads
+        left in the frontier.
+        """
+        payloads = []
+        barren = 0  # Turns since a host last had something queued
+        while len(payloads) < count:
+            # Rotating the ring names the hosts to take from, in turn; a host
+            # comes up again once every host has had its turn
+            pipe = self.client.pipeline(transaction=True)
+            pipe.llen(self.ring_key)
+            for _ in range(count - len(payloads)):
+                pipe.rpoplpush(self.ring_key, self.ring_key)
+            ring_size, *turns = pipe.execute()
+            turns = [host.decode() for host in turns if host is not None]
+            if not turns:
+                break
+
+            hosts = list(dict.fromkeys(turns))
+            pipe = self.client.pipeline(transaction=True)
+            for host in hosts:
+                pipe.zpopmin(self.queue_prefix + host, turns.count(host))
+            queues = {host: [payload for payload, _ in popped] for host, popped in zip(hosts, pipe.execute())}
+            for host in turns:
+                if queues[host]:
+                    payloads.append(queues[host].pop(0))
+                    barren = 0
+                else:
+                    barren += 1
+            # A whole round of the ring came up empty
+            if barren >= ring_size:
+                break
+
+        if not payloads:
+            return [], len(self)
+        return payloads, self.client.decrby(self.size_key, len(payloads))
+
+    def expire(self, ttl=None):
+        """
+        Lets all of the crawl's frontier keys expire after `ttl` seconds.
+        """
+        ttl = ttl or settings.FRONTIER_TTL
+        keys = [self.seen_key, self.size_key, self.hosts_key, self.ring_key]
+        keys += [self.queue_prefix + host.decode() for host in self.client.smembers(self.hosts_key)]
+
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.expire(key, ttl)
+        pipe.execute()
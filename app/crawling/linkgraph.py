@@ -0,0 +1,217 @@
+import json
+import logging
+import time
+import uuid
+
+from scrapy import signals
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from twisted.internet import defer, threads
+
+from analysis.linkgraph import LinkGraph, analyze, crawled_pages
+from core.config import settings
+from crawling.urls import canonicalize_url
+from database.session import engine, init_db
+from models.crawl_results import CrawlGraph, CrawlLinkFragment, CrawlResult
+from storage.blobs import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+
+def new_fragment(seeds=()):
+    return {"seeds": list(seeds), "pages": [], "redirects": [], "links": [], "unchanged": []}
+
+
+def store_fragment(db_engine, blob_store, task_id, fragment, final=False):
+    """
+    Stores a link graph fragment in the blob store and records it for the crawl.
+    """
+    key = blob_store.put(json.dumps(fragment, separators=(",", ":")).encode("utf-8"))
+    with db_engine.begin() as conn:
+        conn.execute(insert(CrawlLinkFragment.__table__).values(
+            id=uuid.uuid4(),
+            task_id=uuid.UUID(str(task_id)),
+            blob_key=key,
+            pages=len(fragment["pages"]),
+            links=sum(len(links) for _, links in fragment["links"]),
+            final=final,
+        ))
+
+
+class LinkGraphRecorder:
+    """
+    Scrapy extension that records a crawl's link graph for the post-crawl
+    link analysis (analyze_link_graph).
+
+    Every response's URL and status (including 4xx/5xx, which never reach the
+    spider), every redirect hop and the internal links of parsed pages (the
+    items' `links`) are collected into a fragment. The fragment is written to
+    the blob store whenever it holds LINK_GRAPH_FRAGMENT_LINKS links, and when
+    the spider closes; each worker of a multi-worker crawl writes its own.
+    """
+
+    def __init__(self, db_engine, blob_store, fragment_links):
+        self.engine = db_engine
+        self.blob_store = blob_store
+        self.fragment_links = fragment_links
+        self.task_id = None
+        self.fragment = None
+        self.link_count = 0
+        self._write_lock = defer.DeferredLock()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        recorder = cls(
+            engine,
+            get_blob_store(),
+            crawler.settings.getint("LINK_GRAPH_FRAGMENT_LINKS", settings.LINK_GRAPH_FRAGMENT_LINKS),
+        )
+        crawler.signals.connect(recorder.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(recorder.response_received, signal=signals.response_received)
+        crawler.signals.connect(recorder.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(recorder.spider_closed, signal=signals.spider_closed)
+        return recorder
+
+    def spider_opened(self, spider):
+        self.task_id = getattr(spider, "task_id", None)
+        strip_trailing_slash = getattr(spider, "strip_trailing_slash", False)
+        self.fragment = new_fragment(canonicalize_url(url, strip_trailing_slash) for url in spider.start_urls)
+
+    def response_received(self, response, request, spider):
+        if self.task_id is None or request.meta.get("dont_obey_robotstxt"):
+            return  # robots.txt and other non-page fetches
+
+        # redirect_urls holds every URL before the final one; reasons their statuses
+        hops = request.meta.get("redirect_urls", [])
+        reasons = request.meta.get("redirect_reasons", [])
+        for url, reason, location in zip(hops, reasons, hops[1:] + [response.url]):
+            self.fragment["redirects"].append((url, reason if isinstance(reason, int) else 200, location))
+        self.fragment["pages"].append((response.url, response.status))
+
+    def item_scraped(self, item, response, spider):
+        if self.task_id is None or not isinstance(item, dict):
+            return
+        if item.get("change_status") == "unchanged":
+            self.fragment["unchanged"].append(item["url"])
+
+        links = item.get("links")
+        if links is not None:
+            self.fragment["links"].append((item["url"], links))
+            self.link_count += len(links)
+            if self.link_count >= self.fragment_links:
+                self.flush()
+
+    def spider_closed(self, spider):
+        if self.task_id is None:
+            return None
+        return self.flush(final=True)
+
+    def flush(self, final=False):
+        fragment, self.fragment = self.fragment, new_fragment()
+        self.link_count = 0
+        d = self._write_lock.run(
+            threads.deferToThread, store_fragment, self.engine, self.blob_store, self.task_id, fragment, final,
+        )
+        d.addErrback(self._log_failed_fragment)
+        return d
+
+    def _log_failed_fragment(self, failure):
+        logger.error(f"Failed to store link graph fragment of crawl {self.task_id}: {failure.getErrorMessage()}")
+
+
+def wait_for_fragments(db_engine, task_id, workers, timeout):
+    """
+    Waits until each of the crawl's `workers` stored its final fragment;
+    returns False if they haven't within `timeout` seconds.
+    """
+    table = CrawlLinkFragment.__table__
+    query = select(func.count()).where(table.c.task_id == uuid.UUID(task_id), table.c.final.is_(True))
+    deadline = time.monotonic() + timeout
+    while True:
+        with db_engine.connect() as conn:
+            if conn.execute(query).scalar() >= workers:
+                return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.5)
+
+
+def load_prior_graph(db_engine, blob_store, project_id, task_id):
+    """
+    Returns the LinkGraph of the project's latest other analyzed crawl, or None.
+    """
+    table = CrawlGraph.__table__
+    with db_engine.connect() as conn:
+        row = conn.execute(
+            select(table.c.blob_key)
+            .where(table.c.project_id == project_id, table.c.task_id != task_id)
+            .order_by(table.c.created_at.desc())
+            .limit(1)
+        ).first()
+    return LinkGraph.from_bytes(blob_store.get(row.blob_key)) if row else None
+
+
+def analyze_link_graph(task_id, project_id=None, db_engine=None, blob_store=None, max_listed=None):
+    """
+    Post-crawl link analysis: builds the crawl's link graph from its
+    fragments, analyzes it (analysis.linkgraph.analyze), stores the graph and
+    summary as its crawl_graphs row and writes inlinks, broken_links,
+    click_depth and pagerank to its crawl_results rows. Returns the summary.
+    """
+    db_engine = db_engine or engine
+    blob_store = blob_store or get_blob_store()
+    task_uuid = uuid.UUID(str(task_id))
+    project_uuid = uuid.UUID(str(project_id)) if project_id else None
+    init_db(db_engine)
+
+    started = time.perf_counter()
+    fragments_table = CrawlLinkFragment.__table__
+    with db_engine.connect() as conn:
+        keys = conn.execute(
+            select(fragments_table.c.blob_key).where(fragments_table.c.task_id == task_uuid)
+        ).scalars().all()
+    fragments = [json.loads(blob_store.get(key)) for key in keys]
+
+    # Unchanged pages of an incremental crawl take their links from the previous graph
+    prior = None
+    if project_uuid and any(fragment["unchanged"] for fragment in fragments):
+        prior = load_prior_graph(db_engine, blob_store, project_uuid, task_uuid)
+
+    graph = LinkGraph.from_fragments(fragments, prior)
+    per_page, summary = analyze(graph, max_listed or settings.LINK_ANALYSIS_MAX_LISTED)
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+
+    graph_key = blob_store.put(graph.to_bytes())
+    results = CrawlResult.__table__
+    update_metrics = (
+        update(results)
+        .where(results.c.task_id == bindparam("b_task_id"), results.c.url == bindparam("b_url"))
+        .values(
+            inlinks=bindparam("b_inlinks"), broken_links=bindparam("b_broken_links"),
+            click_depth=bindparam("b_click_depth"), pagerank=bindparam("b_pagerank"),
+        )
+    )
+    pages = crawled_pages(graph).nonzero()[0]
+    with db_engine.begin() as conn:
+        conn.execute(delete(CrawlGraph.__table__).where(CrawlGraph.__table__.c.task_id == task_uuid))
+        conn.execute(insert(CrawlGraph.__table__).values(
+            task_id=task_uuid, project_id=project_uuid, nodes=len(graph), edges=graph.edge_count,
+            blob_key=graph_key, summary=json.dumps(summary),
+        ))
+        if len(pages):
+            conn.execute(update_metrics, [
+                {
+                    "b_task_id": task_uuid,
+                    "b_url": graph.urls[node],
+                    "b_inlinks": int(per_page["inlinks"][node]),
+                    "b_broken_links": int(per_page["broken_links"][node]),
+                    "b_click_depth": int(per_page["click_depth"][node]) if per_page["click_depth"][node] >= 0 else None,
+                    "b_pagerank": float(per_page["pagerank"][node]),
+                }
+                for node in pages
+            ])
+
+    logger.info(
+        f"Link analysis of crawl {task_id}: {len(graph)} URLs, {graph.edge_count} links, "
+        f"{summary['broken_link_count']} broken, {summary['orphan_count']} orphans in {summary['seconds']} s"
+    )
+    return summary
@@ -0,0 +1,116 @@
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+from scrapy import signals
+from twisted.internet import task
+
+from core import metrics
+from core.config import settings
+
+# Crawls running in this worker, per host; a host's page and byte series are
+# dropped when its last crawl closes
+_crawl_hosts = Counter()
+
+
+class CrawlMetrics:
+    """
+    Scrapy extension that feeds a crawl's downloads into the worker's
+    Prometheus metrics (core.metrics).
+
+    Each response's download is split into phases from the request timeline:
+    queue (from reaching the downloader to the handler sending it), latency
+    (Scrapy's download_latency: DNS, connect and time to first byte; Scrapy
+    doesn't separate these) and body (headers to last byte). Pages and bytes
+    are counted for the crawl's host (its start URL's, or for a helper without
+    one, its first page's) and under "other" for any other host, so the host
+    label only takes the values of the crawls running. The crawl's scheduler
+    queue depth and requests in flight are sampled every METRICS_INTERVAL
+    seconds.
+    """
+
+    def __init__(self, crawler, interval):
+        self.crawler = crawler
+        self.interval = interval
+        self.task_id = None
+        self.host = None
+        self._loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        extension = cls(crawler, crawler.settings.getfloat("METRICS_INTERVAL", settings.METRICS_INTERVAL))
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(extension.request_reached_downloader, signal=signals.request_reached_downloader)
+        crawler.signals.connect(extension.headers_received, signal=signals.headers_received)
+        crawler.signals.connect(extension.response_downloaded, signal=signals.response_downloaded)
+        return extension
+
+    def spider_opened(self, spider):
+        self.task_id = str(getattr(spider, "task_id", spider.name))
+        start_urls = getattr(spider, "start_urls", None)
+        if start_urls:
+            self._set_host(urlparse(start_urls[0]).hostname)
+        metrics.ACTIVE_CRAWLS.inc()
+        self._loop = task.LoopingCall(self.sample)
+        self._loop.start(self.interval, now=True)
+
+    def spider_closed(self, spider):
+        if self._loop and self._loop.running:
+            self._loop.stop()
+        metrics.ACTIVE_CRAWLS.dec()
+        # Per-crawl series would otherwise outlive the crawl
+        for gauge in (metrics.QUEUE_DEPTH, metrics.IN_FLIGHT):
+            try:
+                gauge.remove(self.task_id)
+            except KeyError:
+                pass
+        if self.host is not None:
+            _crawl_hosts[self.host] -= 1
+            if _crawl_hosts[self.host] <= 0:
+                del _crawl_hosts[self.host]
+                for counter in (metrics.PAGES, metrics.RESPONSE_BYTES):
+                    try:
+                        counter.remove(self.host)
+                    except KeyError:
+                        pass
+
+    def _set_host(self, host):
+        self.host = host or ""
+        _crawl_hosts[self.host] += 1
+
+    def request_reached_downloader(self, request, spider):
+        request.meta["metrics_queued_at"] = time.time()
+
+    def headers_received(self, headers, body_length, request, spider):
+        request.meta["metrics_headers_at"] = time.time()
+
+    def response_downloaded(self, response, request, spider):
+        now = time.time()
+        host = urlparse(response.url).hostname or ""
+        if self.host is None:
+            self._set_host(host)
+        if host != self.host:
+            host = "other"
+        metrics.PAGES.labels(host).inc()
+        metrics.RESPONSE_BYTES.labels(host).inc(len(response.body))
+
+        latency = request.meta.get("download_latency")
+        queued_at = request.meta.get("metrics_queued_at")
+        headers_at = request.meta.get("metrics_headers_at")
+        if latency is None or headers_at is None:
+            return  # Not an HTTP download (or served by a cache)
+
+        metrics.DOWNLOAD_SECONDS.labels("latency").observe(latency)
+        metrics.DOWNLOAD_SECONDS.labels("body").observe(max(now - headers_at, 0.0))
+        if queued_at is not None:
+            metrics.DOWNLOAD_SECONDS.labels("queue").observe(max(headers_at - latency - queued_at, 0.0))
+
+    def sample(self):
+        engine = self.crawler.engine
+        if engine is None or engine.slot is None:
+            return
+        scheduler = engine.slot.scheduler
+        if hasattr(scheduler, "__len__"):
+            metrics.QUEUE_DEPTH.labels(self.task_id).set(len(scheduler))
+        metrics.IN_FLIGHT.labels(self.task_id).set(len(engine.downloader.active))
@@ -0,0 +1,236 @@
+import logging
+import time
+import uuid
+
+from sqlalchemy import Uuid, bindparam, insert, literal, select
+from sqlalchemy.exc import SQLAlchemyError
+from twisted.internet import defer, task, threads
+
+from analysis.rules import RULES
+from analysis.summary import AGGREGATED_COLUMNS
+from core import metrics
+from core.config import settings
+from crawling.duplicates import index_near_duplicates
+from crawling.summary import record_pages, sync_issue_codes
+from database.session import engine, init_db
+from models.crawl_results import CrawlResult
+from storage.blobs import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+# Columns the pipeline writes; anything else on an item is ignored
+RESULT_COLUMNS = [
+    column.name for column in CrawlResult.__table__.columns
+    if column.name not in ("id", "created_at")
+]
+
+# Unchanged pages of an incremental crawl: copy the previous row in the
+# database, under the new crawl's task ID, instead of storing it again
+_COPIED_COLUMNS = [column for column in RESULT_COLUMNS if column not in ("task_id", "change_status")]
+_table = CrawlResult.__table__
+COPY_UNCHANGED = insert(_table).from_select(
+    ["id", "task_id", "change_status", *_COPIED_COLUMNS],
+    select(
+        bindparam("new_id", type_=Uuid),
+        bindparam("task_id", type_=Uuid),
+        literal("unchanged"),
+        *(_table.c[column] for column in _COPIED_COLUMNS),
+    ).where(_table.c.id == bindparam("prior_id", type_=Uuid)),
+)
+
+
+class CrawlResultPipeline:
+    """
+    Buffers crawled pages and writes them to the crawl_results table in batches.
+
+    A batch is flushed when it reaches PIPELINE_BATCH_SIZE rows or when
+    PIPELINE_FLUSH_INTERVAL seconds have passed since the last flush. Each batch
+    is scored against the SEO rules and written in the reactor thread pool, one
+    at a time, over the shared SQLAlchemy engine so the crawl never waits on it.
+    Page HTML goes to the blob store; rows only keep its content hash. Pages
+    an incremental crawl found unchanged are copied from their previous row
+    without being scored again. Each batch's fingerprinted pages are added to
+    the crawl's near-duplicate index (crawling.duplicates) and counted in the
+    crawl's summary (crawling.summary) in the same transaction. A batch the
+    database rejects is written again one row at a time, so only the rows it
+    rejects are lost.
+    """
+
+    def __init__(self, db_engine, batch_size, flush_interval, stats=None, rules=RULES, blob_store=None,
+                 duplicate_similarity=None, duplicate_min_words=0):
+        self.engine = db_engine
+        self.blob_store = blob_store
+        self.duplicate_similarity = duplicate_similarity
+        self.duplicate_min_words = duplicate_min_words
+        self.rules = rules
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = stats
+        self.buffer = []
+        self.copies = []
+        self.last_flush = time.monotonic()
+        self._write_lock = defer.DeferredLock()
+        self._flush_loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            db_engine=engine,
+            batch_size=crawler.settings.getint("PIPELINE_BATCH_SIZE", settings.PIPELINE_BATCH_SIZE),
+            flush_interval=crawler.settings.getfloat("PIPELINE_FLUSH_INTERVAL", settings.PIPELINE_FLUSH_INTERVAL),
+            stats=crawler.stats,
+            blob_store=get_blob_store(),
+            duplicate_similarity=settings.NEAR_DUPLICATE_SIMILARITY,
+            duplicate_min_words=settings.NEAR_DUPLICATE_MIN_WORDS,
+        )
+
+    def open_spider(self, spider):
+        # Make sure the tables exist, and know the rules' issue codes, before
+        # the first batch lands
+        d = threads.deferToThread(init_db, self.engine)
+        d.addCallback(lambda _: threads.deferToThread(sync_issue_codes, self.engine, self.rules))
+
+        # Time-based flushing so slow crawls still persist their results
+        self._flush_loop = task.LoopingCall(self._flush_if_stale)
+        self._flush_loop.start(self.flush_interval, now=False)
+        return d
+
+    def process_item(self, item, spider):
+        if item.get("change_status") == "unchanged":
+            self.copies.append({
+                "new_id": uuid.uuid4(),
+                "task_id": uuid.UUID(str(item["task_id"])),
+                "prior_id": uuid.UUID(str(item["prior_id"])),
+            })
+        else:
+            self.buffer.append(self.to_row(item))
+
+        if len(self.buffer) + len(self.copies) >= self.batch_size:
+            self.flush()
+        return item
+
+    def close_spider(self, spider):
+        if self._flush_loop and self._flush_loop.running:
+            self._flush_loop.stop()
+
+        # Write whatever is left and wait for all pending batches
+        return self.flush()
+
+    def to_row(self, item):
+        row = {column: item.get(column) for column in RESULT_COLUMNS}
+        row["id"] = uuid.uuid4()  # Known up front, for the near-duplicate index
+        row["project_id"] = uuid.UUID(str(row["project_id"]))
+        row["task_id"] = uuid.UUID(str(row["task_id"])) if row["task_id"] else None
+        row["broken_links"] = row["broken_links"] or 0
+        row["raw_html"] = item.get("raw_html")
+        return row
+
+    def flush(self):
+        """
+        Hands the current buffer to a worker thread and returns a Deferred that
+        fires once it has been written.
+        """
+        self.last_flush = time.monotonic()
+        if not self.buffer and not self.copies:
+            return self._write_lock.run(defer.succeed, None)
+
+        batch, self.buffer = self.buffer, []
+        copies, self.copies = self.copies, []
+        d = self._write_lock.run(threads.deferToThread, self.write_batch, batch, copies)
+        d.addCallbacks(self._record_batch, self._log_failed_batch, errbackArgs=(len(batch) + len(copies),))
+        return d
+
+    def write_batch(self, rows, copies=()):
+        # Runs outside the reactor thread: store the HTML, score the whole
+        # batch at once, then a single executemany
+        with metrics.BLOB_WRITE_SECONDS.time():
+            for row in rows:
+                html = row.pop("raw_html")
+                if html is not None:
+                    self.blob_store.put(html, row["content_hash"])
+        if rows:
+            with metrics.SCORING_SECONDS.time():
+                self.rules.score_rows(rows)
+        metrics.BATCH_ROWS.observe(len(rows) + len(copies))
+        try:
+            return len(rows) + len(copies), self.store(rows, copies), 0
+        except SQLAlchemyError as e:
+            # The driver's message, without SQLAlchemy echoing every row back
+            logger.warning(f"Batch of {len(rows) + len(copies)} crawl results rejected, writing it row by row: "
+                           f"{getattr(e, 'orig', None) or e}")
+
+        written = near_duplicates = failed = 0
+        for one_row, one_copy in [([row], []) for row in rows] + [([], [copy]) for copy in copies]:
+            try:
+                near_duplicates += self.store(one_row, one_copy)
+                written += 1
+            except SQLAlchemyError as e:
+                failed += 1
+                page = one_row[0]["url"] if one_row else f"copy of {one_copy[0]['prior_id']}"
+                logger.error(f"Failed to write crawl result {page}: {getattr(e, 'orig', None) or e}")
+        return written, near_duplicates, failed
+
+    def store(self, rows, copies):
+        """
+        Writes scored rows and copies in one transaction; returns the number
+        of near-duplicate pairs found.
+        """
+        with metrics.DB_WRITE_SECONDS.time(), self.engine.begin() as conn:
+            if rows:
+                conn.execute(insert(CrawlResult.__table__), rows)
+            if copies:
+                conn.execute(COPY_UNCHANGED, copies)
+            with metrics.SUMMARY_SECONDS.time():
+                self.record_summary(conn, rows, copies)
+            if self.duplicate_similarity is None:
+                return 0
+            with metrics.DUPLICATE_INDEX_SECONDS.time():
+                return self.index_duplicates(conn, rows, copies)
+
+    def record_summary(self, conn, rows, copies):
+        pages = list(rows)
+        if copies:
+            # Copied rows carry their previous scores and issues
+            pages += conn.execute(
+                select(*(_table.c[column] for column in AGGREGATED_COLUMNS))
+                .where(_table.c.id.in_([copy["new_id"] for copy in copies]))
+            ).all()
+        record_pages(conn, pages)
+
+    def index_duplicates(self, conn, rows, copies):
+        pages = [
+            (row["id"], row["minhash"]) for row in rows
+            if row["minhash"] is not None and (row["word_count"] or 0) >= self.duplicate_min_words
+        ]
+        if copies:
+            # Copied rows carry their previous signature
+            pages += conn.execute(
+                select(_table.c.id, _table.c.minhash).where(
+                    _table.c.id.in_([copy["new_id"] for copy in copies]),
+                    _table.c.minhash.is_not(None),
+                    _table.c.word_count >= self.duplicate_min_words,
+                )
+            ).all()
+        task_id = (rows or copies)[0]["task_id"]
+        if not pages or task_id is None:
+            return 0
+        return index_near_duplicates(conn, task_id, pages, self.duplicate_similarity)
+
+    def _record_batch(self, written):
+        size, near_duplicates, failed = written
+        if self.stats:
+            self.stats.inc_value("pipeline/rows_written", size)
+            self.stats.inc_value("pipeline/batches_written")
+            if failed:
+                self.stats.inc_value("pipeline/rows_failed", failed)
+            if near_duplicates:
+                self.stats.inc_value("pipeline/near_duplicates", near_duplicates)
+
+    def _flush_if_stale(self):
+        if (self.buffer or self.copies) and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def _log_failed_batch(self, failure, size):
+        logger.error(f"Failed to write batch of {size} crawl results: {failure.getErrorMessage()}")
+        if self.stats:
+            self.stats.inc_value("pipeline/rows_failed", size)
@@ -0,0 +1,101 @@
+import logging
+import os
+import socket
+import time
+
+from scrapy import signals
+from twisted.internet import defer, task, threads
+
+from core.config import settings
+from core.events import publish_event
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlProgress:
+    """
+    Scrapy extension that publishes a crawl's progress to its Redis event
+    stream (core.events) every PROGRESS_INTERVAL seconds: pages crawled,
+    requests queued and in flight, errors and pages per second.
+
+    Each worker of a multi-worker crawl publishes its own events, tagged with
+    the worker's name. Spiders without a task_id publish nothing. Events are
+    sent from the reactor thread pool, one at a time and in order, so a slow
+    Redis holds up none of the worker's crawls.
+    """
+
+    def __init__(self, crawler, client, interval):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.client = client
+        self.interval = interval
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.task_id = None
+        self._loop = None
+        self._last_pages = 0
+        self._last_tick = None
+        self._lock = defer.DeferredLock()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        extension = cls(crawler, get_redis(), crawler.settings.getfloat("PROGRESS_INTERVAL", settings.PROGRESS_INTERVAL))
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        self.task_id = getattr(spider, "task_id", None)
+        if self.task_id is None:
+            return
+
+        self._last_tick = time.monotonic()
+        self.publish("started")
+        self._loop = task.LoopingCall(self.publish_progress)
+        self._loop.start(self.interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.task_id is None:
+            return
+
+        if self._loop and self._loop.running:
+            self._loop.stop()
+        return self.publish("closed", reason=reason, **self.snapshot())
+
+    def publish_progress(self):
+        # The loop waits for the returned Deferred, so a slow Redis can't pile events up
+        return self.publish("progress", **self.snapshot())
+
+    def snapshot(self):
+        stats = self.stats.get_stats()
+        pages = stats.get("response_received_count", 0)
+        now = time.monotonic()
+        rate = (pages - self._last_pages) / max(now - self._last_tick, 1e-6)
+        self._last_pages, self._last_tick = pages, now
+
+        engine = self.crawler.engine
+        scheduler = engine.slot.scheduler if engine and engine.slot else None
+        return {
+            "pages": pages,
+            "items": stats.get("item_scraped_count", 0),
+            "queued": len(scheduler) if scheduler is not None and hasattr(scheduler, "__len__") else None,
+            "in_flight": len(engine.downloader.active) if engine else None,
+            "errors": self.error_count(stats),
+            "pages_per_sec": f"{rate:.2f}",
+        }
+
+    @staticmethod
+    def error_count(stats):
+        return (
+            stats.get("downloader/exception_count", 0)
+            + stats.get("httperror/response_ignored_count", 0)
+            + sum(value for key, value in stats.items() if key.startswith("spider_exceptions/"))
+        )
+
+    def publish(self, event, **fields):
+        d = self._lock.run(threads.deferToThread, publish_event, self.client, self.task_id, event, worker=self.worker, **fields)
+        # Progress is best effort; a Redis hiccup must not break the crawl
+        d.addErrback(
+            lambda failure: logger.warning(f"Could not publish {event} event for crawl {self.task_id}: {failure.getErrorMessage()}")
+        )
+        return d
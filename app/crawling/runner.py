@@ -0,0 +1,149 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from scrapy.crawler import Crawler, CrawlerRunner
+from scrapy.settings import Settings
+from scrapy import signals
+
+from core.config import settings
+from crawling.throttle import POLITENESS_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlJob:
+    """
+    A queued crawl: the spider to run, its settings and arguments, and the
+    Future the submitting thread waits on.
+    """
+
+    def __init__(self, spidercls, settings, spider_kwargs, on_item=None):
+        self.spidercls = spidercls
+        self.settings = settings
+        self.spider_kwargs = spider_kwargs
+        self.on_item = on_item
+        self.future = Future()
+
+
+class CrawlRunner:
+    """
+    Runs Scrapy crawls on one long-lived Twisted reactor per process.
+
+    The reactor can't be restarted, so instead of a CrawlerProcess per task the
+    reactor runs in a background thread for the life of the worker. Jobs are
+    queued from any thread with crawl(); up to max_crawls of them run at the
+    same time and the rest wait in the queue.
+    """
+
+    def __init__(self, max_crawls=4, base_settings=None):
+        self.max_crawls = max_crawls
+        self.settings = Settings(base_settings or {})
+        self.jobs = deque()
+        self.active = 0
+        self._runner = None
+        self._reactor = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            from twisted.internet import reactor
+
+            self._reactor = reactor
+            self._runner = CrawlerRunner(self.settings)
+            self._thread = threading.Thread(
+                target=reactor.run,
+                kwargs={"installSignalHandlers": False},
+                name="crawl-reactor",
+                daemon=True,
+            )
+            self._thread.start()
+            logger.info(f"Crawl runner started (max {self.max_crawls} concurrent crawls)")
+
+    def crawl(self, spidercls, settings=None, on_item=None, **spider_kwargs):
+        """
+        Queues a crawl and returns a Future that resolves to the crawl's stats.
+        `on_item` is called in the reactor thread for every scraped item.
+        """
+        self.start()
+        job = CrawlJob(spidercls, settings or {}, spider_kwargs, on_item)
+        self._reactor.callFromThread(self._enqueue, job)
+        return job.future
+
+    def stop(self):
+        """
+        Stops the running crawls and the reactor; used on worker shutdown.
+        """
+        if self._thread is None:
+            return
+
+        def shutdown():
+            d = self._runner.stop()
+            d.addBoth(lambda _: self._reactor.stop())
+
+        self._reactor.callFromThread(shutdown)
+        self._thread.join(timeout=30)
+
+    # Everything below runs in the reactor thread
+
+    def _enqueue(self, job):
+        self.jobs.append(job)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.jobs and self.active < self.max_crawls:
+            job = self.jobs.popleft()
+            if job.future.set_running_or_notify_cancel():
+                self._start(job)
+
+    def _start(self, job):
+        crawl_settings = self.settings.copy()
+        crawl_settings.setdict(job.settings, priority="project")
+
+        try:
+            crawler = Crawler(job.spidercls, crawl_settings)
+            if job.on_item is not None:
+                crawler.signals.connect(lambda item, **kwargs: job.on_item(item), signal=signals.item_scraped, weak=False)
+            d = self._runner.crawl(crawler, **job.spider_kwargs)
+        except Exception as e:
+            job.future.set_exception(e)
+            return
+
+        self.active += 1
+        d.addCallbacks(self._finished, self._failed, callbackArgs=(job, crawler), errbackArgs=(job,))
+
+    def _finished(self, _, job, crawler):
+        self.active -= 1
+        job.future.set_result(crawler.stats.get_stats())
+        self._dispatch()
+
+    def _failed(self, failure, job):
+        self.active -= 1
+        job.future.set_exception(failure.value)
+        self._dispatch()
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """
+    Returns this process's crawl runner, creating it on first use (so that
+    prefork workers each start their own reactor after forking).
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = CrawlRunner(max_crawls=settings.CRAWL_RUNNER_MAX_CRAWLS, base_settings=POLITENESS_SETTINGS)
+        return _runner
+
+
+def shutdown_runner():
+    if _runner is not None:
+        _runner.stop()
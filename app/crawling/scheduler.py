@@ -0,0 +1,181 @@
+import logging
+import pickle
+import time
+from collections import deque
+
+from scrapy import signals
+from scrapy.core.scheduler import BaseScheduler
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.request import request_from_dict
+from twisted.internet import defer, threads
+
+from core.config import settings
+from core.redis_client import get_redis
+from crawling.frontier import RedisFrontier
+
+logger = logging.getLogger(__name__)
+
+
+def frontier_settings(task_id):
+    """
+    Scrapy settings that make a crawl pull its requests from the shared frontier of `task_id`.
+    """
+    return {
+        "SCHEDULER": "crawling.scheduler.FrontierScheduler",
+        "FRONTIER_TASK_ID": task_id,
+    }
+
+
+class FrontierScheduler(BaseScheduler):
+    """
+    Scrapy scheduler backed by a RedisFrontier, so every worker crawling the same
+    task shares one queue and one seen-URL set.
+
+    The reactor thread, shared by every crawl of the worker, never waits on
+    Redis: new requests are buffered and taken requests prefetched, and both
+    are exchanged with the frontier in batches of FRONTIER_BATCH_SIZE in the
+    reactor thread pool. A buffered request counts as scheduled even if the
+    frontier then filters it as already seen (see the scheduler/filtered stat).
+
+    A worker whose frontier runs dry keeps polling for FRONTIER_IDLE_TIMEOUT
+    seconds, as other workers may still be adding links, before it lets the
+    spider close.
+    """
+
+    def __init__(self, crawler, frontier, idle_timeout, batch_size=None):
+        self.crawler = crawler
+        self.frontier = frontier
+        self.idle_timeout = idle_timeout
+        self.batch_size = batch_size or settings.FRONTIER_BATCH_SIZE
+        self.stats = crawler.stats
+        self.spider = None
+        self._idle_since = None
+        self._outbox = []  # (fingerprint, url, payload, depth, priority, dont_filter) not yet in the frontier
+        self._prefetched = deque()
+        self._remote_size = 0  # Frontier size as of the last exchange
+        self._exchange = None  # Deferred of the exchange in flight
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        frontier = RedisFrontier(
+            get_redis(),
+            crawler.settings.get("FRONTIER_TASK_ID"),
+            bloom_bits=crawler.settings.getint("FRONTIER_BLOOM_BITS"),
+            bloom_hashes=crawler.settings.getint("FRONTIER_BLOOM_HASHES"),
+        )
+        scheduler = cls(
+            crawler, frontier, crawler.settings.getfloat("FRONTIER_IDLE_TIMEOUT", 30.0),
+            crawler.settings.getint("FRONTIER_BATCH_SIZE"),
+        )
+        crawler.signals.connect(scheduler.spider_idle, signal=signals.spider_idle)
+        return scheduler
+
+    def open(self, spider):
+        self.spider = spider
+
+    def close(self, reason):
+        # Once the exchange in flight is in, hand back what this worker took
+        # but will not crawl, then let the keys expire
+        def finish(_):
+            outbox, self._outbox = self._outbox, []
+            taken = [self._requeue_entry(payload) for payload in self._prefetched]
+            self._prefetched.clear()
+            return threads.deferToThread(self._hand_back, outbox, taken)
+
+        d = self._exchange if self._exchange is not None else defer.succeed(None)
+        d.addBoth(finish)
+        d.addErrback(lambda failure: logger.warning(f"Could not hand back frontier requests: {failure.getErrorMessage()}"))
+        return d
+
+    def __len__(self):
+        return len(self._prefetched) + len(self._outbox) + self._remote_size
+
+    def has_pending_requests(self):
+        return len(self) > 0 or self._exchange is not None
+
+    def enqueue_request(self, request):
+        # Unfiltered requests (start URLs) are queued regardless, but still
+        # marked as seen so links back to them are not crawled twice
+        fingerprint = self.crawler.request_fingerprinter.fingerprint(request)
+        payload = pickle.dumps(request.to_dict(spider=self.spider), protocol=pickle.HIGHEST_PROTOCOL)
+        self._outbox.append(
+            (fingerprint, request.url, payload, request.meta.get("depth", 0), request.priority, request.dont_filter)
+        )
+        if len(self._outbox) >= self.batch_size:
+            self._sync()
+        return True
+
+    def next_request(self):
+        if len(self._prefetched) <= self.batch_size // 2 or self._outbox:
+            self._sync()
+        if not self._prefetched:
+            return None
+
+        self._idle_since = None
+        self.stats.inc_value("scheduler/dequeued/redis", spider=self.spider)
+        return request_from_dict(pickle.loads(self._prefetched.popleft()), spider=self.spider)
+
+    def spider_idle(self, spider):
+        # Other workers may still be feeding the frontier; wait a while before closing
+        self._sync()
+        if self.has_pending_requests():
+            self._idle_since = None
+            raise DontCloseSpider
+
+        now = time.monotonic()
+        if self._idle_since is None:
+            self._idle_since = now
+        if now - self._idle_since < self.idle_timeout:
+            raise DontCloseSpider
+
+    def _requeue_entry(self, payload):
+        request = pickle.loads(payload)
+        return request["url"], payload, request["meta"].get("depth", 0), request["priority"]
+
+    def _hand_back(self, outbox, taken):
+        if outbox:
+            self.frontier.add_many(outbox)
+        if taken:
+            self.frontier.push_many(taken)
+        self.frontier.expire()
+
+    def _sync(self):
+        """
+        Sends the buffered requests to the frontier and tops up the prefetched
+        ones, in a pool thread; one exchange is in flight at a time.
+        """
+        if self._exchange is not None:
+            return
+        outbox, self._outbox = self._outbox, []
+        wanted = max(0, self.batch_size - len(self._prefetched))
+        self._exchange = threads.deferToThread(self._exchange_batches, outbox, wanted)
+        self._exchange.addCallbacks(self._exchanged, self._exchange_failed, errbackArgs=(outbox,))
+
+    def _exchange_batches(self, outbox, wanted):
+        queued, filtered = self.frontier.add_many(outbox) if outbox else (0, 0)
+        payloads, remaining = self.frontier.pop_many(wanted) if wanted else ([], len(self.frontier))
+        return queued, filtered, payloads, remaining
+
+    def _exchanged(self, result):
+        queued, filtered, payloads, remaining = result
+        self._exchange = None
+        self._prefetched.extend(payloads)
+        self._remote_size = remaining
+        if queued:
+            self.stats.inc_value("scheduler/enqueued/redis", queued, spider=self.spider)
+        if filtered:
+            self.stats.inc_value("scheduler/filtered", filtered, spider=self.spider)
+        if payloads:
+            self._wake_engine()
+
+    def _exchange_failed(self, failure, outbox):
+        # Keep the requests for the next exchange rather than lose them
+        self._exchange = None
+        self._outbox[:0] = outbox
+        logger.warning(f"Frontier exchange failed: {failure.getErrorMessage()}")
+
+    def _wake_engine(self):
+        # The engine stops asking for requests after next_request() returns None
+        engine = getattr(self.crawler, "engine", None)
+        if engine is not None and engine.slot is not None:
+            engine.slot.nextcall.schedule()
@@ -1,160 +1,173 @@
 import time
-import sqlite3
+import uuid
 import scrapy
+from scrapy.http import TextResponse
 from collections import defaultdict
+from core.config import settings
+from core.metrics import PARSE_SECONDS
+from crawling.content import is_html, is_truncated
+from crawling.extraction import extract_page_facts
+from crawling.sitemaps import lastmod_priority
+from storage.blobs import blob_key
+from crawling.urls import canonicalize_url
 
 class SEOSpider(scrapy.Spider):
     name = "seo_spider"
     start_urls = ['https://ryanlhoward.com']  # Replace with the target URL
 
     custom_settings = {
-        'ITEM_PIPELINES': {'howdev_seo_spider.pipelines.HowdevSEOPipeline': 300},
+        'ITEM_PIPELINES': {'crawling.pipelines.CrawlResultPipeline': 300},
         'REDIRECT_ENABLED': True,
         'REDIRECT_MAX_TIMES': 5,
+        'DUPEFILTER_CLASS': 'crawling.dedup.BloomDupeFilter',
+        'SPIDER_MIDDLEWARES': {
+            'crawling.incremental.IncrementalCrawlMiddleware': 100,
+            'crawling.budget.CrawlBudgetMiddleware': 800,
+        },
+        'EXTENSIONS': {
+            'crawling.progress.CrawlProgress': 500,
+            'crawling.cancellation.CrawlCancellation': 510,
+            'crawling.metrics.CrawlMetrics': 520,
+            'crawling.linkgraph.LinkGraphRecorder': 530,
+            'crawling.content.ContentFilter': 540,
+        },
     }
 
-    def __init__(self, project_id=1, *args, **kwargs):
+    def __init__(self, project_id=None, task_id=None, incremental=False, seeds=None, *args, **kwargs):
         super(SEOSpider, self).__init__(*args, **kwargs)
-        self.project_id = int(project_id)  # Set project ID for crawl, change this dynamically for multiple projects
+        # Project ID of the site being audited; rows of every crawl of it are grouped by it
+        self.project_id = str(project_id or uuid.uuid4())
+        # ID of this crawl (the Celery task ID); the same as the project ID unless re-auditing
+        self.task_id = str(task_id or self.project_id)
+        # Re-audit: only extract and score pages that changed since the project's last crawl
+        self.incremental = incremental
+        # Pages from the site's sitemaps, [(url, lastmod)], crawled from the start alongside the start URLs
+        self.seeds = seeds or []
+        self.strip_trailing_slash = settings.URL_STRIP_TRAILING_SLASH
+        self.max_body_bytes = settings.CRAWL_MAX_BODY_BYTES
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # The crawl's own limit, as ContentFilter applies it
+        spider.max_body_bytes = crawler.settings.getint('CRAWL_MAX_BODY_BYTES', settings.CRAWL_MAX_BODY_BYTES)
+        return spider
+
+    def start_requests(self):
+        # Start URLs go through the dupe filter too, so links back to them are not re-crawled
+        for url in self.start_urls:
+            yield scrapy.Request(url=canonicalize_url(url, self.strip_trailing_slash), callback=self.parse)
+
+        # Sitemap seeds reach deep and orphan pages without following links there; recently changed ones first.
+        # They count as one hop from the start, a link away in the sitemap, so DEPTH_LIMIT still bounds the crawl
+        now = time.time()
+        for url, lastmod in self.seeds:
+            yield scrapy.Request(
+                url=canonicalize_url(url, self.strip_trailing_slash), callback=self.parse,
+                priority=lastmod_priority(lastmod, now), meta={'project_id': self.project_id, 'depth': 1},
+            )
 
     def parse(self, response):
-        # Track the start time for load_time calculation
-        start_time = time.time()
+        # PDFs, images and the like: ContentFilter stopped their download at the headers
+        if response.status != 304 and (not isinstance(response, TextResponse) or not is_html(response.headers)):
+            return
+
+        # Keep no more HTML than ContentFilter lets through, even if decompression grew it
+        truncated = is_truncated(response, self.max_body_bytes)
+        if truncated and len(response.body) > self.max_body_bytes:
+            response = response.replace(body=response.body[:self.max_body_bytes])
+
+        # Previously crawled page that has not changed: reuse its stored row
+        prior = response.meta.get('prior_page')
+        html = None
+        if response.status != 304:
+            # The body as is when it's UTF-8 already, instead of decoding and re-encoding it
+            html = response.body if response.encoding == 'utf-8' else response.text.encode('utf-8')
+        html_hash = blob_key(html) if html is not None else None
+        if prior is not None and (response.status == 304 or html_hash == prior[1]):
+            yield {
+                'project_id': self.project_id,
+                'task_id': self.task_id,
+                'url': response.url,
+                'change_status': 'unchanged',
+                'prior_id': prior[0],
+            }
+            return
 
         # Initialize SEO data
         seo_data = defaultdict(lambda: "No Issues")
 
-        # Calculate word count
-        content_text = response.xpath("//body//text()").getall()
-        word_count = len(' '.join(content_text).split())
-        seo_data['word_count'] = word_count
+        # Walk the page once; both the stored fields and the scoring read from it
+        started = time.perf_counter()
+        facts = extract_page_facts(response)
+        PARSE_SECONDS.observe(time.perf_counter() - started)
+        seo_data['word_count'] = facts.word_count
 
         # Extract internal links (only internal links will be crawled)
         internal_links = []
-        for link in response.css('a::attr(href)').getall():
+        requested = set()
+        page_links = []  # Canonical internal link targets, for the link graph
+        base_domain = self.get_domain(response.url)
+        for link in facts.links:
             full_url = response.urljoin(link)
-            if self.is_internal_link(full_url, response.url):
+            if self.get_domain(full_url) == base_domain:
                 internal_links.append(full_url)
-                # Yield a new request for internal links only
-                yield scrapy.Request(url=full_url, callback=self.parse, meta={'project_id': self.project_id})
+
+                # Yield a new request for internal links only, once per canonical URL
+                url = canonicalize_url(full_url, self.strip_trailing_slash)
+                if url not in requested:
+                    requested.add(url)
+                    page_links.append(url)
+                    yield scrapy.Request(url=url, callback=self.parse, meta={'project_id': self.project_id})
 
         seo_data['internal_links'] = len(internal_links)
-        seo_data['external_links'] = len(response.css('a::attr(href)').getall()) - len(internal_links)
+        seo_data['external_links'] = len(facts.links) - len(internal_links)
+        seo_data['links'] = page_links
 
         # Extract SEO-related information
+        seo_data['project_id'] = self.project_id
+        seo_data['task_id'] = self.task_id
         seo_data['url'] = response.url
-        seo_data['title'] = response.xpath('//title/text()').get() or "Missing Title"
-        seo_data['meta_description'] = response.xpath('//meta[@name="description"]/@content').get() or "Missing Meta Description"
+        seo_data['depth'] = response.meta.get('depth', 0)
+        seo_data['title'] = facts.title or "Missing Title"
+        seo_data['meta_description'] = facts.meta_description or "Missing Meta Description"
+        seo_data['canonical'] = response.urljoin(facts.canonical) if facts.canonical else None
 
         # Extract H1 to H6 tags
-        seo_data['H1'] = ', '.join(response.xpath('//h1/text()').getall()) or "No H1"
-        seo_data['H2'] = ', '.join(response.xpath('//h2/text()').getall()) or "No H2"
-        seo_data['H3'] = ', '.join(response.xpath('//h3/text()').getall()) or "No H3"
-        seo_data['H4'] = ', '.join(response.xpath('//h4/text()').getall()) or "No H4"
-        seo_data['H5'] = ', '.join(response.xpath('//h5/text()').getall()) or "No H5"
-        seo_data['H6'] = ', '.join(response.xpath('//h6/text()').getall()) or "No H6"
+        for tag, texts in facts.headings.items():
+            seo_data[tag] = ', '.join(texts) or f"No {tag.upper()}"
 
         # Extract alt text from images
-        seo_data['alt_texts'] = response.xpath('//img/@alt').getall()
-
-        # Save raw HTML for future analysis
-        seo_data['raw_html'] = response.text
-
-        # Calculate page load time
-        load_time = time.time() - start_time
-        seo_data['load_time'] = load_time
-
-        # Perform SEO evaluation and scoring
-        seo_data['seo_evaluation'], seo_data['seo_score'] = self.perform_seo_evaluation(response)
-
-        # Insert crawl data into the database
-        self.insert_crawl_data(seo_data)
-
-    def is_internal_link(self, url, base_url):
-        base_domain = self.get_domain(base_url)
-        link_domain = self.get_domain(url)
-        return base_domain == link_domain
+        seo_data['alt_texts'] = ', '.join(facts.alt_texts)
+
+        # Save raw HTML for future analysis; the pipeline moves it to the blob store
+        seo_data['raw_html'] = html
+
+        # Validators and hash for the next incremental crawl
+        seo_data['etag'] = response.headers.get('ETag', b'').decode('latin-1') or None
+        seo_data['last_modified'] = response.headers.get('Last-Modified', b'').decode('latin-1') or None
+        seo_data['content_hash'] = html_hash
+        seo_data['truncated'] = truncated
+        seo_data['minhash'] = facts.minhash
+        if self.incremental:
+            seo_data['change_status'] = 'changed' if prior is not None else 'new'
+            seo_data['prior_id'] = prior[0] if prior is not None else None
+
+        # Page load time: DNS, connect and time to first byte, as measured by Scrapy
+        seo_data['load_time'] = response.meta.get('download_latency')
+
+        # Features the SEO rules score on; scoring runs per batch in the pipeline
+        seo_data['title_length'] = len(facts.title or '')
+        seo_data['meta_description_length'] = len(facts.meta_description or '')
+        seo_data['h1_count'] = facts.h1_count
+        seo_data['image_count'] = facts.image_count
+        seo_data['images_missing_alt'] = facts.images_missing_alt
+
+        # Hand the page over to the item pipeline for batched storage
+        yield dict(seo_data)
 
     def get_domain(self, url):
         from urllib.parse import urlparse
         parsed_uri = urlparse(url)
         domain = parsed_uri.netloc
         return domain
-
-    def perform_seo_evaluation(self, response):
-        seo_issues = []
-        score = 100
-
-        # Example SEO evaluation logic for title
-        title = response.xpath('//title/text()').get()
-        if not title:
-            seo_issues.append('Missing Title (Critical Issue)')
-            score -= 25
-        elif len(title) > 60:
-            seo_issues.append('Title Too Long (Minor Issue)')
-            score -= 5
-        elif len(title) < 30:
-            seo_issues.append('Title Too Short (Minor Issue)')
-            score -= 5
-
-        # SEO evaluation for meta description
-        meta_description = response.xpath('//meta[@name="description"]/@content').get()
-        if not meta_description:
-            seo_issues.append('Missing Meta Description (Critical Issue)')
-            score -= 25
-        elif len(meta_description) > 160:
-            seo_issues.append('Meta Description Too Long (Minor Issue)')
-            score -= 5
-        elif len(meta_description) < 50:
-            seo_issues.append('Meta Description Too Short (Minor Issue)')
-            score -= 5
-
-        # H1 tag evaluation
-        h1_tags = response.xpath('//h1/text()').getall()
-        if len(h1_tags) > 1:
-            seo_issues.append('Multiple H1 Tags (Moderate Issue)')
-            score -= 15
-        elif not h1_tags:
-            seo_issues.append('Missing H1 Tag (Critical Issue)')
-            score -= 25
-
-        # Add more SEO evaluation criteria as needed...
-
-        return ", ".join(seo_issues) if seo_issues else "No Issues", score
-
-    def insert_crawl_data(self, seo_data):
-        conn = sqlite3.connect('seo_crawler.db')
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            INSERT INTO crawls (
-                project_id, url, title, meta_description, canonical, H1, H2, H3, H4, H5, H6,
-                alt_texts, seo_evaluation, seo_score, word_count, internal_links, external_links,
-                broken_links, load_time, raw_html
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            self.project_id,
-            seo_data.get('url'),
-            seo_data.get('title'),
-            seo_data.get('meta_description'),
-            seo_data.get('canonical'),
-            seo_data.get('H1'),
-            seo_data.get('H2'),
-            seo_data.get('H3'),
-            seo_data.get('H4'),
-            seo_data.get('H5'),
-            seo_data.get('H6'),
-            ', '.join(seo_data.get('alt_texts', [])),
-            seo_data.get('seo_evaluation'),
-            seo_data.get('seo_score'),
-            seo_data.get('word_count'),
-            seo_data.get('internal_links'),
-            seo_data.get('external_links'),
-            seo_data.get('broken_links', 0),  # Default value for broken_links
-            seo_data.get('load_time'),
-            seo_data.get('raw_html')
-        ))
-
-        conn.commit()
-        conn.close()
@@ -0,0 +1,261 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse
+
+import requests
+from lxml import etree
+
+from core.config import settings
+from crawling.urls import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from a sitemap response at a time
+CHUNK_SIZE = 64 * 1024
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Seed priority by how recently the sitemap says a page changed: (max age in
+# days, priority). Older and undated pages get 0, like links the crawl follows.
+LASTMOD_PRIORITIES = ((1, 5), (7, 4), (30, 3), (90, 2), (365, 1))
+
+
+@lru_cache(maxsize=4096)
+def parse_lastmod(value):
+    """
+    A sitemap <lastmod> (W3C datetime, e.g. 2024-05-01 or
+    2024-05-01T10:00:00+02:00) as a Unix timestamp, or None if unparseable.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    # fromisoformat only takes a "Z" UTC designator from Python 3.11 on
+    if value[-1:] in ("Z", "z"):
+        value = value[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def lastmod_priority(lastmod, now=None):
+    """
+    Request priority of a seed last modified at `lastmod` (a timestamp or None).
+    """
+    if lastmod is None:
+        return 0
+    age_days = ((now or time.time()) - lastmod) / 86400
+    for max_age, priority in LASTMOD_PRIORITIES:
+        if age_days <= max_age:
+            return priority
+    return 0
+
+
+def robots_sitemaps(text):
+    """
+    The sitemap URLs a robots.txt lists (Sitemap: lines, in any group).
+    """
+    sitemaps = []
+    for line in text.splitlines():
+        name, colon, value = line.partition("#")[0].partition(":")
+        if colon and name.strip().lower() == "sitemap" and value.strip():
+            sitemaps.append(value.strip())
+    return sitemaps
+
+
+def decompressed(chunks, max_bytes):
+    """
+    Passes the chunks of a sitemap through, gunzipping them on the fly when
+    the body is gzipped (.xml.gz files are, without a Content-Encoding).
+    Stops after `max_bytes`, so a small gzip bomb can't expand without limit.
+    """
+    decompressor = None
+    produced = 0
+    for chunk in chunks:
+        if decompressor is None:
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16) if chunk[:2] == GZIP_MAGIC else False
+        while chunk:
+            if decompressor:
+                data = decompressor.decompress(chunk, CHUNK_SIZE)
+                chunk = decompressor.unconsumed_tail
+            else:
+                data, chunk = chunk, b""
+            produced += len(data)
+            if produced > max_bytes:
+                raise ValueError(f"over {max_bytes} bytes")
+            if data:
+                yield data
+
+
+def parse_sitemap(chunks):
+    """
+    Parses a sitemap or sitemap index from its byte chunks as they arrive,
+    yielding ("url" or "sitemap", loc, lastmod timestamp) per entry. Parsed
+    entries are dropped from the tree right away, so memory stays flat
+    however large the file.
+    """
+    # Only <url> and <sitemap> elements (in any namespace) are reported
+    parser = etree.XMLPullParser(
+        events=("end",), tag=("{*}url", "{*}sitemap"),
+        resolve_entities=False, no_network=True, huge_tree=True, remove_comments=True,
+    )
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from _sitemap_entries(parser)
+    parser.close()
+    yield from _sitemap_entries(parser)
+
+
+def _sitemap_entries(parser):
+    for _, element in parser.read_events():
+        loc = lastmod = None
+        for child in element:
+            tag = child.tag
+            if not isinstance(tag, str):
+                continue  # Processing instruction
+            if tag == "loc" or tag.endswith("}loc"):
+                loc = (child.text or "").strip()
+            elif tag == "lastmod" or tag.endswith("}lastmod"):
+                lastmod = parse_lastmod(child.text)
+        if loc:
+            yield "url" if element.tag.endswith("url") else "sitemap", loc, lastmod
+
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+class SeedCollector:
+    """
+    The `max_urls` most recently modified pages of a host, as sitemaps are
+    read by several threads. Undated pages rank below dated ones, and keep
+    their sitemap order among themselves. URLs are kept canonical, and a page
+    several sitemaps list takes one place, at the first listing's rank.
+    """
+
+    def __init__(self, host, max_urls):
+        self.host = host.lower()
+        self.max_urls = max_urls
+        self.listed = 0
+        self._heap = []  # Min-heap on (lastmod, -order): the first seed to give up is on top
+        self._urls = set()  # URLs in the heap
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, url, lastmod):
+        # Sitemaps may list other hosts' pages; the crawl stays on its own
+        url = canonicalize_url(url, settings.URL_STRIP_TRAILING_SLASH)
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or (parsed.hostname or "") != self.host:
+            return
+        entry = ((lastmod if lastmod is not None else float("-inf"), -next(self._order)), url, lastmod)
+        with self._lock:
+            self.listed += 1
+            if url in self._urls:
+                return
+            if len(self._heap) < self.max_urls:
+                heapq.heappush(self._heap, entry)
+            else:
+                entry = heapq.heappushpop(self._heap, entry)
+                if entry[1] == url:
+                    return
+                self._urls.discard(entry[1])
+            self._urls.add(url)
+
+    def seeds(self):
+        """
+        [(url, lastmod)], most recently modified first.
+        """
+        with self._lock:
+            return [(url, lastmod) for _, url, lastmod in sorted(self._heap, reverse=True)]
+
+
+def read_sitemap(url, user_agent, seeds, stop):
+    """
+    Streams one sitemap into `seeds` and returns the nested sitemaps it lists.
+    """
+    nested = []
+    with requests.get(url, headers={"User-Agent": user_agent}, stream=True, timeout=settings.SITEMAP_TIMEOUT) as response:
+        response.raise_for_status()
+        chunks = decompressed(response.iter_content(CHUNK_SIZE), settings.SITEMAP_MAX_FILE_BYTES)
+        for kind, loc, lastmod in parse_sitemap(chunks):
+            if stop.is_set():
+                break
+            # Locations should be absolute already
+            if not loc.startswith(("http://", "https://")):
+                loc = urljoin(url, loc)
+            if kind == "url":
+                seeds.add(loc, lastmod)
+            else:
+                nested.append(loc)
+    return nested
+
+
+def discover_seeds(start_url, user_agent, max_urls):
+    """
+    Seeds for a crawl of `start_url`'s host: the pages its sitemaps list,
+    [(url, lastmod timestamp or None)], at most `max_urls` of them, most
+    recently modified first. Sitemaps come from the host's robots.txt, else
+    /sitemap.xml; indexes are followed SITEMAP_MAX_DEPTH levels deep. Up to
+    SITEMAP_THREADS sitemaps are read at once, and reading stops after
+    SITEMAP_MAX_FILES files or SITEMAP_SEED_SECONDS, keeping what was found.
+    Returns the seeds and the number of sitemaps read.
+    """
+    parsed = urlparse(start_url)
+    root = f"{parsed.scheme}://{parsed.netloc}"
+    try:
+        response = requests.get(f"{root}/robots.txt", headers={"User-Agent": user_agent}, timeout=settings.SITEMAP_TIMEOUT)
+        sitemaps = robots_sitemaps(response.text) if response.ok else []
+    except requests.RequestException as e:
+        logger.info(f"No robots.txt for {root}: {e}")
+        sitemaps = []
+    sitemaps = sitemaps or [f"{root}/sitemap.xml"]
+
+    seeds = SeedCollector(parsed.hostname or "", max_urls)
+    seen = set()
+    read = 0
+    stop = threading.Event()
+    deadline = time.monotonic() + settings.SITEMAP_SEED_SECONDS
+    with ThreadPoolExecutor(max_workers=settings.SITEMAP_THREADS, thread_name_prefix="sitemaps") as pool:
+        pending = {}
+
+        def submit(urls, depth):
+            for url in urls:
+                if url in seen or len(seen) >= settings.SITEMAP_MAX_FILES:
+                    continue
+                seen.add(url)
+                pending[pool.submit(read_sitemap, url, user_agent, seeds, stop)] = (url, depth)
+
+        submit(sitemaps, 0)
+        while pending:
+            done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                logger.warning(f"Stopped reading the sitemaps of {root} after {settings.SITEMAP_SEED_SECONDS}s")
+                stop.set()
+                for future in pending:
+                    future.cancel()
+                break
+            for future in done:
+                url, depth = pending.pop(future)
+                try:
+                    nested = future.result()
+                except (requests.RequestException, etree.XMLSyntaxError, ValueError) as e:
+                    logger.warning(f"Could not read sitemap {url}: {e}")
+                    continue
+                read += 1
+                if depth < settings.SITEMAP_MAX_DEPTH:
+                    submit(nested, depth + 1)
+
+    found = seeds.seeds()
+    logger.info(f"{len(found)} seeds from {read} sitemaps of {root} ({seeds.listed} pages listed)")
+    return found, read
@@ -1,5 +1,6 @@
 import scrapy
-from scrapy.crawler import CrawlerProcess
+from crawling.extraction import extract_page_facts
+from crawling.runner import get_runner
 
 class MySpider(scrapy.Spider):
     name = "my_spider"
@@ -19,10 +20,11 @@ class MySpider(scrapy.Spider):
         """
         Parse the response for relevant data and follow links if needed.
         """
-        # Extract the page title and meta description
-        title = response.css('title::text').get()
-        meta_description = response.css('meta[name="description"]::attr(content)').get()
-        links = response.css('a::attr(href)').getall()
+        # Extract the page title, meta description and the features the SEO rules score on
+        facts = extract_page_facts(response)
+        title = facts.title
+        meta_description = facts.meta_description
+        links = facts.links
 
         # Log or process the results (can be saved to a database or returned via a callback)
         print(f"Crawled URL: {response.url}")
@@ -33,8 +35,17 @@ class MySpider(scrapy.Spider):
         # Yield the extracted data
         yield {
             'url': response.url,
+            'status': response.status,
+            'depth': response.meta.get('depth', 0),
             'title': title,
             'meta_description': meta_description,
+            'canonical': response.urljoin(facts.canonical) if facts.canonical else None,
+            'title_length': len(title or ''),
+            'meta_description_length': len(meta_description or ''),
+            'h1_count': facts.h1_count,
+            'image_count': facts.image_count,
+            'images_missing_alt': facts.images_missing_alt,
+            'word_count': facts.word_count,
             'links': links
         }
 
@@ -46,13 +57,22 @@ class MySpider(scrapy.Spider):
 # Function to run the spider
 def run_spider(url: str, depth: int, user_agent: str):
     """
-    Starts the Scrapy spider with the provided URL and depth.
+    Starts the Scrapy spider with the provided URL and depth and returns the scraped items.
     This function can be called from the Celery task or directly for testing.
     """
-    process = CrawlerProcess({
-        'LOG_LEVEL': 'INFO',  # Adjust log level as needed
-    })
+    items = []
 
-    # Start the spider with custom parameters
-    process.crawl(MySpider, url=url, depth=depth, user_agent=user_agent)
-    process.start()  # This will block until the crawling is finished
+    # Run the spider on the process-wide crawl runner and wait for it to finish
+    crawl = get_runner().crawl(
+        MySpider,
+        settings={
+            'LOG_LEVEL': 'INFO',  # Adjust log level as needed
+            'DEPTH_LIMIT': depth,
+            'USER_AGENT': user_agent,
+        },
+        on_item=items.append,
+        url=url, depth=depth, user_agent=user_agent,
+    )
+    crawl.result()
+
+    return items
@@ -0,0 +1,92 @@
+import threading
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from analysis.summary import AGGREGATED_COLUMNS, aggregate
+from models.crawl_results import CrawlHistogram, CrawlResult, CrawlSummary, IssueCode
+
+_results = CrawlResult.__table__
+_summaries = CrawlSummary.__table__
+_histograms = CrawlHistogram.__table__
+_COUNTERS = ("pages", "clean_pages", "score_sum", "word_count_sum")
+
+# Engines whose issue_codes this process has brought in step with the rules
+_synced = set()
+_sync_lock = threading.Lock()
+
+
+def _insert(conn, table):
+    # INSERT ... ON CONFLICT needs the dialect's own insert()
+    insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    return insert(table)
+
+
+def _increment(conn, table, keys, counters, rows):
+    statement = _insert(conn, table)
+    values = {name: table.c[name] + statement.excluded[name] for name in counters}
+    if "updated_at" in table.c:
+        values["updated_at"] = func.now()
+    conn.execute(statement.on_conflict_do_update(index_elements=keys, set_=values), rows)
+
+
+def record_pages(conn, rows):
+    """
+    Adds stored crawl result rows (dicts or DB rows with AGGREGATED_COLUMNS)
+    to their crawls' summaries and histograms, in the caller's transaction.
+    Counters are incremented in the database, so workers sharing a crawl
+    can record their batches concurrently; rows are written in key order so
+    two batches never wait on each other's locks in opposite orders.
+    """
+    totals, histograms = aggregate(rows)
+    if not totals:
+        return
+
+    _increment(conn, _summaries, ["task_id"], _COUNTERS, [
+        {"task_id": task_id, "project_id": project_id, **{name: crawl[name] for name in _COUNTERS}}
+        for task_id, (project_id, crawl) in sorted(totals.items(), key=lambda item: str(item[0]))
+    ])
+    _increment(conn, _histograms, ["task_id", "metric", "bucket"], ("pages",), [
+        {"task_id": task_id, "metric": metric, "bucket": bucket, "pages": pages}
+        for (task_id, metric, bucket), pages in sorted(histograms.items(), key=lambda item: (str(item[0][0]), *item[0][1:]))
+    ])
+
+
+def rebuild_summaries(db_engine, project_id, chunk_size=50000):
+    """
+    Recomputes the summaries and histograms of every crawl of a project from
+    its stored rows, e.g. after re-scoring. Runs in one transaction, so
+    readers see the old figures until the new ones are complete.
+    """
+    task_ids = select(_results.c.task_id).where(_results.c.project_id == project_id).distinct()
+    with db_engine.begin() as conn:
+        conn.execute(delete(_histograms).where(_histograms.c.task_id.in_(task_ids)))
+        conn.execute(delete(_summaries).where(_summaries.c.project_id == project_id))
+        result = conn.execution_options(yield_per=chunk_size).execute(
+            select(*(_results.c[name] for name in AGGREGATED_COLUMNS))
+            .where(_results.c.project_id == project_id, _results.c.task_id.is_not(None))
+        )
+        for chunk in result.partitions():
+            record_pages(conn, chunk)
+
+
+def sync_issue_codes(db_engine, rules):
+    """
+    Writes each rule's issue code (its position in `rules`), name and message
+    to issue_codes, once per engine and process.
+    """
+    with _sync_lock:
+        if db_engine.url in _synced:
+            return
+        with db_engine.begin() as conn:
+            statement = _insert(conn, IssueCode.__table__)
+            conn.execute(
+                statement.on_conflict_do_update(index_elements=["code"], set_={
+                    name: statement.excluded[name] for name in ("name", "message", "penalty")
+                }),
+                [
+                    {"code": code, "name": rule.name, "message": rule.message, "penalty": rule.penalty}
+                    for code, rule in enumerate(rules.rules)
+                ],
+            )
+        _synced.add(db_engine.url)
@@ -1,26 +1,48 @@
-from celery import Celery, shared_task
+from celery import shared_task
+from celery.signals import worker_init, worker_shutdown
+from sqlalchemy import bindparam, select, update
+from analysis.rules import FEATURE_COLUMNS, RULES
+from celery_app import celery_app
+from core.cache import CRAWL_RESULT_CACHE, STATUS_CACHE, invalidate
+from core.events import publish_event
+from core.metrics import start_metrics_server
+from core.redis_client import get_redis
+from crawling.budget import budget_settings
+from crawling.pipelines import CrawlResultPipeline
+from crawling.linkgraph import analyze_link_graph, new_fragment, store_fragment, wait_for_fragments
+from crawling.runner import get_runner, shutdown_runner
+from crawling.scheduler import frontier_settings
+from crawling.sitemaps import discover_seeds
+from crawling.summary import rebuild_summaries, sync_issue_codes
 from crawling.spider import run_spider
-from database.session import SessionLocal
+from database.session import SessionLocal, engine, init_db
+from storage.blobs import get_blob_store
 from models.crawl_results import CrawlResult, CrawlTask
 from core.config import settings
 from sqlalchemy.ext.asyncio import AsyncSession
+import json
 import logging
 import time
+import uuid
+from urllib.parse import urljoin, urlparse
 
-from scrapy.crawler import CrawlerProcess
-from scrapy.utils.project import get_project_settings
 from crawling.seo_spider import SEOSpider  # Custom spider
 
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Create a Celery instance
-celery_app = Celery(
-    "crawler_app",
-    broker=settings.CELERY_BROKER_URL,
-    backend=settings.CELERY_RESULT_BACKEND
-)
+# Export the worker's crawl metrics for Prometheus to scrape
+@worker_init.connect
+def start_worker_metrics(**kwargs):
+    if settings.WORKER_METRICS_PORT:
+        start_metrics_server(settings.WORKER_METRICS_PORT)
+        logger.info(f"Serving crawl metrics on port {settings.WORKER_METRICS_PORT}")
+
+# Stop the worker's crawl runner (and its reactor) when the worker exits
+@worker_shutdown.connect
+def stop_crawl_runner(**kwargs):
+    shutdown_runner()
 
 @celery_app.task
 def start_crawl_task(url: str, depth: int, user_agent: str):
@@ -28,35 +50,41 @@ def start_crawl_task(url: str, depth: int, user_agent: str):
     Celery task that initiates the web crawl.
     This task runs asynchronously in the background.
     """
-    # Create a new database session
-    db = SessionLocal()
+    task_id = uuid.uuid4()
+    fragment = new_fragment(seeds=[url])
+    # Rows are scored and written in batches, as the SEO crawl's pipeline does
+    pipeline = CrawlResultPipeline(engine, settings.PIPELINE_BATCH_SIZE, settings.PIPELINE_FLUSH_INTERVAL,
+                                   blob_store=get_blob_store())
 
     try:
+        init_db()
+        sync_issue_codes(engine, pipeline.rules)
         logger.info(f"Starting crawl for URL: {url} with depth: {depth}")
 
         # Start the crawl and collect the data
+        rows = []
         for result in run_spider(url, depth, user_agent):
-            # Store the crawl result in the database
-            crawl_result = CrawlResult(
-                url=result['url'],
-                title=result['title'],
-                meta_description=result['meta_description'],
-                links=','.join(result['links'])  # You can serialize links differently
-            )
-            db.add(crawl_result)
-            db.commit()
-            db.refresh(crawl_result)
-            logger.info(f"Stored crawl result for URL: {result['url']}")
-    
+            rows.append(pipeline.to_row({**result, 'project_id': task_id, 'task_id': task_id}))
+
+            # Links go to the link graph, resolved and limited to the site
+            host = urlparse(result['url']).netloc
+            links = [urljoin(result['url'], link) for link in result['links']]
+            fragment['pages'].append((result['url'], result['status']))
+            fragment['links'].append((result['url'], [link for link in links if urlparse(link).netloc == host]))
+
+        # Store the crawl results in the database
+        for start in range(0, len(rows), pipeline.batch_size):
+            pipeline.write_batch(rows[start:start + pipeline.batch_size])
+        logger.info(f"Stored {len(rows)} crawl results for {url}")
+
+        store_fragment(engine, get_blob_store(), task_id, fragment, final=True)
+        analyze_link_graph(task_id, task_id)
+
     except Exception as e:
         logger.error(f"Error during crawl: {str(e)}")
-        db.rollback()
         raise  # Re-raise the error after logging
-    
-    finally:
-        db.close()
 
-    return {"message": f"Crawl completed for {url}"}
+    return {"message": f"Crawl completed for {url}", "task_id": str(task_id)}
 
 # Start a web crawl (simulated for now)
 @shared_task
@@ -69,6 +97,7 @@ def crawl_website(task_id: str, url: str):
         task = db.query(CrawlTask).filter(CrawlTask.id == task_id).first()
         task.status = "in progress"
         db.commit()
+        invalidate_cached(STATUS_CACHE, keys=[task_id])
 
         # Simulate crawling (delay)
         time.sleep(10)  # Simulate crawl delay
@@ -77,31 +106,200 @@ def crawl_website(task_id: str, url: str):
         task.result = f"Crawl completed for {url}"
         task.status = "completed"
         db.commit()
+        invalidate_cached(STATUS_CACHE, keys=[task_id])
 
     except Exception as e:
         # Handle error and update the task as failed
         task.status = "failed"
         task.result = str(e)
         db.commit()
+        invalidate_cached(STATUS_CACHE, keys=[task_id])
 
     finally:
         db.close()
 
 
-@shared_task
-def seo_crawler_task(task_id: str, url: str, depth: int, user_agent: str):
+def finish_crawl_task(task_id: str, status: str, result: dict):
     """
-    This task runs the SEO Crawler for a given URL.
+    Records a crawl's terminal status: on its crawl_tasks row, and as the
+    last event of its progress stream.
+    """
+    init_db(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            update(CrawlTask.__table__)
+            .where(CrawlTask.__table__.c.id == uuid.UUID(task_id))
+            .values(status=status, result=json.dumps(result))
+        )
+
+    invalidate_cached(STATUS_CACHE, keys=[task_id])
+    try:
+        publish_event(get_redis(), task_id, status, result=json.dumps(result))
+    except Exception as e:
+        logger.warning(f"Could not publish {status} event for crawl {task_id}: {e}")
+
+
+def invalidate_cached(namespace: str, keys=(), tags=()):
     """
-    # Set up Scrapy settings and configure the spider
-    process = CrawlerProcess(settings={
+    Drops API results this worker changed from the result cache. Entries
+    that can't be dropped expire after RESULT_CACHE_TTL.
+    """
+    try:
+        invalidate(get_redis(), namespace, keys, tags)
+    except Exception as e:
+        logger.warning(f"Could not invalidate cached {namespace} results: {e}")
+
+
+# Link analysis figures included in a crawl's task result
+LINK_SUMMARY_FIELDS = ("links", "broken_link_count", "orphan_count", "redirect_chain_count", "max_click_depth")
+
+
+def seo_crawl_settings(task_id: str, depth: int, user_agent: str, workers: int = 1, budget: dict = None):
+    """
+    Scrapy settings for one worker's share of an SEO crawl.
+    """
+    crawl_settings = {
         "USER_AGENT": user_agent,
         "DEPTH_LIMIT": depth,
         "LOG_ENABLED": False  # You can enable logging for debugging
-    })
+    }
+    crawl_settings.update(budget_settings(budget, workers))
+    if workers > 1:
+        # Crawls split across workers share a Redis frontier and seen-URL set
+        crawl_settings.update(frontier_settings(task_id))
+    return crawl_settings
+
+
+@shared_task(bind=True)
+def seo_crawler_task(self, task_id: str, url: str, depth: int, user_agent: str, workers: int = 1,
+                     project_id: str = None, incremental: bool = False, budget: dict = None, sitemaps: bool = False):
+    """
+    This task runs the SEO Crawler for a given URL.
+    With workers > 1 it also enlists that many workers (itself included) to
+    crawl the site together through a shared frontier. With incremental, pages
+    that haven't changed since the project's last crawl are not processed again.
+    The crawl stops early once it exhausts its budget (see crawling.budget).
+    With sitemaps, the pages the site's sitemaps list are crawled from the
+    start too, one hop deep, most recently modified first (see crawling.sitemaps).
+    """
+    project_id = project_id or task_id
+    priority = self.request.delivery_info.get("priority") if self.request.delivery_info else None
+
+    # Read the sitemaps before enlisting helpers, which would give up on an empty frontier meanwhile
+    seeds, sitemaps_read = [], 0
+    if sitemaps:
+        max_seeds = min(settings.SITEMAP_MAX_URLS, (budget or {}).get("max_pages") or settings.CRAWL_MAX_PAGES)
+        try:
+            seeds, sitemaps_read = discover_seeds(url, user_agent, max_seeds)
+        except Exception as e:
+            logger.warning(f"Crawl {task_id} starts without sitemap seeds: {e}")
+
+    for _ in range(workers - 1):
+        seo_crawl_helper_task.apply_async(
+            (task_id, depth, user_agent, project_id, incremental, workers, budget), priority=priority,
+        )
+
+    # Run the spider on this worker's long-lived crawl runner and wait for it
+    crawl = get_runner().crawl(
+        SEOSpider,
+        settings=seo_crawl_settings(task_id, depth, user_agent, workers, budget),
+        project_id=project_id,
+        task_id=task_id,
+        incremental=incremental,
+        start_urls=[url],
+        seeds=seeds,
+    )
+    try:
+        stats = crawl.result()
+    except Exception as e:
+        finish_crawl_task(task_id, "failed", {"task_id": task_id, "status": "failed", "error": str(e)})
+        raise
+
+    # Pages new, changed, unchanged and removed since the previous crawl
+    changes = {key.split("/", 1)[1]: value for key, value in stats.items() if key.startswith("incremental/")}
+    status = "cancelled" if stats.get("finish_reason") == "cancelled" else "completed"
+    result = {
+        "task_id": task_id,
+        "project_id": project_id,
+        "status": status,
+        "pages": stats.get("item_scraped_count", 0),
+        "finish_reason": stats.get("finish_reason"),  # e.g. closespider_pagecount when a budget ran out
+        "changes": changes,
+        "seeds": {"sitemaps": sitemaps_read, "urls": len(seeds)},
+    }
+    if status == "cancelled":
+        result["stop_latency"] = stats.get("cancel/stop_latency")
+
+    # Whole-site link analysis, once every worker has stored its part of the graph
+    try:
+        if not wait_for_fragments(engine, task_id, workers, settings.LINK_GRAPH_WAIT):
+            logger.warning(f"Analyzing links of crawl {task_id} without all {workers} workers' fragments")
+        summary = analyze_link_graph(task_id, project_id)
+        result["links"] = {key: summary[key] for key in LINK_SUMMARY_FIELDS}
+    except Exception as e:
+        logger.error(f"Link analysis of crawl {task_id} failed: {e}")
+
+    finish_crawl_task(task_id, status, result)
+    return result
+
+
+@shared_task
+def seo_crawl_helper_task(task_id: str, depth: int, user_agent: str, project_id: str = None, incremental: bool = False,
+                          workers: int = 2, budget: dict = None):
+    """
+    Joins a running multi-worker SEO crawl, taking requests from its shared
+    frontier until the frontier stays empty.
+    """
+    crawl = get_runner().crawl(
+        SEOSpider,
+        settings=seo_crawl_settings(task_id, depth, user_agent, workers, budget),
+        project_id=project_id or task_id,
+        task_id=task_id,
+        incremental=incremental,
+        start_urls=[],
+    )
+    stats = crawl.result()
+
+    return {"task_id": task_id, "pages": stats.get("item_scraped_count", 0)}
+
+
+@shared_task
+def rescore_crawl_task(project_id: str, chunk_size: int = 50000):
+    """
+    Re-scores every stored page of a crawl against the current SEO rules.
+    Works from the stored page features only; nothing is fetched or parsed again.
+    The project's crawl summaries are rebuilt from the new scores.
+    """
+    table = CrawlResult.__table__
+    query = (
+        select(table.c.id, *(table.c[name] for name in FEATURE_COLUMNS))
+        .where(table.c.project_id == uuid.UUID(project_id))
+    )
+    update_scores = (
+        update(table)
+        .where(table.c.id == bindparam("page_id"))
+        .values(
+            seo_score=bindparam("seo_score"), seo_evaluation=bindparam("seo_evaluation"), issues=bindparam("issues"),
+        )
+    )
+
+    sync_issue_codes(engine, RULES)
+    rescored = 0
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        for chunk in result.partitions():
+            rows = [dict(row._mapping) for row in chunk]
+            RULES.score_rows(rows)
 
-    # Run the Scrapy spider
-    process.crawl(SEOSpider, project_id=task_id, start_urls=[url])
-    process.start()
+            with engine.begin() as write_conn:
+                write_conn.execute(update_scores, [
+                    {"page_id": row["id"], "seo_score": row["seo_score"], "seo_evaluation": row["seo_evaluation"],
+                     "issues": row["issues"]}
+                    for row in rows
+                ])
+            rescored += len(rows)
 
-    return {"task_id": task_id, "status": "completed"}
+    rebuild_summaries(engine, uuid.UUID(project_id), chunk_size)
+    invalidate_cached(CRAWL_RESULT_CACHE, tags=[project_id])
+    logger.info(f"Re-scored {rescored} pages for project {project_id}")
+    return {"project_id": project_id, "rescored": rescored}
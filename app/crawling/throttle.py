@@ -0,0 +1,224 @@
+import logging
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+from scrapy.downloadermiddlewares.robotstxt import RobotsTxtMiddleware
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.httpobj import urlparse_cached
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Sent by CrawlDelayRobotsTxtMiddleware when a host's robots.txt sets a crawl delay
+crawl_delay_found = object()
+
+# Crawl settings that turn on per-host politeness and adaptive concurrency
+POLITENESS_SETTINGS = {
+    "ROBOTSTXT_OBEY": settings.ROBOTSTXT_OBEY,
+    "CONCURRENT_REQUESTS": settings.THROTTLE_MAX_CONCURRENCY * 4,
+    "CONCURRENT_REQUESTS_PER_DOMAIN": settings.THROTTLE_START_CONCURRENCY,
+    # Hand out requests from the hosts with the fewest downloads in flight first
+    "SCHEDULER_PRIORITY_QUEUE": "scrapy.pqueues.DownloaderAwarePriorityQueue",
+    "DOWNLOADER_MIDDLEWARES": {
+        "scrapy.downloadermiddlewares.robotstxt.RobotsTxtMiddleware": None,
+        "crawling.throttle.CrawlDelayRobotsTxtMiddleware": 100,
+        # Outermost, so it sees every response before retries and redirects
+        "crawling.throttle.AdaptiveThrottleMiddleware": 950,
+    },
+}
+
+BACKOFF_STATUSES = (429, 503)
+
+# robots.txt parsers shared by all crawls in the process, by scheme://netloc
+_robots_cache = OrderedDict()
+_ROBOTS_CACHE_SIZE = 10000
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait according to a Retry-After header (delta-seconds or HTTP date).
+    """
+    if not value:
+        return None
+    value = value.decode("latin-1").strip() if isinstance(value, bytes) else value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostState:
+    """
+    What the throttle knows about one downloader slot (normally one host).
+    """
+
+    __slots__ = ("latency", "min_delay", "backoff_until")
+
+    def __init__(self):
+        self.latency = None  # Moving average of download latency, seconds
+        self.min_delay = 0.0  # Floor set by the host's robots.txt crawl-delay
+        self.backoff_until = 0.0  # Until when a 429/503 back-off holds, time.time()
+
+
+class AdaptiveThrottleMiddleware:
+    """
+    Adjusts each host's download concurrency and delay from what it observes.
+
+    Fast, healthy hosts that have requests waiting get one more concurrent
+    download at a time, up to THROTTLE_MAX_CONCURRENCY. A host whose average
+    latency climbs past THROTTLE_TARGET_LATENCY, or that errors, loses one. A
+    429/503 halves its concurrency and pauses it for Retry-After (or doubles
+    its delay); the delay only eases off once that time has passed. The delay
+    never drops below the host's robots.txt crawl-delay, which is also kept
+    free of RANDOMIZE_DOWNLOAD_DELAY jitter.
+    """
+
+    def __init__(self, crawler, min_concurrency, max_concurrency, target_latency, max_delay):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.max_delay = max_delay
+        self.hosts = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("THROTTLE_ENABLED", True):
+            raise NotConfigured
+
+        middleware = cls(
+            crawler,
+            min_concurrency=crawler.settings.getint("THROTTLE_MIN_CONCURRENCY", settings.THROTTLE_MIN_CONCURRENCY),
+            max_concurrency=crawler.settings.getint("THROTTLE_MAX_CONCURRENCY", settings.THROTTLE_MAX_CONCURRENCY),
+            target_latency=crawler.settings.getfloat("THROTTLE_TARGET_LATENCY", settings.THROTTLE_TARGET_LATENCY),
+            max_delay=crawler.settings.getfloat("THROTTLE_MAX_DELAY", settings.THROTTLE_MAX_DELAY),
+        )
+        crawler.signals.connect(middleware.crawl_delay_found, signal=crawl_delay_found)
+        return middleware
+
+    def crawl_delay_found(self, host, delay):
+        state = self.hosts.setdefault(host, HostState())
+        state.min_delay = min(delay, self.max_delay)
+        downloader = self.crawler.engine.downloader
+        # Slots created for the host later (after slot GC) start from the delay too
+        downloader.per_slot_settings.setdefault(host, {}).update(delay=state.min_delay, randomize_delay=False)
+        slot = downloader.slots.get(host)
+        if slot is not None:
+            slot.delay = max(slot.delay, state.min_delay)
+            slot.randomize_delay = False
+
+    def process_response(self, request, response, spider):
+        key, slot = self._get_slot(request)
+        if slot is None:
+            return response
+
+        state = self.hosts.setdefault(key, HostState())
+        if response.status in BACKOFF_STATUSES:
+            self._back_off(key, slot, state, parse_retry_after(response.headers.get("Retry-After")))
+        elif response.status >= 500:
+            self._set_concurrency(slot, slot.concurrency - 1)
+            self.stats.inc_value("throttle/server_errors")
+        else:
+            latency = request.meta.get("download_latency")
+            if latency is not None:
+                self._observe(slot, state, latency)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        # Timeouts and connection errors: ease off the host
+        key, slot = self._get_slot(request)
+        if slot is not None:
+            self._set_concurrency(slot, slot.concurrency - 1)
+            self.stats.inc_value("throttle/download_errors")
+
+    def _get_slot(self, request):
+        key = request.meta.get("download_slot")
+        return key, self.crawler.engine.downloader.slots.get(key)
+
+    def _observe(self, slot, state, latency):
+        state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+
+        if state.latency > self.target_latency:
+            self._set_concurrency(slot, slot.concurrency - 1)
+        elif slot.queue:
+            # Requests are waiting on this host and it keeps up: open one more connection
+            self._set_concurrency(slot, slot.concurrency + 1)
+
+        # Recover from earlier back-offs once they have run their course (responses
+        # already in flight must not cancel them), but never go below the robots.txt delay
+        if time.time() >= state.backoff_until:
+            slot.delay = max(state.min_delay, slot.delay * 0.5 if slot.delay > 0.01 else 0.0)
+
+    def _back_off(self, key, slot, state, retry_after):
+        self._set_concurrency(slot, slot.concurrency // 2)
+        if retry_after is None:
+            retry_after = max(slot.delay * 2, 1.0)
+        slot.delay = min(max(retry_after, state.min_delay), self.max_delay)
+        slot.lastseen = time.time()
+        state.backoff_until = slot.lastseen + slot.delay
+        self.stats.inc_value("throttle/backoffs")
+        logger.debug(f"Backing off {key}: concurrency {slot.concurrency}, delay {slot.delay:.1f}s")
+
+    def _set_concurrency(self, slot, concurrency):
+        slot.concurrency = max(self.min_concurrency, min(self.max_concurrency, concurrency))
+
+
+class CrawlDelayRobotsTxtMiddleware(RobotsTxtMiddleware):
+    """
+    RobotsTxtMiddleware that also honors Crawl-delay, and keeps parsed robots.txt
+    files for ROBOTSTXT_CACHE_TTL seconds so crawls of the same site in one
+    worker don't fetch and parse them again.
+    """
+
+    def __init__(self, crawler):
+        super().__init__(crawler)
+        self.cache_ttl = crawler.settings.getfloat("ROBOTSTXT_CACHE_TTL", settings.ROBOTSTXT_CACHE_TTL)
+        self._cache_keys = {}  # netloc -> scheme://netloc of the robots.txt being fetched
+
+    def robot_parser(self, request, spider):
+        url = urlparse_cached(request)
+        netloc = url.netloc
+        if netloc not in self._parsers:
+            cache_key = f"{url.scheme}://{netloc}"
+            cached = _robots_cache.get(cache_key)
+            if cached is not None and cached[0] > time.monotonic():
+                self._parsers[netloc] = cached[1]
+                self.crawler.stats.inc_value("robotstxt/cache_hit")
+                self._apply_crawl_delay(netloc, cached[1])
+            else:
+                self._cache_keys[netloc] = cache_key
+        return super().robot_parser(request, spider)
+
+    def _parse_robots(self, response, netloc, spider):
+        # RobotsTxtMiddleware._parse_robots, with the crawl delay applied
+        # before the requests waiting on the robots.txt are let through
+        self.crawler.stats.inc_value("robotstxt/response_count")
+        self.crawler.stats.inc_value(f"robotstxt/response_status_count/{response.status}")
+        parser = self._parserimpl.from_crawler(self.crawler, response.body)
+        self._apply_crawl_delay(netloc, parser)
+
+        cache_key = self._cache_keys.pop(netloc, f"{urlparse_cached(response).scheme}://{netloc}")
+        _robots_cache[cache_key] = (time.monotonic() + self.cache_ttl, parser)
+        _robots_cache.move_to_end(cache_key)
+        while len(_robots_cache) > _ROBOTS_CACHE_SIZE:
+            _robots_cache.popitem(last=False)
+
+        waiting = self._parsers[netloc]
+        self._parsers[netloc] = parser
+        waiting.callback(parser)
+
+    def _apply_crawl_delay(self, netloc, parser):
+        # Only the Protego parser (Scrapy's default) exposes crawl delays
+        robots = getattr(parser, "rp", None)
+        if robots is None or not hasattr(robots, "crawl_delay"):
+            return
+
+        delay = robots.crawl_delay(self._robotstxt_useragent or self._default_useragent)
+        if delay:
+            host = netloc.rsplit(":", 1)[0].lower()
+            self.crawler.signals.send_catch_log(crawl_delay_found, host=host, delay=float(delay))
@@ -0,0 +1,44 @@
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+from w3lib.url import canonicalize_url as w3lib_canonicalize_url
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters that only track where a visitor came from
+TRACKING_PARAMS = frozenset((
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "utm_id",
+    "gclid", "dclid", "gbraid", "wbraid", "fbclid", "msclkid", "yclid", "twclid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "igshid", "ref_src", "sessionid", "phpsessid",
+))
+
+
+def canonicalize_url(url, strip_trailing_slash=False):
+    """
+    Normalizes a URL so that variants of the same page compare equal.
+
+    Lowercases the scheme and host, drops default ports, the fragment and
+    tracking parameters, sorts the query string and normalizes percent-encoding.
+    With strip_trailing_slash, "/docs/" and "/docs" are treated as one page too.
+    """
+    parts = urlsplit(w3lib_canonicalize_url(url))
+
+    netloc = parts.netloc
+    try:
+        if parts.port is not None and DEFAULT_PORTS.get(parts.scheme) == parts.port:
+            netloc = netloc.rsplit(":", 1)[0]
+    except ValueError:
+        pass  # Malformed port; leave the netloc as it is
+
+    # Filter the already-sorted, already-encoded query in place
+    query = parts.query
+    if query:
+        query = "&".join(
+            param for param in query.split("&")
+            if unquote_plus(param.split("=", 1)[0]).lower() not in TRACKING_PARAMS
+        )
+
+    path = parts.path or "/"
+    if strip_trailing_slash and len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+
+    return urlunsplit((parts.scheme, netloc, path, query, ""))
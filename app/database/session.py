@@ -1,17 +1,51 @@
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from core.config import settings
 
 # Database URL (replace with your actual database URL)
 DATABASE_URL = settings.DATABASE_URL
 
-# SQLAlchemy engine
-engine = create_engine(DATABASE_URL, echo=True)
+# Async drivers for the API, by backend
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+# Sync SQLAlchemy engine, for the Celery workers and crawl pipelines
+engine = create_engine(DATABASE_URL, echo=settings.DATABASE_ECHO, pool_pre_ping=True)
 
 # Create a session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def async_database_url(url):
+    """
+    The same database as `url`, reached through its async driver.
+    """
+    url = make_url(url)
+    url = url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+    if url.get_backend_name() == "postgresql":
+        # Prepared statements kept per asyncpg connection, so hot queries skip the parse/plan step
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.DATABASE_STATEMENT_CACHE_SIZE)})
+    return url
+
+
+# Async engine for the FastAPI routes; connections are pooled and checked before use
+async_engine = create_async_engine(
+    async_database_url(DATABASE_URL),
+    echo=settings.DATABASE_ECHO,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+    pool_recycle=settings.DATABASE_POOL_RECYCLE,
+    pool_pre_ping=True,
+)
+
+# Create an async session factory; objects stay usable after commit
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Base class for models
 Base = declarative_base()
 
@@ -22,3 +56,22 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async database session (API routes)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+# Create any missing tables (once per engine and process; concurrent crawls may call it together)
+def init_db(bind=None):
+    # Import the models so they are registered on Base.metadata
+    import models.crawl_results  # noqa: F401
+
+    bind = bind or engine
+    with _init_lock:
+        if bind.url not in _initialized:
+            Base.metadata.create_all(bind=bind)
+            _initialized.add(bind.url)
@@ -1,8 +1,15 @@
+import asyncio
 import logging
+import time
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
 from api import routes
+from core import metrics
+from core.cache import get_result_cache
+from database.session import async_engine, init_db
 
 # Configure logging with a more production-ready format
 logging.basicConfig(
@@ -30,6 +37,50 @@ app.add_middleware(
 # Register API routes
 app.include_router(routes.router)
 
+# Time every request, labelled by its route template rather than the raw path
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.labels(
+        request.method, route.path if route else "unmatched", response.status_code,
+    ).observe(time.perf_counter() - started)
+    return response
+
+# Prometheus metrics of the API process (crawl workers export theirs on WORKER_METRICS_PORT)
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    body, content_type = metrics.render_metrics()
+    return Response(body, headers={"Content-Type": content_type})
+
+# Count the statements the API sends to the database
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_db_statement(conn, cursor, statement, parameters, context, executemany):
+    metrics.DB_STATEMENTS.inc()
+
+# Create any missing tables before serving requests
+@app.on_event("startup")
+async def create_tables():
+    await run_in_threadpool(init_db)
+
+# Keep this process's result cache in step with invalidations from the others
+@app.on_event("startup")
+async def listen_for_invalidations():
+    if get_result_cache().enabled:
+        app.state.cache_listener = asyncio.create_task(get_result_cache().listen())
+
+# Close the async engine's pooled connections
+@app.on_event("shutdown")
+async def close_database():
+    await async_engine.dispose()
+
+@app.on_event("shutdown")
+async def stop_invalidation_listener():
+    listener = getattr(app.state, "cache_listener", None)
+    if listener:
+        listener.cancel()
+
 # Root endpoint to check the API status
 @app.get("/")
 def read_root():
@@ -1,34 +1,182 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, func
-from database.session import Base
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import BigInteger, Boolean, Column, Float, Index, Integer, LargeBinary, SmallInteger, String, Text, DateTime
+from sqlalchemy import Uuid
 from sqlalchemy.sql import func
 from database.session import Base
+from storage.blobs import get_blob_store
 import uuid
 
 class CrawlResult(Base):
     __tablename__ = "crawl_results"
+    __table_args__ = (
+        # Keyset pagination and export of a project's results, in id order
+        Index("ix_crawl_results_project_id_id", "project_id", "id"),
+        # Link analysis writes its per-page metrics back by crawl and URL
+        Index("ix_crawl_results_task_id_url", "task_id", "url"),
+        # A crawl's lowest scoring pages, for its site report
+        Index("ix_crawl_results_task_id_seo_score", "task_id", "seo_score"),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    project_id = Column(UUID(as_uuid=True), nullable=False)
-    url = Column(String(255), nullable=False)
-    title = Column(String(255), nullable=True)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    project_id = Column(Uuid(as_uuid=True), nullable=False)
+    task_id = Column(Uuid(as_uuid=True), nullable=True, index=True)  # The crawl that stored the row
+    url = Column(Text, nullable=False)
+    depth = Column(Integer, nullable=True)
+    title = Column(Text, nullable=True)
     meta_description = Column(Text, nullable=True)
+    canonical = Column(Text, nullable=True)
+    h1 = Column(Text, nullable=True)
+    h2 = Column(Text, nullable=True)
+    h3 = Column(Text, nullable=True)
+    h4 = Column(Text, nullable=True)
+    h5 = Column(Text, nullable=True)
+    h6 = Column(Text, nullable=True)
+    alt_texts = Column(Text, nullable=True)
     word_count = Column(Integer, nullable=True)
+    title_length = Column(Integer, nullable=True)
+    meta_description_length = Column(Integer, nullable=True)
+    h1_count = Column(Integer, nullable=True)
+    image_count = Column(Integer, nullable=True)
+    images_missing_alt = Column(Integer, nullable=True)
     internal_links = Column(Integer, nullable=True)
     external_links = Column(Integer, nullable=True)
+    broken_links = Column(Integer, nullable=True, default=0)  # Links to pages answering 4xx/5xx, after link analysis
+    # Link analysis (analysis.linkgraph), filled in after the crawl
+    inlinks = Column(Integer, nullable=True)
+    click_depth = Column(Integer, nullable=True)
+    pagerank = Column(Float, nullable=True)
     seo_evaluation = Column(Text, nullable=True)
     seo_score = Column(Integer, nullable=True)
-    raw_html = Column(Text, nullable=True)
-    load_time = Column(Integer, nullable=True)
+    issues = Column(BigInteger, nullable=True)  # Bit set per issue the page has; bit = issue_codes.code
+    load_time = Column(Float, nullable=True)  # Seconds to the first byte of the response
+    # Change tracking for incremental recrawls; the validators are kept as the server sent them, at any length
+    etag = Column(Text, nullable=True)
+    last_modified = Column(Text, nullable=True)
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the page HTML; its key in the blob store
+    truncated = Column(Boolean, nullable=True)  # HTML cut at CRAWL_MAX_BODY_BYTES
+    minhash = Column(LargeBinary, nullable=True)  # MinHash signature of the body text (analysis.duplicates)
+    change_status = Column(String(16), nullable=True)  # new, changed or unchanged
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    @property
+    def raw_html(self):
+        """
+        The page's HTML, read from the blob store on access.
+        """
+        if self.content_hash is None:
+            return None
+        return get_blob_store().get(self.content_hash).decode("utf-8", errors="replace")
+
 
 class CrawlTask(Base):
     __tablename__ = "crawl_tasks"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    url = Column(String(255), nullable=False)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    url = Column(Text, nullable=False)
+    depth = Column(Integer, nullable=True)
     status = Column(String(50), nullable=False, default="pending")
     result = Column(Text, nullable=True)
+    batch_id = Column(Uuid(as_uuid=True), nullable=True, index=True)  # Bulk start_crawls call that queued it
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class CrawlLinkFragment(Base):
+    """
+    Part of a crawl's link graph as one worker recorded it: pages, statuses,
+    redirects and links by URL, stored in the blob store (see crawling.linkgraph).
+    """
+    __tablename__ = "crawl_link_fragments"
+
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    task_id = Column(Uuid(as_uuid=True), nullable=False, index=True)
+    blob_key = Column(String(64), nullable=False)
+    pages = Column(Integer, nullable=False)
+    links = Column(Integer, nullable=False)
+    final = Column(Boolean, nullable=False, default=False)  # The worker's last fragment of the crawl
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CrawlGraph(Base):
+    """
+    A crawl's analyzed link graph: the CSR arrays in the blob store, and the
+    analysis summary (broken links, orphans, redirect chains, top pages) as JSON.
+    """
+    __tablename__ = "crawl_graphs"
+
+    task_id = Column(Uuid(as_uuid=True), primary_key=True)
+    project_id = Column(Uuid(as_uuid=True), nullable=True, index=True)
+    nodes = Column(Integer, nullable=False)
+    edges = Column(Integer, nullable=False)
+    blob_key = Column(String(64), nullable=False)
+    summary = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class MinHashBand(Base):
+    """
+    LSH index of a crawl's MinHash signatures: one row per page and band.
+    Pages that share a band's key are near-duplicate candidates.
+    """
+    __tablename__ = "minhash_bands"
+
+    # The primary key is the lookup index; no separate ID to maintain per row
+    task_id = Column(Uuid(as_uuid=True), primary_key=True)
+    band = Column(SmallInteger, primary_key=True)
+    key = Column(BigInteger, primary_key=True)
+    page_id = Column(Uuid(as_uuid=True), primary_key=True)  # crawl_results.id
+
+
+class NearDuplicate(Base):
+    """
+    Two pages of a crawl whose estimated text similarity is at least
+    NEAR_DUPLICATE_SIMILARITY.
+    """
+    __tablename__ = "near_duplicates"
+
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    task_id = Column(Uuid(as_uuid=True), nullable=False, index=True)
+    page_id = Column(Uuid(as_uuid=True), nullable=False)
+    duplicate_id = Column(Uuid(as_uuid=True), nullable=False)
+    similarity = Column(Float, nullable=False)
+
+
+class IssueCode(Base):
+    """
+    An SEO rule's bit in crawl_results.issues: its position in
+    analysis.rules.RULES. Workers keep the table in step with the rules.
+    """
+    __tablename__ = "issue_codes"
+
+    code = Column(SmallInteger, primary_key=True, autoincrement=False)
+    name = Column(String(64), nullable=False)
+    message = Column(String(255), nullable=False)
+    penalty = Column(Integer, nullable=False)
+
+
+class CrawlSummary(Base):
+    """
+    Running totals of a crawl's stored pages, updated with every batch the
+    pipeline writes (crawling.summary); averages derive from them.
+    """
+    __tablename__ = "crawl_summaries"
+
+    task_id = Column(Uuid(as_uuid=True), primary_key=True)
+    project_id = Column(Uuid(as_uuid=True), nullable=False, index=True)
+    pages = Column(BigInteger, nullable=False, default=0)
+    clean_pages = Column(BigInteger, nullable=False, default=0)  # Pages without any issue
+    score_sum = Column(BigInteger, nullable=False, default=0)
+    word_count_sum = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CrawlHistogram(Base):
+    """
+    Pages of a crawl per bucket of a metric (see analysis.summary): issue
+    code, SEO score, word count or depth. Updated with the crawl's summary.
+    """
+    __tablename__ = "crawl_histograms"
+
+    task_id = Column(Uuid(as_uuid=True), primary_key=True)
+    metric = Column(String(16), primary_key=True)
+    bucket = Column(Integer, primary_key=True, autoincrement=False)
+    pages = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+import zstandard
+
+from core.config import settings
+
+
+def blob_key(data):
+    """
+    Key a blob is stored under: the hex SHA-256 of its uncompressed bytes.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """
+    Content-addressed store of zstd-compressed blobs.
+
+    Blobs are keyed by the SHA-256 of their uncompressed data, so storing data
+    that's already there is a no-op: identical pages within a crawl, and
+    unchanged pages across crawls, are kept once. Subclasses only move
+    compressed bytes around (_read, _write, _exists); compression and keying
+    happen here.
+    """
+
+    def __init__(self, level=None):
+        self.level = level or settings.BLOB_COMPRESSION_LEVEL
+        # zstd (de)compression contexts aren't thread-safe; keep one per thread
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url):
+        raise NotImplementedError
+
+    def put(self, data, key=None):
+        """
+        Stores `data` unless a blob with the same content exists; returns its key.
+        """
+        key = key or blob_key(data)
+        if not self._exists(key):
+            self._write(key, self._compressor().compress(data))
+        return key
+
+    def get(self, key):
+        """
+        Returns the uncompressed blob stored under `key`; raises KeyError if there is none.
+        """
+        return self._decompressor().decompress(self._read(key))
+
+    def __contains__(self, key):
+        return self._exists(key)
+
+    def _compressor(self):
+        if not hasattr(self._local, "compressor"):
+            self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+        return self._local.compressor
+
+    def _decompressor(self):
+        if not hasattr(self._local, "decompressor"):
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        return self._local.decompressor
+
+    def _read(self, key):
+        raise NotImplementedError
+
+    def _write(self, key, compressed):
+        raise NotImplementedError
+
+    def _exists(self, key):
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blob store in a local (or network-mounted) directory, fanned out as
+    ab/cd/abcd....zst so no single directory grows too large.
+    """
+
+    def __init__(self, root, level=None):
+        super().__init__(level)
+        self.root = root
+
+    @classmethod
+    def from_url(cls, url):
+        parsed = urlparse(url)
+        return cls(parsed.netloc + parsed.path)
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key[2:4], f"{key}.zst")
+
+    def _read(self, key):
+        try:
+            with open(self.path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(key) from None
+
+    def _write(self, key, compressed):
+        # Write to a temporary file and rename, so readers never see a partial blob
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _exists(self, key):
+        return os.path.exists(self.path(key))
+
+
+# Blob store classes by URL scheme; object stores register theirs with register_blob_store()
+BLOB_STORES = {"file": LocalBlobStore}
+
+
+def register_blob_store(scheme, store_cls):
+    BLOB_STORES[scheme] = store_cls
+
+
+def open_blob_store(url):
+    scheme = urlparse(url).scheme or "file"
+    try:
+        store_cls = BLOB_STORES[scheme]
+    except KeyError:
+        raise ValueError(f"No blob store registered for {scheme!r} URLs") from None
+    return store_cls.from_url(url)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store():
+    """
+    Returns the process-wide blob store configured by BLOB_STORE_URL.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = open_blob_store(settings.BLOB_STORE_URL)
+        return _store
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import threading
+
+# Settings are read at import time: point the database and blob store at a
+# scratch directory before anything imports core.config
+_scratch = tempfile.mkdtemp(prefix="crawler-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_scratch}/tests.db")
+os.environ.setdefault("BLOB_STORE_URL", f"file://{_scratch}/blobs")
+
+import fakeredis  # noqa: E402
+import pytest  # noqa: E402
+
+from benchmarks.sitegen import SyntheticSite, serve_site  # noqa: E402
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    """
+    A fakeredis client standing in for get_redis() everywhere.
+    """
+    from core import redis_client
+
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(redis_client, "_client", client)
+    return client
+
+
+@pytest.fixture(scope="session")
+def crawl_runner():
+    """
+    One CrawlRunner for the whole session: its reactor can't be restarted.
+    """
+    from crawling.runner import CrawlRunner
+    from crawling.throttle import POLITENESS_SETTINGS
+
+    runner = CrawlRunner(max_crawls=1, base_settings=POLITENESS_SETTINGS)
+    yield runner
+    runner.stop()
+
+
+@pytest.fixture
+def serve():
+    """
+    Serves a SyntheticSite built from the given options; returns its root
+    URL and the site.
+    """
+    servers = []
+
+    def start(**options):
+        site = SyntheticSite(**options)
+        server = serve_site(site)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/", site
+
+    yield start
+    for server in servers:
+        server.shutdown()
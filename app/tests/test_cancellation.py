@@ -0,0 +1,34 @@
+import time
+import uuid
+
+from core.events import cancel_key, event_stream_key
+from crawling.seo_spider import SEOSpider
+from crawling.tasks import seo_crawl_settings
+
+POLL_INTERVAL = 0.5
+SLOW_DELAY = 0.2
+
+
+def test_cancelled_crawl_stops_within_the_poll_interval(crawl_runner, redis_client, serve):
+    # Every page is slow, so the crawl is still going when it is stopped
+    start_url, _ = serve(pages=2000, slow_rate=1.0, slow_delay=SLOW_DELAY)
+    task_id = str(uuid.uuid4())
+    crawl_settings = dict(seo_crawl_settings(task_id, 0, "CrawlBot"), CANCEL_POLL_INTERVAL=POLL_INTERVAL)
+
+    crawl = crawl_runner.crawl(SEOSpider, settings=crawl_settings, task_id=task_id, start_urls=[start_url])
+    time.sleep(2)
+    assert not crawl.done()
+    redis_client.set(cancel_key(task_id), time.time())
+    stats = crawl.result(timeout=30)
+
+    assert stats["finish_reason"] == "cancelled"
+    assert 0 < stats.get("response_received_count", 0) < 2000
+    # Seen by the next poll; closing then waits for the downloads already
+    # under way and the pipeline's last batch
+    assert stats["cancel/detect_latency"] <= POLL_INTERVAL + 0.25
+    assert stats["cancel/stop_latency"] <= POLL_INTERVAL + SLOW_DELAY + 2
+
+    # Progress events, sent from the thread pool, still arrive in order
+    events = [fields[b"event"] for _, fields in redis_client.xrange(event_stream_key(task_id))]
+    assert events[0] == b"started" and events[-1] == b"closed"
+    assert set(events[1:-1]) <= {b"progress"}
@@ -0,0 +1,35 @@
+import asyncio
+
+import fakeredis
+
+from api.events import stream_events
+from core.events import publish_event
+
+
+async def collect(client, task_id, **options):
+    return [chunk async for chunk in stream_events(client, task_id, **options)]
+
+
+def test_stream_ends_with_terminal_event():
+    server = fakeredis.FakeServer()
+    publish_event(fakeredis.FakeRedis(server=server), "task", "started")
+    publish_event(fakeredis.FakeRedis(server=server), "task", "completed")
+
+    chunks = asyncio.run(collect(fakeredis.FakeAsyncRedis(server=server, decode_responses=True), "task", heartbeat=0.05))
+
+    assert [chunk.split("\n")[1] for chunk in chunks] == ["event: started", "event: completed"]
+
+
+def test_idle_stream_closes():
+    chunks = asyncio.run(collect(fakeredis.FakeAsyncRedis(decode_responses=True), "task", heartbeat=0.05, max_idle=0.2))
+
+    assert chunks and set(chunks) == {": keep-alive\n\n"}
+
+
+def test_finished_crawl_without_terminal_event_closes():
+    server = fakeredis.FakeServer()
+    publish_event(fakeredis.FakeRedis(server=server), "task", "progress", pages=3)
+
+    chunks = asyncio.run(collect(fakeredis.FakeAsyncRedis(server=server, decode_responses=True), "task", finished=True))
+
+    assert [chunk.split("\n")[1] for chunk in chunks] == ["event: progress"]
@@ -0,0 +1,31 @@
+from scrapy.http import HtmlResponse
+
+from analysis.duplicates import minhash, words
+from crawling.extraction import extract_page_facts
+
+
+def facts(body):
+    return extract_page_facts(HtmlResponse("https://example.com/", body=body.encode(), encoding="utf-8"))
+
+
+def test_words_and_fingerprint_come_from_the_visible_text():
+    page = facts(
+        "<html><head><title>Page</title></head><body>"
+        "<p>Three visible <b>words</b></p>"
+        "<script>var hidden = 'script words';</script><style>p { color: red }</style>"
+        "<noscript>Enable scripts</noscript>"
+        "</body></html>"
+    )
+
+    assert page.word_count == 3
+    assert page.minhash == minhash(words("Three visible words"))
+
+
+def test_h1s_with_text_count_once_each():
+    assert facts("<html><body><h1>Title</h1></body></html>").h1_count == 1
+    # Nested markup: one heading, however many text nodes it has of its own
+    assert facts("<html><body><h1>\n  <a href='/'>Home</a>\n</h1></body></html>").h1_count == 1
+    assert facts("<html><body><h1>Big <em>and</em> bold</h1></body></html>").h1_count == 1
+    # Empty headings don't count
+    assert facts("<html><body><h1></h1><h1> </h1><h1><img src='logo.png'></h1></body></html>").h1_count == 0
+    assert facts("<html><body><h1>One</h1><h1>Two</h1></body></html>").h1_count == 2
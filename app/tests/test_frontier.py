@@ -0,0 +1,88 @@
+import hashlib
+
+import fakeredis
+import pytest
+
+from crawling.frontier import RedisFrontier
+
+
+def fingerprint(url):
+    return hashlib.sha1(url.encode()).digest()
+
+
+@pytest.fixture
+def frontier():
+    return RedisFrontier(fakeredis.FakeRedis(), "task", bloom_bits=2 ** 16, bloom_hashes=5)
+
+
+def test_push_pop(frontier):
+    frontier.push("https://example.com/a", b"a")
+    frontier.push("https://example.com/b", b"b")
+
+    assert len(frontier) == 2
+    assert {frontier.pop(), frontier.pop()} == {b"a", b"b"}
+    assert frontier.pop() is None
+    assert len(frontier) == 0
+
+
+def test_pop_orders_by_depth_then_priority(frontier):
+    frontier.push("https://example.com/deep", b"deep", depth=2, priority=10)
+    frontier.push("https://example.com/low", b"low", depth=1, priority=0)
+    frontier.push("https://example.com/high", b"high", depth=1, priority=5)
+
+    assert [frontier.pop() for _ in range(3)] == [b"high", b"low", b"deep"]
+
+
+def test_hosts_take_turns(frontier):
+    for i in range(3):
+        frontier.push(f"https://a.example/{i}", f"a{i}".encode())
+    frontier.push("https://b.example/0", b"b0")
+
+    payloads, remaining = frontier.pop_many(4)
+
+    # One host's backlog does not hold the other up
+    assert [payload[:1] for payload in payloads[:2]] in ([b"a", b"b"], [b"b", b"a"])
+    assert sorted(payloads) == [b"a0", b"a1", b"a2", b"b0"]
+    assert remaining == 0
+
+
+def test_pop_passes_over_drained_hosts(frontier):
+    for host in ("a", "b", "c"):
+        frontier.push(f"https://{host}.example/", host.encode())
+    taken, _ = frontier.pop_many(2)
+
+    # Drained hosts stay on the ring, but pop keeps going round to the last one
+    assert frontier.pop() == ({b"a", b"b", b"c"} - set(taken)).pop()
+    assert frontier.pop() is None
+
+
+def test_pop_many_counts_what_is_left(frontier):
+    frontier.push_many([(f"https://example.com/{i}", str(i).encode(), 0, 0) for i in range(10)])
+
+    payloads, remaining = frontier.pop_many(4)
+
+    assert len(payloads) == 4
+    assert remaining == len(frontier) == 6
+
+
+def test_mark_seen(frontier):
+    assert frontier.mark_seen(fingerprint("https://example.com/"))
+    assert not frontier.mark_seen(fingerprint("https://example.com/"))
+    assert frontier.mark_seen(fingerprint("https://example.com/other"))
+
+
+def test_add_many_filters_seen_requests(frontier):
+    entry = (fingerprint("https://example.com/"), "https://example.com/", b"home", 0, 0, False)
+    other = (fingerprint("https://example.com/x"), "https://example.com/x", b"x", 0, 0, False)
+
+    # Duplicates within one batch are caught too
+    assert frontier.add_many([entry, other, entry]) == (2, 1)
+    assert frontier.add_many([entry]) == (0, 1)
+    assert len(frontier) == 2
+
+
+def test_add_many_queues_unfiltered_requests_again(frontier):
+    entry = (fingerprint("https://example.com/"), "https://example.com/", b"home", 0, 0, True)
+
+    assert frontier.add_many([entry]) == (1, 0)
+    assert frontier.add_many([entry]) == (1, 0)
@@ -0,0 +1,54 @@
+from analysis.linkgraph import NOT_CRAWLED, LinkGraph, analyze
+
+SITE = "https://example.com"
+
+
+def fragment(pages=(), redirects=(), links=(), unchanged=()):
+    return {
+        "seeds": [f"{SITE}/"], "pages": list(pages), "redirects": list(redirects),
+        "links": list(links), "unchanged": list(unchanged),
+    }
+
+
+def first_crawl():
+    return LinkGraph.from_fragments([fragment(
+        pages=[(f"{SITE}/", 200), (f"{SITE}/a", 200), (f"{SITE}/missing", 404), (f"{SITE}/b", 200)],
+        redirects=[(f"{SITE}/old", 301, f"{SITE}/older"), (f"{SITE}/older", 301, f"{SITE}/b")],
+        links=[(f"{SITE}/", [f"{SITE}/a", f"{SITE}/missing", f"{SITE}/old"]), (f"{SITE}/a", [f"{SITE}/missing"]),
+               (f"{SITE}/b", [])],
+    )])
+
+
+def test_unchanged_recrawl_keeps_broken_links_and_redirect_chains():
+    prior = first_crawl()
+    # Only the stored pages are requested again, and all come back unchanged
+    recrawl = LinkGraph.from_fragments([fragment(
+        pages=[(f"{SITE}/", 304), (f"{SITE}/a", 304), (f"{SITE}/b", 304)],
+        unchanged=[f"{SITE}/", f"{SITE}/a", f"{SITE}/b"],
+    )], prior)
+
+    before, before_summary = analyze(prior)
+    after, after_summary = analyze(recrawl)
+
+    for key in ("pages", "broken_link_count", "broken_links", "redirect_chain_count", "orphan_count"):
+        assert after_summary[key] == before_summary[key], key
+    assert after_summary["broken_link_count"] == 2
+    # The chain ends on a page that answered 304 this time
+    assert [chain["urls"] for chain in after_summary["redirect_chains"]] == [[f"{SITE}/old", f"{SITE}/older", f"{SITE}/b"]]
+    assert after_summary["redirect_chains"][0]["statuses"] == [301, 301, 304]
+    index = {url: i for i, url in enumerate(recrawl.urls)}
+    assert after["broken_links"][index[f"{SITE}/"]] == after["broken_links"][index[f"{SITE}/a"]] == 1
+
+
+def test_recrawl_statuses_win_over_prior_ones():
+    prior = first_crawl()
+    # The missing page is back, and a link the recrawl didn't follow stays unknown
+    recrawl = LinkGraph.from_fragments([fragment(
+        pages=[(f"{SITE}/", 200), (f"{SITE}/missing", 200)],
+        links=[(f"{SITE}/", [f"{SITE}/missing", f"{SITE}/a"])],
+    )], prior)
+
+    status = dict(zip(recrawl.urls, recrawl.status.tolist()))
+    assert status[f"{SITE}/missing"] == 200
+    assert status[f"{SITE}/a"] == NOT_CRAWLED
+    assert analyze(recrawl)[1]["broken_link_count"] == 0
@@ -0,0 +1,34 @@
+from prometheus_client import REGISTRY
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from crawling.metrics import CrawlMetrics
+from crawling.seo_spider import SEOSpider
+
+
+def pages(host):
+    return REGISTRY.get_sample_value("crawl_pages_total", {"host": host})
+
+
+def download(extension, spider, url):
+    response = HtmlResponse(url, body=b"<html></html>", request=Request(url))
+    extension.response_downloaded(response, response.request, spider)
+
+
+def test_pages_are_counted_for_the_crawl_host_only():
+    crawler = get_crawler(SEOSpider)
+    spider = SEOSpider(task_id="metrics", start_urls=[])
+    extension = CrawlMetrics(crawler, 60)
+    others = pages("other") or 0
+
+    # A helper has no start URL: its first page gives the crawl's host
+    download(extension, spider, "https://Metrics.example/")
+    download(extension, spider, "https://metrics.example/a")
+    download(extension, spider, "https://cdn.example/b")
+
+    assert extension.host == "metrics.example"
+    assert pages("metrics.example") == 2
+    assert pages("other") == others + 1
+
+    extension.spider_closed(spider)
+    assert pages("metrics.example") is None
@@ -0,0 +1,124 @@
+import itertools
+
+import numpy as np
+from sqlalchemy import BigInteger, Column, Integer, MetaData, Table, create_engine, insert, select
+
+from analysis.rules import FEATURE_COLUMNS, RULES, FeatureTable, Rule, RuleRegistry
+from analysis.summary import issue_codes
+
+TITLE_META_H1_RULES = (
+    "missing_title", "title_too_long", "title_too_short",
+    "missing_meta_description", "meta_description_too_long", "meta_description_too_short",
+    "multiple_h1", "missing_h1",
+)
+
+
+def baseline_evaluation(title_length, meta_description_length, h1_count):
+    # The per-page if/elif checks the rule registry replaced
+    issues, score = [], 100
+    if not title_length:
+        issues.append("Missing Title (Critical Issue)")
+        score -= 25
+    elif title_length > 60:
+        issues.append("Title Too Long (Minor Issue)")
+        score -= 5
+    elif title_length < 30:
+        issues.append("Title Too Short (Minor Issue)")
+        score -= 5
+
+    if not meta_description_length:
+        issues.append("Missing Meta Description (Critical Issue)")
+        score -= 25
+    elif meta_description_length > 160:
+        issues.append("Meta Description Too Long (Minor Issue)")
+        score -= 5
+    elif meta_description_length < 50:
+        issues.append("Meta Description Too Short (Minor Issue)")
+        score -= 5
+
+    if h1_count > 1:
+        issues.append("Multiple H1 Tags (Moderate Issue)")
+        score -= 15
+    elif not h1_count:
+        issues.append("Missing H1 Tag (Critical Issue)")
+        score -= 25
+
+    return ", ".join(issues) if issues else "No Issues", score
+
+
+def page(title_length=45, meta_description_length=120, h1_count=1, **features):
+    row = dict.fromkeys(FEATURE_COLUMNS, 0)
+    row.update(url="https://example.com/", canonical="https://example.com/", title_length=title_length,
+               meta_description_length=meta_description_length, h1_count=h1_count)
+    row.update(features)
+    return row
+
+
+# Each side of every threshold
+TITLE_LENGTHS = (0, 1, 29, 30, 45, 60, 61, 200)
+META_DESCRIPTION_LENGTHS = (0, 1, 49, 50, 120, 160, 161, 500)
+H1_COUNTS = (0, 1, 2, 5)
+
+
+def test_title_meta_h1_scores_match_baseline():
+    registry = RuleRegistry()
+    for rule in RULES.rules:
+        if rule.name in TITLE_META_H1_RULES:
+            registry.add(rule)
+    grid = list(itertools.product(TITLE_LENGTHS, META_DESCRIPTION_LENGTHS, H1_COUNTS))
+    rows = [page(*features) for features in grid]
+
+    registry.score_rows(rows)
+
+    assert [(row["seo_evaluation"], row["seo_score"]) for row in rows] == [
+        baseline_evaluation(*features) for features in grid
+    ]
+
+
+def test_issue_mask_sets_each_rule_bit():
+    rows = [
+        page(title_length, meta_description_length, h1_count, image_count=images, images_missing_alt=missing,
+             word_count=word_count)
+        for title_length, meta_description_length, h1_count, (images, missing), word_count in itertools.product(
+            TITLE_LENGTHS, META_DESCRIPTION_LENGTHS, H1_COUNTS, ((0, 0), (10, 1), (10, 2)), (0, 1000),
+        )
+    ]
+    rows.append(page(canonical=None))
+    rows.append(page(canonical="https://example.com/other"))
+
+    result = RULES.score_rows(rows)
+
+    table = FeatureTable.from_rows(rows)
+    for code, rule in enumerate(RULES.rules):
+        expected = rule.evaluate(table)
+        # The grid has pages with and without every issue
+        assert expected.any() and not expected.all(), rule.name
+        assert [bool(row["issues"] >> code & 1) for row in rows] == expected.tolist(), rule.name
+        assert result.issues[:, code].tolist() == expected.tolist(), rule.name
+
+
+def test_issue_mask_keeps_bit_63():
+    # 64 rules; only the last one fires, on pages without an H1
+    registry = RuleRegistry()
+    for code in range(63):
+        registry.add(Rule(f"never_{code}", f"Issue {code}", 0, ("h1_count",), lambda h1_count: h1_count < 0))
+    registry.add(Rule("last", "Issue 63", 0, ("h1_count",), lambda h1_count: h1_count == 0))
+    rows = [page(h1_count=0), page(h1_count=1)]
+
+    result = registry.score_rows(rows)
+
+    # uint64 in NumPy, a negative int64 once stored as a signed BIGINT
+    assert result.issue_masks().tolist() == [2 ** 63, 0]
+    assert rows[0]["issues"] == -2 ** 63
+    assert rows[0]["seo_evaluation"] == "Issue 63"
+
+    metadata = MetaData()
+    table = Table("pages", metadata, Column("id", Integer, primary_key=True), Column("issues", BigInteger))
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(table), [{"issues": row["issues"]} for row in rows])
+        stored = conn.execute(select(table.c.issues).order_by(table.c.id)).scalars().all()
+
+    assert np.array(stored, dtype=np.int64).astype(np.uint64).tolist() == [2 ** 63, 0]
+    assert [issue_codes(mask) for mask in stored] == [[63], []]
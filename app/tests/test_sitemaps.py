@@ -0,0 +1,60 @@
+import pytest
+
+from crawling.sitemaps import SeedCollector, parse_lastmod
+
+MAY_FIRST_10AM_UTC = 1714557600.0
+
+
+@pytest.mark.parametrize("value", [
+    "2024-05-01T10:00:00Z",
+    "2024-05-01T10:00:00z",
+    " 2024-05-01T10:00:00Z\n",
+    "2024-05-01T10:00:00+00:00",
+    "2024-05-01T12:00:00+02:00",
+    "2024-05-01T10:00:00",
+])
+def test_parse_lastmod(value):
+    assert parse_lastmod(value) == MAY_FIRST_10AM_UTC
+
+
+def test_parse_lastmod_date_and_garbage():
+    assert parse_lastmod("2024-05-01") == MAY_FIRST_10AM_UTC - 10 * 3600
+    assert parse_lastmod("yesterday") is None
+    assert parse_lastmod("") is None
+
+
+def test_seeds_rank_by_lastmod():
+    seeds = SeedCollector("example.com", max_urls=2)
+    seeds.add("https://example.com/old", 100.0)
+    seeds.add("https://example.com/undated", None)
+    seeds.add("https://example.com/new", 300.0)
+
+    assert seeds.seeds() == [("https://example.com/new", 300.0), ("https://example.com/old", 100.0)]
+
+
+def test_page_listed_twice_takes_one_place():
+    seeds = SeedCollector("example.com", max_urls=2)
+    seeds.add("https://example.com/a?utm_source=feed", 200.0)
+    seeds.add("https://example.com/a#top", 300.0)
+    seeds.add("https://example.com/b", 100.0)
+
+    assert [url for url, _ in seeds.seeds()] == ["https://example.com/a", "https://example.com/b"]
+    assert seeds.listed == 3
+
+
+def test_evicted_page_can_come_back():
+    seeds = SeedCollector("example.com", max_urls=1)
+    seeds.add("https://example.com/a", 100.0)
+    seeds.add("https://example.com/b", 200.0)
+    seeds.add("https://example.com/a", 300.0)
+
+    assert seeds.seeds() == [("https://example.com/a", 300.0)]
+
+
+def test_host_compares_case_insensitively():
+    seeds = SeedCollector("Example.com", max_urls=10)
+    seeds.add("https://EXAMPLE.com/a", None)
+    seeds.add("https://other.example/b", None)
+    seeds.add("ftp://example.com/c", None)
+
+    assert [url for url, _ in seeds.seeds()] == ["https://example.com/a"]
@@ -0,0 +1,50 @@
+import uuid
+
+from scrapy.core.downloader import Slot
+from scrapy.utils.test import get_crawler
+
+from crawling.seo_spider import SEOSpider
+from crawling.tasks import seo_crawl_settings
+from crawling.throttle import AdaptiveThrottleMiddleware, HostState
+
+CRAWL_DELAY = 0.4
+
+
+def throttle():
+    return AdaptiveThrottleMiddleware(get_crawler(), 1, 8, target_latency=1.0, max_delay=60.0)
+
+
+def test_crawl_delay_paces_every_request(crawl_runner, redis_client, serve):
+    start_url, site = serve(pages=6, shape="tree", crawl_delay=CRAWL_DELAY)
+    task_id = str(uuid.uuid4())
+
+    stats = crawl_runner.crawl(
+        SEOSpider, settings=seo_crawl_settings(task_id, 0, "CrawlBot"), task_id=task_id, start_urls=[start_url],
+    ).result(timeout=60)
+
+    # The first pages wait for the delay too, and none come early from jitter
+    times = sorted(at for at, _ in site.requested)
+    assert len(times) == stats["item_scraped_count"] + 1 > 2  # robots.txt and the pages
+    assert min(later - earlier for earlier, later in zip(times, times[1:])) >= CRAWL_DELAY * 0.95
+
+
+def test_back_off_holds_until_retry_after():
+    middleware, slot, state = throttle(), Slot(4, 0.0, True), HostState()
+
+    middleware._back_off("example.com", slot, state, retry_after=10.0)
+    # Responses that were already in flight come back fine
+    middleware._observe(slot, state, latency=0.1)
+    assert slot.delay == 10.0
+
+    state.backoff_until = 0.0  # Retry-After has passed
+    middleware._observe(slot, state, latency=0.1)
+    assert slot.delay == 5.0
+
+
+def test_delay_never_drops_below_crawl_delay():
+    middleware, slot, state = throttle(), Slot(4, 3.0, True), HostState()
+    state.min_delay = 2.0
+
+    for _ in range(5):
+        middleware._observe(slot, state, latency=0.1)
+    assert slot.delay == 2.0